@@ -0,0 +1,20 @@
+"""
+Build hook of pdm-backend, adds the frozen bundle of the built-in files
+to the wheel, see `sbomgrader.core.frozen`.
+"""
+
+import sys
+
+
+def pdm_build_update_files(context, files):
+    if context.target != "wheel":
+        return
+    sys.path.insert(0, str(context.root))
+    try:
+        from sbomgrader.core.frozen import build_frozen_bundle
+    finally:
+        sys.path.pop(0)
+    relative_path = "sbomgrader/frozen_bundle.pickle"
+    files[relative_path] = build_frozen_bundle(
+        context.ensure_build_dir() / relative_path, context.root / "sbomgrader"
+    )
@@ -1,3 +1,11 @@
-import importlib.metadata
+from typing import Any
 
-__version__ = importlib.metadata.version(__package__)
+
+def __getattr__(name: str) -> Any:
+    # Reading the package metadata is slow, it is only done once the version is used
+    if name == "__version__":
+        import importlib.metadata
+
+        globals()["__version__"] = importlib.metadata.version(__package__)
+        return globals()["__version__"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
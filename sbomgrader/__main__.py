@@ -1,34 +1,56 @@
+import json
 import logging
+import sys
 from argparse import ArgumentParser, Namespace
 from dataclasses import dataclass
 from enum import Enum
 from pathlib import Path
-from typing import Any
-
-from rich.console import Console
-from rich.markdown import Markdown
+from typing import TYPE_CHECKING, Any
 
 from sbomgrader.core.formats import SBOMFormat
 from sbomgrader.core.logging import setup_logger
-from sbomgrader.grade.choose_cookbooks import select_cookbook_bundle
-from sbomgrader.grade.cookbook_bundles import CookbookBundle
-from sbomgrader.grade.cookbooks import Cookbook
 from sbomgrader.core.documents import Document
 from sbomgrader.core.enums import Grade, SBOMTime, OutputType, SBOMType
-from sbomgrader.core.utils import get_mapping, validation_passed
-from sbomgrader.translate.choose_map import choose_map, get_all_map_list_markdown
-from sbomgrader.translate.translation_map import TranslationMap
+from sbomgrader.core.definitions import STDIN_PATH
+from sbomgrader.core.serialization import json_load
+from sbomgrader.core.utils import (
+    get_mapping,
+    open_input,
+    strip_compression_suffix,
+    validation_passed,
+)
+
+# The grading and translation stacks and `rich` are slow to import,
+# each command imports only the modules it needs
+if TYPE_CHECKING:
+    from sbomgrader.grade.cookbook_bundles import CookbookBundle, CookbookBundleResult
+    from sbomgrader.grade.sampling import Sampling
 
 LOGGER = logging.getLogger(__name__)
 
 
-def _input_format(arg: str) -> dict[str, Any]:
+def _input_format(
+    arg: str, sections: set[str] | None = None, with_type: bool = True
+) -> dict[str, Any]:
     """
     Function to ensure input SBOM reading. Exits the process on error.
     :param arg: The value that is passed to the argument parser.
+    :param sections: Top-level fields to load, other fields are skipped.
+    Fields needed to determine the document format and type are always loaded.
+    Loads the whole document if omitted.
+    :param with_type: Load the fields needed to determine the document type
+    together with the sections. Only the format can be determined otherwise.
     :return: Loaded dictionary of the SBOM doc.
     """
-    mapping = get_mapping(arg)
+    if sections is not None:
+        sections = sections | (
+            Document.detection_fields() if with_type else Document.format_fields()
+        )
+    try:
+        mapping = get_mapping(arg, sections=sections)
+    except ValueError as e:
+        LOGGER.debug("Problem info: ", exc_info=e)
+        mapping = None
     if not mapping:
         LOGGER.error("Could not read SBOM from input or file!")
         exit(1)
@@ -55,14 +77,45 @@ def _safe_load_doc(mapping: dict[str, Any]) -> Document:
         exit(1)
 
 
+def _stream_grade(
+    cookbook_bundle: "CookbookBundle", input_file: str, sampling: "Sampling | None"
+) -> "CookbookBundleResult":
+    """
+    Grade a JSON file without loading it whole. Exits the process on error.
+    :param cookbook_bundle: The cookbooks to grade the file with.
+    :param input_file: Path to the JSON SBOM file, which can be compressed.
+    :param sampling: Sample the list elements for per-element rules.
+    :return: Result of the grading.
+    """
+    if input_file == STDIN_PATH:
+        # The file is read more than once
+        LOGGER.error("Streaming cannot read the standard input!")
+        exit(1)
+    path = Path(input_file)
+    if not path.is_file() or not strip_compression_suffix(path.name).endswith(".json"):
+        LOGGER.error("Streaming is only supported for JSON files!")
+        exit(1)
+    try:
+        return cookbook_bundle.stream(path, sampling)
+    except (NotImplementedError, ValueError, AssertionError) as e:
+        LOGGER.error("Please supply a valid and supported SBOM!")
+        LOGGER.debug("Problem info: ", exc_info=e)
+        exit(1)
+
+
 @dataclass
 class GradeConfig:
-    input_file: dict[str, Any]
+    input_file: str
     cookbook_references: list[str]
     content_type: SBOMType
     sbom_type: SBOMTime
     passing_grade: Grade
     output_type: OutputType
+    stream: bool = False
+    sample: int | None = None
+    sample_fraction: float | None = None
+    sample_seed: int = 0
+    shards: int | None = None
 
     @staticmethod
     def from_args(args: Namespace) -> "GradeConfig":
@@ -73,14 +126,20 @@ class GradeConfig:
             sbom_type=args.sbom_type,
             passing_grade=args.passing_grade,
             output_type=args.output,
+            stream=args.stream,
+            sample=args.sample,
+            sample_fraction=args.sample_fraction,
+            sample_seed=args.sample_seed,
+            shards=args.shards,
         )
 
 
 def create_grade_parser(parser: ArgumentParser):
     parser.add_argument(
         "input",
-        type=_input_format,
-        help="SBOM File to grade. Currently supports JSON.",
+        type=str,
+        help="SBOM File to grade. Currently supports JSON. "
+        "The file can be compressed with gzip or Zstandard, use '-' to read the standard input.",
     )
     parser.add_argument(
         "--cookbook",
@@ -120,45 +179,311 @@ def create_grade_parser(parser: ArgumentParser):
         default=OutputType.VISUAL.value,
         help="Specify the output format.",
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Grade a JSON file without loading it into memory whole. "
+        "Requires the cookbooks or the content type to be specified.",
+    )
+    sample_group = parser.add_mutually_exclusive_group()
+    sample_group.add_argument(
+        "--sample",
+        type=int,
+        default=None,
+        help="Evaluate rules checking individual list elements only on this many "
+        "randomly selected elements of each list. Other rules are evaluated in full. "
+        "Implies --stream.",
+    )
+    sample_group.add_argument(
+        "--sample-fraction",
+        type=float,
+        default=None,
+        help="Like --sample, but selects this fraction (0-1] of the list elements.",
+    )
+    parser.add_argument(
+        "--sample-seed",
+        type=int,
+        default=0,
+        help="Seed of the random selection of sampled elements. Default is 0.",
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=None,
+        help="Split the lists of the SBOM into this many shards "
+        "and grade them in separate processes.",
+    )
 
 
-def grade(config: GradeConfig) -> None:
-    console = Console()
-
-    doc = _safe_load_doc(config.input_file)
+def _requested_cookbook_bundle(
+    cookbook_references: list[str], content_type: SBOMType, sbom_type: SBOMTime
+) -> "CookbookBundle | None":
+    """
+    Select the cookbooks requested on the command line. Exits the process on error.
+    :return: The cookbooks or None if they depend on the type of the document.
+    """
+    from sbomgrader.grade.choose_cookbooks import select_cookbook_bundle
+    from sbomgrader.grade.cookbook_bundles import CookbookBundle
 
-    if config.cookbook_references:
-        cookbook_bundle = select_cookbook_bundle(config.cookbook_references)
+    if cookbook_references:
+        cookbook_bundle = select_cookbook_bundle(cookbook_references)
         if not cookbook_bundle.cookbooks:
             LOGGER.error("No cookbook(s) could be found.")
             exit(1)
-    else:
+        return cookbook_bundle
+    if (type_ := SBOMType(content_type)) is not SBOMType.UNSPECIFIED:
         # Cookbooks weren't specified, using defaults
-        type_ = SBOMType(config.content_type)
-        if type_ is SBOMType.UNSPECIFIED:
-            type_ = doc.sbom_type
-        cookbook_bundle = CookbookBundle.for_document_type(
-            type_, SBOMTime(config.sbom_type)
-        )
+        return CookbookBundle.for_document_type(type_, SBOMTime(sbom_type))
+    return None
+
+
+def _grade_shard_file(input_file: str) -> dict[str, Any]:
+    """
+    Grade a shard written by the `shard` command. Exits the process on error.
+    :return: Serialized partial result of the grading.
+    """
+    from sbomgrader.grade.sharding import grade_shard
+
+    try:
+        with open_input(input_file) as stream:
+            return grade_shard(json_load(stream))
+    except (ValueError, KeyError) as e:
+        LOGGER.error("Please supply a valid shard file!")
+        LOGGER.debug("Problem info: ", exc_info=e)
+        exit(1)
+
 
-    result = cookbook_bundle(doc)
+def _report(
+    result: "CookbookBundleResult", output_type: OutputType, passing_grade: Grade
+):
+    """Print the result and exit with a status depending on the grade."""
+    output_type_enum = OutputType(output_type)
+    if output_type_enum is OutputType.VISUAL:
+        from rich.console import Console
+        from rich.markdown import Markdown
 
-    output_type = OutputType(config.output_type)
-    if output_type is OutputType.VISUAL:
-        markdown = Markdown(result.output(output_type))
-        console.print(markdown)
+        Console().print(Markdown(result.output(output_type_enum)))
     else:
-        console.print(result.output(output_type))
-    if validation_passed(result.grade, Grade(config.passing_grade)):
+        print(result.output(output_type_enum))
+    if validation_passed(result.grade, Grade(passing_grade)):
         exit(0)
     exit(1)
 
 
+def grade(config: GradeConfig) -> None:
+    from sbomgrader.grade.cookbook_bundles import CookbookBundle
+    from sbomgrader.grade.sampling import Sampling
+    from sbomgrader.grade.sharding import is_shard_file
+
+    if is_shard_file(config.input_file):
+        # Shards are graded with the cookbooks stored in them,
+        # the partial result is merged by the `merge-results` command
+        print(json.dumps(_grade_shard_file(config.input_file)))
+        exit(0)
+
+    cookbook_bundle = _requested_cookbook_bundle(
+        config.cookbook_references, config.content_type, config.sbom_type
+    )
+
+    sampling = None
+    if config.sample is not None or config.sample_fraction is not None:
+        try:
+            sampling = Sampling(
+                config.sample, config.sample_fraction, config.sample_seed
+            )
+        except ValueError as e:
+            LOGGER.error(str(e))
+            exit(1)
+
+    if config.shards is not None and (config.stream or sampling):
+        LOGGER.error("Sharding cannot be combined with streaming or sampling.")
+        exit(1)
+    if config.shards is not None and config.shards < 1:
+        LOGGER.error("The number of shards must be a positive number.")
+        exit(1)
+
+    if config.stream or sampling:
+        if cookbook_bundle is None:
+            LOGGER.error(
+                "Streaming requires the cookbooks or the content type to be specified."
+            )
+            exit(1)
+        result = _stream_grade(cookbook_bundle, config.input_file, sampling)
+    else:
+        # If the cookbooks are known upfront, only the sections they use are loaded
+        sections = cookbook_bundle.referenced_fields if cookbook_bundle else None
+        doc = _safe_load_doc(_input_format(config.input_file, sections))
+
+        if cookbook_bundle is None:
+            # The defaults depend on the type of the document
+            cookbook_bundle = CookbookBundle.for_document_type(
+                doc.sbom_type, SBOMTime(config.sbom_type)
+            )
+
+        if config.shards:
+            result = cookbook_bundle.grade_sharded(doc, config.shards)
+        else:
+            result = cookbook_bundle(doc)
+
+    _report(result, config.output_type, config.passing_grade)
+
+
+@dataclass
+class ShardConfig:
+    input_file: str
+    cookbook_references: list[str]
+    content_type: SBOMType
+    sbom_type: SBOMTime
+    shards: int
+    output_dir: str
+
+    @staticmethod
+    def from_args(args: Namespace) -> "ShardConfig":
+        return ShardConfig(
+            input_file=args.input,
+            cookbook_references=args.cookbook or [],
+            content_type=args.content_type,
+            sbom_type=args.sbom_type,
+            shards=args.shards,
+            output_dir=args.output_dir,
+        )
+
+
+def create_shard_parser(parser: ArgumentParser):
+    parser.add_argument(
+        "input",
+        type=str,
+        help="SBOM File to split into shards. Currently supports JSON. "
+        "The file can be compressed with gzip or Zstandard, use '-' to read the standard input.",
+    )
+    parser.add_argument(
+        "--cookbook",
+        "-c",
+        action="append",
+        type=str,
+        help="Cookbooks to use for validation. See the grade command.",
+    )
+    parser.add_argument(
+        "--content-type",
+        "-ct",
+        choices=[v.value for v in SBOMType if v is not SBOMType.UNSPECIFIED],
+        default=SBOMType.UNSPECIFIED.value,
+        help="Specify SBOM content type. Ignored if cookbooks argument is specified.",
+    )
+    parser.add_argument(
+        "--sbom-type",
+        "-st",
+        choices=[v.value for v in SBOMTime if v is not SBOMTime.UNSPECIFIED],
+        default=None,
+        help="If using the standard validation, specify which SBOM type (by time) is being validated. "
+        "Ignored if cookbooks argument is specified.",
+    )
+    parser.add_argument(
+        "--shards",
+        "-n",
+        type=int,
+        required=True,
+        help="Number of shards to split the lists of the SBOM into.",
+    )
+    parser.add_argument(
+        "--output-dir",
+        "-d",
+        type=str,
+        required=True,
+        help="Directory to write the shard files to. "
+        "Each of them can be graded by the grade command, "
+        "the outputs are combined by the merge-results command.",
+    )
+
+
+def shard(config: ShardConfig) -> None:
+    from sbomgrader.grade.cookbook_bundles import CookbookBundle
+    from sbomgrader.grade.sharding import write_shards
+
+    if config.shards < 1:
+        LOGGER.error("The number of shards must be a positive number.")
+        exit(1)
+    cookbook_bundle = _requested_cookbook_bundle(
+        config.cookbook_references, config.content_type, config.sbom_type
+    )
+    doc = _safe_load_doc(_input_format(config.input_file))
+    if cookbook_bundle is None:
+        cookbook_bundle = CookbookBundle.for_document_type(
+            doc.sbom_type, SBOMTime(config.sbom_type)
+        )
+    shards = cookbook_bundle.create_shards(doc, config.shards)
+    for path in write_shards(shards, config.output_dir):
+        print(path)
+    exit(0)
+
+
+@dataclass
+class MergeResultsConfig:
+    input_files: list[str]
+    passing_grade: Grade
+    output_type: OutputType
+
+    @staticmethod
+    def from_args(args: Namespace) -> "MergeResultsConfig":
+        return MergeResultsConfig(
+            input_files=args.input,
+            passing_grade=args.passing_grade,
+            output_type=args.output,
+        )
+
+
+def create_merge_results_parser(parser: ArgumentParser):
+    parser.add_argument(
+        "input",
+        type=str,
+        nargs="+",
+        help="Outputs of the grade command for all shards of an SBOM.",
+    )
+    parser.add_argument(
+        "--passing-grade",
+        "-g",
+        choices=[v.value for v in Grade],
+        default=Grade.B.value,
+        help="Minimal passing grade. Default is B.",
+    )
+    parser.add_argument(
+        "--output",
+        "-o",
+        choices=[v.value for v in OutputType],
+        default=OutputType.VISUAL.value,
+        help="Specify the output format.",
+    )
+
+
+def merge_results(config: MergeResultsConfig) -> None:
+    from sbomgrader.grade.cookbook_bundles import CookbookBundle
+
+    shard_results = []
+    for input_file in config.input_files:
+        try:
+            with open_input(input_file) as stream:
+                shard_results.append(json_load(stream))
+        except (OSError, ValueError) as e:
+            LOGGER.error(f"Could not read shard result {input_file}!")
+            LOGGER.debug("Problem info: ", exc_info=e)
+            exit(1)
+    try:
+        result = CookbookBundle.merge_shard_results(shard_results)
+    except (ValueError, KeyError) as e:
+        LOGGER.error(f"Could not merge the shard results: {e}")
+        LOGGER.debug("Problem info: ", exc_info=e)
+        exit(1)
+    _report(result, config.output_type, config.passing_grade)
+
+
 @dataclass
 class ConvertConfig:
-    input_file: dict[str, Any]
+    input_file: str
     output_format: Enum
     custom_maps: list[Path]
+    workers: int
+    output_file: str | None
+    compact: bool
 
     @staticmethod
     def from_args(args: Namespace) -> "ConvertConfig":
@@ -166,14 +491,18 @@ class ConvertConfig:
             input_file=args.input,
             output_format=args.output_format,
             custom_maps=args.custom_map or [],
+            workers=args.workers,
+            output_file=args.output_file,
+            compact=args.compact,
         )
 
 
 def create_convert_parser(parser: ArgumentParser):
     parser.add_argument(
         "input",
-        type=_input_format,
-        help="SBOM File to convert. Currently supports JSON.",
+        type=str,
+        help="SBOM File to convert. Currently supports JSON. "
+        "The file can be compressed with gzip or Zstandard, use '-' to read the standard input.",
     )
     parser.add_argument(
         "--output-format",
@@ -189,18 +518,71 @@ def create_convert_parser(parser: ArgumentParser):
         help="Custom translation map file.",
         action="append",
     )
+    parser.add_argument(
+        "--workers",
+        "-w",
+        type=int,
+        default=1,
+        help="Number of processes rendering the translation map chunks.",
+    )
+    parser.add_argument(
+        "--output-file",
+        type=str,
+        default=None,
+        help="File to write the converted SBOM to. Prints it by default.",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Write the converted SBOM as JSON without any whitespace.",
+    )
 
 
 def convert(config: ConvertConfig) -> None:
+    from sbomgrader.translate.choose_map import (
+        MapEntry,
+        choose_map,
+        get_maps_to_format,
+    )
 
-    custom_maps = [TranslationMap.from_file(f) for f in config.custom_maps]
-
-    doc = _safe_load_doc(config.input_file)
+    # Only the map chosen for the document is loaded
+    custom_maps = [MapEntry.from_file(f) for f in config.custom_maps]
 
     target_format: Enum = SBOMFormat(config.output_format)
 
-    t_map = choose_map(doc, target_format, *custom_maps)
-    print(t_map.convert(doc, target_format).json_dump)
+    sections = None
+    t_map = None
+    input_file = config.input_file
+    if (
+        input_file != STDIN_PATH
+        and Path(input_file).is_file()
+        and strip_compression_suffix(input_file).endswith(".json")
+        and any(
+            map_.referenced_fields(from_) is not None
+            for map_, from_ in get_maps_to_format(target_format, *custom_maps)
+        )
+    ):
+        # The map is chosen by the format, then only the fields it reads are loaded.
+        # The standard input cannot be read twice, sections only apply to JSON.
+        # If no map could skip any of the fields, the document is read at once.
+        format_doc = _safe_load_doc(
+            _input_format(input_file, Document.format_fields(), False)
+        )
+        t_map = choose_map(format_doc, target_format, *custom_maps)
+        sections = t_map.referenced_fields(format_doc.sbom_format)
+
+    doc = _safe_load_doc(_input_format(input_file, sections, False))
+    if t_map is None:
+        t_map = choose_map(doc, target_format, *custom_maps)
+    new_doc = t_map.convert(doc, target_format, workers=config.workers)
+    # The output is written as it is serialized
+    if config.output_file is None:
+        new_doc.dump(sys.stdout, config.compact)
+        print()
+    else:
+        with open(config.output_file, "w") as stream:
+            new_doc.dump(stream, config.compact)
+            stream.write("\n")
     exit(0)
 
 
@@ -233,11 +615,18 @@ def create_list_parser(parser: ArgumentParser):
 
 
 def list_(config: ListConfig):
+    from rich.console import Console
+    from rich.markdown import Markdown
+
     console = Console()
     if config.cookbooks:
+        from sbomgrader.grade.cookbooks import Cookbook
+
         default_cookbooks = Cookbook.load_all_defaults()
         console.print(Markdown("\n".join(f"- {cb.name}" for cb in default_cookbooks)))
     if config.maps:
+        from sbomgrader.translate.choose_map import get_all_map_list_markdown
+
         console.print(Markdown(get_all_map_list_markdown()))
     exit(0)
 
@@ -260,6 +649,10 @@ def main():
     create_convert_parser(convert_parser)
     list_parser = subparsers.add_parser("list")
     create_list_parser(list_parser)
+    shard_parser = subparsers.add_parser("shard")
+    create_shard_parser(shard_parser)
+    merge_results_parser = subparsers.add_parser("merge-results")
+    create_merge_results_parser(merge_results_parser)
     args = parser.parse_args()
     setup_logger(verbosity_level=args.verbosity, overwrite_handlers=True)
 
@@ -267,6 +660,8 @@ def main():
         "grade": (grade, GradeConfig),
         "convert": (convert, ConvertConfig),
         "list": (list_, ListConfig),
+        "shard": (shard, ShardConfig),
+        "merge-results": (merge_results, MergeResultsConfig),
     }
     func, config_class = map_[args.command]
     return func(config_class.from_args(args))
@@ -0,0 +1,44 @@
+import asyncio
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from typing import Any, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+async def run_cancellable(
+    func: Callable[..., T],
+    *args: Any,
+    executor: Executor | None = None,
+    **kwargs: Any,
+) -> T:
+    """
+    Run a blocking function in an executor without blocking the event loop.
+    The function receives a `cancel` keyword argument holding an event which is set
+    once the awaiting task is cancelled. The function is expected to check it
+    between the steps of its work (e.g. rules or chunks), see `raise_if_cancelled`.
+    The task waits for the function to stop before it finishes cancelling.
+    :argument func: The function to run.
+    :argument executor: Executor to run the function in. The default executor
+    of the event loop is used if omitted. Events cannot be shared with other
+    processes, functions in a ProcessPoolExecutor run until they finish.
+    """
+    cancel: threading.Event | None = None
+    if not isinstance(executor, ProcessPoolExecutor):
+        cancel = threading.Event()
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(
+        executor, partial(func, *args, cancel=cancel, **kwargs)
+    )
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        if cancel is not None:
+            cancel.set()
+            # The outcome does not matter anymore, the function just has to stop
+            await asyncio.wait([future])
+            if not future.cancelled():
+                # Mark the exception as retrieved
+                future.exception()
+        raise
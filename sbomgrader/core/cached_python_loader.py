@@ -1,11 +1,15 @@
 import logging
 import sys
+import threading
 from pathlib import Path
 
 from runpy import run_path
-from typing import Callable, Union
+from typing import Any, Callable, Union
 
 LOGGER = logging.getLogger(__name__)
+# Files declare by `WORKER_SAFE = True` that their functions can be called
+# by several processes, i.e. their results do not depend on the earlier calls
+WORKER_SAFE_FLAG = "WORKER_SAFE"
 
 
 class PythonLoader:
@@ -13,27 +17,55 @@ class PythonLoader:
         self._unloaded_file_references: set[Path] = set()
         self._loaded_file_references: set[Path] = set()
         self.__functions: dict[str, Callable] = {}
+        self.__worker_safe_functions: frozenset[str] = frozenset()
+        # Files are loaded once, even if functions are requested from many threads
+        self.__lock = threading.Lock()
 
         self.add_file_references(*file_references)
 
+    def __getstate__(self) -> dict[str, Any]:
+        state = self.__dict__.copy()
+        del state["_PythonLoader__lock"]
+        # Functions of the executed files cannot be pickled, the files are loaded again
+        state["_PythonLoader__functions"] = {}
+        state["_PythonLoader__worker_safe_functions"] = frozenset()
+        state["_unloaded_file_references"] = self.file_references
+        state["_loaded_file_references"] = set()
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.__lock = threading.Lock()
+
     def add_file_references(self, *file_references: str | Path) -> None:
-        self._unloaded_file_references.update(
-            ref for ref in file_references if isinstance(ref, Path)
-        )
-        self._unloaded_file_references.update(
-            Path(ref) for ref in file_references if isinstance(ref, str)
-        )
+        with self.__lock:
+            self._unloaded_file_references = self._unloaded_file_references | {
+                Path(ref) for ref in file_references
+            }
 
     def _load_all_references(self) -> None:
-        for ref in self._unloaded_file_references:
-            if not ref.exists():
-                continue
-            module = run_path(str(ref.absolute()))
-            self.__functions.update(
-                {name: value for name, value in module.items() if callable(value)}
+        with self.__lock:
+            functions = dict(self.__functions)
+            worker_safe = set(self.__worker_safe_functions)
+            for ref in self._unloaded_file_references:
+                if not ref.exists():
+                    continue
+                module = run_path(str(ref.absolute()))
+                loaded = {
+                    name: value for name, value in module.items() if callable(value)
+                }
+                functions.update(loaded)
+                if module.get(WORKER_SAFE_FLAG) is True:
+                    worker_safe.update(loaded)
+                else:
+                    worker_safe.difference_update(loaded)
+            # Readers only ever see complete sets of functions
+            self.__functions = functions
+            self.__worker_safe_functions = frozenset(worker_safe)
+            self._loaded_file_references = (
+                self._loaded_file_references | self._unloaded_file_references
             )
-        self._loaded_file_references.update(self._unloaded_file_references)
-        self._unloaded_file_references = set()
+            self._unloaded_file_references = set()
 
     @property
     def file_references(self) -> set[Path]:
@@ -47,3 +79,12 @@ class PythonLoader:
                 f"Could not load transformer {name} from files {self.file_references}."
             )
         return self.__functions.get(name, None)
+
+    def is_worker_safe(self, name: str) -> bool:
+        """
+        Was the function loaded from a file declaring `WORKER_SAFE = True`?
+        Only such functions are called by worker processes.
+        """
+        if self._unloaded_file_references:
+            self._load_all_references()
+        return name in self.__worker_safe_functions
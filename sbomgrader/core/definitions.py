@@ -2,7 +2,6 @@ import re
 from pathlib import Path
 from typing import Sized
 
-
 ROOT_DIR: Path = Path(__file__).parent.parent
 RULESET_DIR = ROOT_DIR / "rulesets"
 COOKBOOKS_DIR = ROOT_DIR / "cookbooks"
@@ -17,7 +16,13 @@ TRANSLATION_MAP_VALIDATION_SCHEMA_PATH = (
 )
 FORMAT_FILE_PATH = ROOT_DIR / "formats" / "formats.yml"
 FORMAT_VALIDATION_SCHEMA_PATH = ROOT_DIR / "formats" / "schema" / "formats_schema.yml"
+# Built-in files parsed and validated at build time, see `sbomgrader.core.frozen`
+FROZEN_BUNDLE_PATH = ROOT_DIR / "frozen_bundle.pickle"
 COOKBOOK_EXTENSIONS = {".yml", ".yaml"}
+# Compressed input files are decompressed while they are read
+COMPRESSION_SUFFIXES = {".gz", ".zst"}
+# Input path which reads the standard input
+STDIN_PATH = "-"
 
 TIME_ISO_FORMAT_STRING = "%Y-%m-%dT%H:%M:%SZ"
 
@@ -25,6 +30,9 @@ MAX_ITEM_PREVIEW_LENGTH = 50
 START_PREVIEW_CHARS = 25
 END_PREVIEW_CHARS = 20
 VAR_REF_REGEX = r"\${(?P<var_id>[^}]+)}"
+NO_FIELDS_MATCHED_MESSAGE = (
+    "Test was not performed on any fields because no fields match given filters."
+)
 
 
 class __FieldNotPresent:
@@ -44,6 +52,10 @@ class FieldNotPresentError(ValueError):
     pass
 
 
+class OperationCancelledError(Exception):
+    """Grading or conversion was cancelled before it finished."""
+
+
 operation_map = {
     "eq": lambda expected, actual: expected == actual,
     "neq": lambda expected, actual: expected != actual,
@@ -2,14 +2,17 @@ import json
 from enum import Enum
 from functools import cached_property
 from pathlib import Path
-from typing import Any
+from typing import Any, TextIO
 
+from sbomgrader.core import streaming
+from sbomgrader.core.definitions import STDIN_PATH
 from sbomgrader.core.enums import SBOMType
 from sbomgrader.core.formats import (
     SBOM_FORMAT_DEFINITION_MAPPING,
     SBOMFormat,
     get_fallbacks,
 )
+from sbomgrader.core.graph import DocumentGraph
 from sbomgrader.core.utils import get_mapping
 
 
@@ -28,6 +31,11 @@ class Document:
                 return item
         raise NotImplementedError("Document standard and/or version is not supported.")
 
+    @cached_property
+    def graph(self) -> DocumentGraph:
+        """Index of the elements and relationships of the document."""
+        return DocumentGraph(self._doc)
+
     @property
     def sbom_format_fallback(self) -> set[Enum]:
         return get_fallbacks(self.sbom_format)
@@ -65,22 +73,11 @@ class Document:
             in get_fallbacks(SBOMFormat.SPDX23)  # type: ignore[attr-defined]
         ):  # type: ignore[attr-defined]
             # First get main component
-            relationships = self._doc.get("relationships", [])
-            main_relationships = [
-                relationship
-                for relationship in relationships
-                if relationship["spdxElementId"] == "SPDXRef-DOCUMENT"
-                and relationship["relationshipType"] == "DESCRIBES"
-            ]
-            if len(main_relationships) > 1:
+            main_spdxids = self.graph.related("SPDXRef-DOCUMENT", "DESCRIBES")
+            if len(main_spdxids) > 1:
                 # Many main components. Don't know what to do here
                 return SBOMType.UNKNOWN
-            main_relationship = main_relationships[0]
-            main_spdxid = main_relationship["relatedSpdxElement"]
-            packages = self._doc.get("packages", [])
-            main_package: dict[str, Any] = next(
-                filter(lambda x: x.get("SPDXID") == main_spdxid, packages), {}
-            )
+            main_package = self.graph.package(main_spdxids[0]) or {}
             main_pkg_references = main_package.get("externalRefs", [])
             cpes = list(
                 filter(
@@ -128,13 +125,47 @@ class Document:
     def json_dump(self) -> str:
         return json.dumps(self._doc, indent=4)
 
+    def dump(self, stream: TextIO, compact: bool = False) -> None:
+        """
+        Write the document as JSON to the stream, without creating
+        the whole text in memory. Same as `json_dump` unless compact.
+        :param compact: Write the JSON without any whitespace.
+        """
+        streaming.dump(self._doc, stream, None if compact else 4)
+
+    @staticmethod
+    def format_fields() -> set[str]:
+        """Top-level fields needed to determine the format of a document."""
+        fields: set[str] = set()
+        for expected_structure in SBOM_FORMAT_DEFINITION_MAPPING.values():
+            fields.update(expected_structure)
+        return fields
+
+    @staticmethod
+    def detection_fields() -> set[str]:
+        """Top-level fields needed to determine the format and the type of a document."""
+        return {"relationships", "packages", "metadata", *Document.format_fields()}
+
     @staticmethod
-    def from_file(path_to_file: str | Path) -> "Document":
-        path_to_file = Path(path_to_file)
-        mapping = get_mapping(path_to_file)
+    def from_file(
+        path_to_file: str | Path, sections: set[str] | None = None
+    ) -> "Document":
+        """
+        Load the document from a file.
+        :argument path_to_file: Path to a JSON or YAML file, which can be
+        compressed with gzip or Zstandard, or `-` for the standard input.
+        :argument sections: Top-level fields to load from JSON files, besides
+        the ones needed to detect the document format and type. Other fields
+        are skipped while the file is read. Loads the whole file if omitted.
+        """
+        if path_to_file != STDIN_PATH:
+            path_to_file = Path(path_to_file)
+        if sections is not None:
+            sections = sections | Document.detection_fields()
+        mapping = get_mapping(path_to_file, sections=sections)
         if not mapping:
             raise ValueError(
-                f"It seems that file {path_to_file.absolute()} does not contain a valid mapping."
+                f"It seems that file {path_to_file} does not contain a valid mapping."
                 f"Please make sure a valid json or yaml file is provided."
             )
-        return Document(get_mapping(path_to_file))  # type: ignore[arg-type]
+        return Document(mapping)
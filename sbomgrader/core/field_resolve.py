@@ -1,9 +1,9 @@
+import builtins
 import logging
 import re
-from collections import defaultdict
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from functools import cached_property
-from typing import Union, Any, Callable, Sequence
+from typing import Union, Any, Callable, Hashable, Sequence
 
 from sbomgrader.core.definitions import (
     FIELD_NOT_PRESENT,
@@ -12,6 +12,7 @@ from sbomgrader.core.definitions import (
     START_PREVIEW_CHARS,
     END_PREVIEW_CHARS,
     VAR_REF_REGEX,
+    NO_FIELDS_MATCHED_MESSAGE,
 )
 from sbomgrader.core.enums import QueryType
 
@@ -23,19 +24,22 @@ class PathParser:
 
     def __init__(self, path: str):
         self._path = path
-        self.__next_is_query = False
-        self.ans: dict[str, list[Union[str, QueryParser]]] = defaultdict(list)
+        # Parsed paths by the relative path, only complete results are stored
+        # so the parser can be shared between threads
+        self.ans: dict[str, list[Union[str, QueryParser]]] = {}
 
     def __create_field(
-        self, field: str | int | None, next_is_query: bool, relative_path: "PathParser"
+        self,
+        ans: list[Union[str, "QueryParser"]],
+        field: str | int | None,
+        is_query: bool,
+        relative_path: "PathParser",
     ) -> None:
         next_expression: None | str | QueryParser = None
-        if self.__next_is_query:
+        if is_query:
             if field == "@":
                 try:
-                    appropriate_relative_field = relative_path.parse()[
-                        len(self.ans[relative_path.raw_path])
-                    ]
+                    appropriate_relative_field = relative_path.parse()[len(ans)]
                 except IndexError:
                     raise ValueError(
                         f"Problem parsing path '{self._path}' with relative hint '{relative_path.raw_path}'. "
@@ -62,9 +66,8 @@ class PathParser:
             else:
                 next_expression = str(field)
 
-        self.__next_is_query = next_is_query
         if next_expression:
-            self.ans[relative_path.raw_path].append(next_expression)
+            ans.append(next_expression)
 
     def parse(
         self, relative_path: str | None = None
@@ -100,12 +103,15 @@ class PathParser:
                     "Cannot resolve relative path if no relative path is passed!"
                 )
             resolve_path = resolve_path.replace("@", relative_path, 1)
-        in_block = 1 if self.__next_is_query else 0
+        ans: list[Union[str, QueryParser]] = []
+        is_query = False
+        in_block = 0
         buffer = ""
         for char in resolve_path:
             if char == "[":
                 if not in_block:
-                    self.__create_field(buffer, True, parsed_relative_path)
+                    self.__create_field(ans, buffer, is_query, parsed_relative_path)
+                    is_query = True
                     buffer = ""
                 else:
                     buffer += char
@@ -113,14 +119,16 @@ class PathParser:
             elif char == "]":
                 in_block -= 1
                 if not in_block:
-                    self.__create_field(buffer, False, parsed_relative_path)
+                    self.__create_field(ans, buffer, is_query, parsed_relative_path)
+                    is_query = False
                     buffer = ""
                 else:
                     buffer += char
             elif char == ".":
                 if not in_block:
                     # Field delimiter found
-                    self.__create_field(buffer, False, parsed_relative_path)
+                    self.__create_field(ans, buffer, is_query, parsed_relative_path)
+                    is_query = False
                     buffer = ""
                 else:
                     # Field delimiter is just a part of subquery, ignoring
@@ -128,10 +136,11 @@ class PathParser:
             else:
                 buffer += char
         if buffer:
-            self.__create_field(buffer, False, parsed_relative_path)
+            self.__create_field(ans, buffer, is_query, parsed_relative_path)
         if in_block:
             raise ValueError(f"Unmatched '[' in query '{self._path}'!")
-        return self.ans[relative_path]
+        # Another thread might have parsed the path meanwhile, all share one result
+        return self.ans.setdefault(relative_path, ans)
 
     def __eq__(self, other):
         if not isinstance(other, PathParser):
@@ -154,6 +163,26 @@ class PathParser:
                 ans.update(step.variable_references)
         return ans
 
+    @property
+    def root_field(self) -> tuple[str, bool] | None:
+        """
+        The top-level field this path starts with and whether
+        the field is optional (prefixed with '?').
+        Returns None if the path does not start with a field name.
+        """
+        parsed_path = self.parse()
+        if not parsed_path or not isinstance(parsed_path[0], str):
+            return None
+        if parsed_path[0] != "?":
+            return parsed_path[0], False
+        if (
+            len(parsed_path) > 1
+            and isinstance(parsed_path[1], str)
+            and parsed_path[1] != "?"
+        ):
+            return parsed_path[1], True
+        return None
+
 
 @dataclass
 class Query:
@@ -181,7 +210,8 @@ class QueryParser:
 
     def __init__(self, path: str | int):
         self._path = path
-        self.ans: dict[str | None, list[Query]] = defaultdict(list)
+        # Parsed queries by the relative index, see `PathParser.ans`
+        self.ans: dict[str | None, list[Query]] = {}
 
     def __eq__(self, other):
         if not isinstance(other, QueryParser):
@@ -269,8 +299,7 @@ class QueryParser:
                     value=self._load_val(value_buffer),
                 )
             queries.append(query)
-        self.ans[relative_path_index] = queries
-        return queries
+        return self.ans.setdefault(relative_path_index, queries)
 
     @property
     def variable_references(self) -> set[str]:
@@ -335,6 +364,19 @@ class Variable:
             return self
         return Variable(self.name, self.path_parser.raw_path.removeprefix("@."))
 
+    @property
+    def root_field(self) -> tuple[str, bool] | None:
+        """
+        The top-level field the variable is resolved from.
+        Returns None for fully relative variables. See `PathParser.root_field`.
+        """
+        if self.is_fully_relative:
+            return None
+        if self.is_partially_relative:
+            # The relative part cannot be parsed without the relative path
+            return PathParser(self.raw_field_path.split("[", 1)[0]).root_field
+        return self.path_parser.root_field
+
     @cached_property
     def dependencies(self) -> set[str]:
         deps = {
@@ -359,6 +401,7 @@ class FieldResolver:
 
     def __init__(self, variables: dict[str, Variable]):
         self._uninitialized_vars = variables
+        self.__definition_keys: dict[str, Hashable] = {}
 
     @property
     def var_definitions(self) -> dict[str, Variable]:
@@ -391,6 +434,44 @@ class FieldResolver:
             key: val for key, val in self._uninitialized_vars.items() if val.is_relative
         }
 
+    @property
+    def referenced_fields(self) -> set[str] | None:
+        """
+        Top-level document fields the variables are resolved from.
+        Returns None if some variable needs the whole document.
+        Fully relative variables are resolved from the instance
+        they relate to, so they are not taken into account.
+        """
+        ans = set()
+        for variable in self._uninitialized_vars.values():
+            if variable.is_fully_relative:
+                continue
+            root_field = variable.root_field
+            if root_field is None:
+                return None
+            ans.add(root_field[0])
+        return ans
+
+    def definition_key(self, var_name: str) -> Hashable:
+        """
+        Key identifying the definition of the variable, including the definitions
+        of the variables it references. Variables with the same key have the same
+        value in a document, whatever their names or resolvers are.
+        """
+        if (key := self.__definition_keys.get(var_name)) is not None:
+            return key
+        variable = self._uninitialized_vars.get(var_name)
+        if variable is None:
+            return None
+        # Variables referencing themselves are rejected when they are resolved
+        self.__definition_keys[var_name] = (var_name, "circular reference")
+        key = variable.raw_field_path, tuple(
+            (dep_name, self.definition_key(dep_name))
+            for dep_name in sorted(variable.dependencies)
+        )
+        self.__definition_keys[var_name] = key
+        return key
+
     def __find_dependencies_for_subset(
         self,
         subset_of_variables: list[str] | set[str],
@@ -540,6 +621,16 @@ class FieldResolver:
             # Add a list
             mutable_doc[step] = []  # type: ignore[call-overload]
 
+    @staticmethod
+    def cast_variables(
+        variables: dict[str, list[Any]],
+    ) -> dict[str, list[Any] | set[Any]]:
+        """
+        Prepare resolved variable values (e.g. loaded from a file)
+        for fast lookups, see `path_variables`.
+        """
+        return FieldResolver.__cast_vars_to_sets(variables)
+
     @staticmethod
     def __cast_vars_to_sets(
         variables: dict[str, list[Any]],
@@ -551,6 +642,9 @@ class FieldResolver:
         """
         new_variables: dict[str, list[Any] | set[Any]] = {}
         for var_name in variables:
+            if isinstance(variables[var_name], set):
+                new_variables[var_name] = variables[var_name]
+                continue
             try:
                 new_value = set(variables[var_name])
                 new_variables[var_name] = new_value
@@ -558,6 +652,80 @@ class FieldResolver:
                 new_variables[var_name] = variables[var_name]
         return new_variables
 
+    def _query_matches(
+        self,
+        query: Query,
+        item: Any,
+        variable_values: dict[str, list[Any] | set[Any]],
+        path_tried: str,
+        create_nonexistent: bool = False,
+    ) -> bool:
+        """
+        Does the list item match the filtering Query? The item matches
+        if any of the fields located by the Query FieldPath satisfies it.
+        """
+        varname = query.variable
+        if query.type_ is QueryType.EQ:
+            if varname:
+                func = lambda x: x in variable_values[varname]
+            else:
+                func = lambda x: x == query.value
+        elif query.type_ is QueryType.NEQ:
+            if varname:
+                func = lambda x: x not in variable_values[varname]
+            else:
+                func = lambda x: x != query.value
+        elif query.type_ is QueryType.STARTSWITH:
+            if varname:
+                func = lambda x: isinstance(x, str) and any(
+                    x.startswith(val) for val in variable_values[varname]
+                )
+            else:
+                func = lambda x: isinstance(x, str) and x.startswith(
+                    query.value  # type: ignore[arg-type]
+                )
+        elif query.type_ is QueryType.ENDSWITH:
+            if varname:
+                func = lambda x: isinstance(x, str) and any(
+                    x.endswith(val) for val in variable_values[varname]
+                )
+            else:
+                func = lambda x: isinstance(x, str) and x.endswith(
+                    query.value  # type: ignore[arg-type]
+                )
+        elif query.type_ is QueryType.CONTAINS:
+            if varname:
+                func = lambda x: isinstance(x, str) and any(
+                    val in x for val in variable_values[varname]
+                )
+            else:
+                func = lambda x: isinstance(x, str) and query.value in x  # type: ignore[operator]
+        elif query.type_ is QueryType.NOT_CONTAINS:
+            if varname:
+                func = lambda x: isinstance(x, str) and all(
+                    val not in x for val in variable_values[varname]
+                )
+            else:
+                func = lambda x: isinstance(x, str) and query.value not in x  # type: ignore[operator]
+        matched = False
+
+        def final_func(x: Any, _: str) -> None:
+            nonlocal matched
+            if func(x):
+                matched = True
+
+        parsed_path = query.field_path.parse() if query.field_path is not None else []
+        self._run_on_path(
+            item,
+            parsed_path,
+            variable_values,
+            path_tried,
+            final_func,
+            True,
+            create_nonexistent,
+        )
+        return matched
+
     def _run_on_path(
         self,
         doc_: Any,
@@ -667,65 +835,15 @@ class FieldResolver:
                 # Actually filter the list
                 to_use_in_query = set()
                 for idx, item in enumerate(doc_):
-                    varname = query.variable
-                    if query.type_ is QueryType.EQ:
-                        if varname:
-                            func = lambda x: x in variable_values[varname]
-                        else:
-                            func = lambda x: x == query.value
-                    elif query.type_ is QueryType.NEQ:
-                        if varname:
-                            func = lambda x: x not in variable_values[varname]
-                        else:
-                            func = lambda x: x != query.value
-                    elif query.type_ is QueryType.STARTSWITH:
-                        if varname:
-                            func = lambda x: isinstance(x, str) and any(
-                                x.startswith(val) for val in variable_values[varname]
-                            )
-                        else:
-                            func = lambda x: isinstance(x, str) and x.startswith(
-                                query.value  # type: ignore[arg-type]
-                            )
-                    elif query.type_ is QueryType.ENDSWITH:
-                        if varname:
-                            func = lambda x: isinstance(x, str) and any(
-                                x.endswith(val) for val in variable_values[varname]
-                            )
-                        else:
-                            func = lambda x: isinstance(x, str) and x.endswith(
-                                query.value  # type: ignore[arg-type]
-                            )
-                    elif query.type_ is QueryType.CONTAINS:
-                        if varname:
-                            func = lambda x: isinstance(x, str) and any(
-                                val in x for val in variable_values[varname]
-                            )
-                        else:
-                            func = lambda x: isinstance(x, str) and query.value in x  # type: ignore[operator]
-                    elif query.type_ is QueryType.NOT_CONTAINS:
-                        if varname:
-                            func = lambda x: isinstance(x, str) and all(
-                                val not in x for val in variable_values[varname]
-                            )
-                        else:
-                            func = lambda x: isinstance(x, str) and query.value not in x  # type: ignore[operator]
-                    final_func = lambda x, _: (
-                        to_use_in_query.add(idx) if func(x) else None
-                    )
-                    parsed_path = (
-                        query.field_path.parse() if query.field_path is not None else []
-                    )
-                    self._run_on_path(
+                    if self._query_matches(
+                        query,
                         item,
-                        parsed_path,
                         variable_values,
                         path_tried + f"[{idx}]",
-                        final_func,
-                        True,
                         create_nonexistent,
-                    )
-                    to_use.append(to_use_in_query)
+                    ):
+                        to_use_in_query.add(idx)
+                to_use.append(to_use_in_query)
             to_use_final = set.intersection(*to_use) if to_use else {}
             failed = 0
             assertions = []
@@ -808,6 +926,28 @@ class FieldResolver:
         variables.update(self.resolve_variables(**args))  # type: ignore[arg-type]
         return variables
 
+    def path_variables(
+        self,
+        doc: dict[str, Any],
+        field_path: str | list[Union[str, QueryParser]],
+        fallback_variables: dict[str, Any] | None = None,
+    ) -> dict[str, list[Any] | set[Any]]:
+        """
+        Resolve values of the variables referenced by the FieldPath expression
+        the same way `run_func` does. Useful for evaluating the expression
+        on parts of the document separately, see `ElementRunner`.
+        :argument doc: The dictionary the variables are resolved from.
+        :argument field_path: The FieldPath expression.
+        :argument fallback_variables: Variable values resolved previously.
+        Values which already are sets are shared, not copied.
+        """
+        parsed_path = self.ensure_field_path(field_path)
+        variables = self.__cast_vars_to_sets(
+            self.__populate_variables(doc, fallback_variables, parsed_path)
+        )
+        variables_needed = self.__get_vars_from_path(parsed_path)
+        return {k: v for k, v in variables.items() if k in variables_needed}
+
     def run_func(
         self,
         doc: dict[str, Any],
@@ -852,9 +992,7 @@ class FieldResolver:
             create_nonexistent,
             create_nonexistent,
         )
-        assert (
-            len(ran_on) >= minimal_runs
-        ), "Test was not performed on any fields because no fields match given filters."
+        assert len(ran_on) >= minimal_runs, NO_FIELDS_MATCHED_MESSAGE
 
     def get_objects(
         self,
@@ -956,3 +1094,291 @@ class FieldResolver:
             self.get_objects(doc, path, fallback_variables, create_nonexistent)
         # fetch parents
         return self.get_objects(doc, path[:-1], fallback_variables, create_nonexistent)
+
+
+@dataclass
+class ElementState:
+    """
+    Outcome of evaluating a FieldPath on a part of a list, see `ElementRunner`.
+    States of disjoint parts of the list can be added up in any order,
+    errors are tracked together with the index of the element they occurred on.
+    """
+
+    runs: int = 0
+    selected: int = 0
+    failed_elements: int = 0
+    assertions: list[tuple[int, Exception]] = field(default_factory=list)
+    error: tuple[int, Exception] | None = None
+    filter_error: tuple[int, Exception] | None = None
+
+    @staticmethod
+    def __first(
+        left: tuple[int, Exception] | None, right: tuple[int, Exception] | None
+    ) -> tuple[int, Exception] | None:
+        if left is None or right is None:
+            return left or right
+        return left if left[0] <= right[0] else right
+
+    def __add__(self, other: "ElementState") -> "ElementState":
+        if not isinstance(other, ElementState):
+            raise TypeError(f"Cannot add ElementState and {type(other)}")
+        return ElementState(
+            runs=self.runs + other.runs,
+            selected=self.selected + other.selected,
+            failed_elements=self.failed_elements + other.failed_elements,
+            assertions=sorted(
+                self.assertions + other.assertions, key=lambda item: item[0]
+            ),
+            error=self.__first(self.error, other.error),
+            filter_error=self.__first(self.filter_error, other.filter_error),
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Dumps the state into a JSON-compatible dictionary.
+        Exceptions are stored by their type and arguments.
+        """
+        return {
+            "runs": self.runs,
+            "selected": self.selected,
+            "failed_elements": self.failed_elements,
+            "assertions": [_dump_indexed_error(item) for item in self.assertions],
+            "error": _dump_indexed_error(self.error),
+            "filter_error": _dump_indexed_error(self.filter_error),
+        }
+
+    @staticmethod
+    def from_dict(data: dict[str, Any]) -> "ElementState":
+        """Loads the state dumped by `to_dict`."""
+        return ElementState(
+            runs=data["runs"],
+            selected=data["selected"],
+            failed_elements=data["failed_elements"],
+            assertions=[_load_indexed_error(item) for item in data["assertions"]],  # type: ignore[misc]
+            error=_load_indexed_error(data["error"]),
+            filter_error=_load_indexed_error(data["filter_error"]),
+        )
+
+
+def _dump_indexed_error(
+    item: tuple[int, Exception] | None,
+) -> dict[str, Any] | None:
+    if item is None:
+        return None
+    idx, e = item
+    args = [
+        arg if isinstance(arg, (str, int, float, bool, type(None))) else str(arg)
+        for arg in e.args
+    ]
+    type_ = type(e)
+    type_name = type_.__qualname__
+    if type_.__module__ != "builtins":
+        type_name = f"{type_.__module__}.{type_name}"
+    return {"index": idx, "type": type_name, "args": args}
+
+
+def _load_indexed_error(
+    data: dict[str, Any] | None,
+) -> tuple[int, Exception] | None:
+    if data is None:
+        return None
+    type_name: str = data["type"]
+    type_: type[Exception]
+    if type_name == f"{FieldNotPresentError.__module__}.FieldNotPresentError":
+        type_ = FieldNotPresentError
+    elif isinstance(builtin := getattr(builtins, type_name, None), type) and issubclass(
+        builtin, Exception
+    ):
+        type_ = builtin
+    else:
+        # Recreate the type so the exception is reported the same way
+        module, _, name = type_name.rpartition(".")
+        type_ = type(name, (Exception,), {"__module__": module})
+    return data["index"], type_(*data["args"])
+
+
+class ElementRunner:
+    """
+    Executes a function on fields matching a FieldPath expression of the form
+    `field[queries].rest` while the elements of the list are passed in one by one.
+    Only the state deciding the outcome is kept, so the list does not have
+    to be held in memory. The outcome is the same as the one of
+    `FieldResolver.run_func` executed on the whole document.
+    Variables used by the FieldPath have to be resolved upfront.
+    An exhaustive runner keeps running the function after the outcome
+    is known, so all failing elements are counted.
+    """
+
+    def __init__(
+        self,
+        resolver: FieldResolver,
+        func: Callable[[Any], Any],
+        field_path: str,
+        minimal_runs: int = 1,
+        exhaustive: bool = False,
+        variable_values: dict[str, list[Any] | set[Any]] | None = None,
+    ):
+        if not self.supports(field_path, variable_values is not None):
+            raise ValueError(
+                f"FieldPath '{field_path}' cannot be evaluated element by element."
+            )
+        path = PathParser(field_path).parse()
+        if isinstance(path[0], str) and path[0] == "?":
+            path = path[1:]
+        self._resolver = resolver
+        self._func = func
+        self._minimal_runs = minimal_runs
+        self._exhaustive = exhaustive
+        self._variable_values = variable_values or {}
+        self.field_name: str = path[0]  # type: ignore[assignment]
+        self._queries = path[1].parse()  # type: ignore[union-attr]
+        self._path_remaining = path[2:]
+        self._can_fail_for_some = any(
+            query.type_ is QueryType.ANY for query in self._queries
+        )
+        self.state = ElementState()
+        # Why the outcome of a sampled evaluation is unknown, set by `finish`
+        self.inconclusive: str | None = None
+
+    @staticmethod
+    def supports(field_path: str, resolved_variables: bool = False) -> bool:
+        """
+        Can the FieldPath be evaluated element by element? It must start
+        with a field name followed by list queries. Variables can only be
+        used if their values are resolved upfront.
+        """
+        try:
+            path_parser = PathParser(field_path)
+            path = path_parser.parse()
+            variable_references = path_parser.variable_references
+        except (ValueError, AssertionError):
+            return False
+        if path and isinstance(path[0], str) and path[0] == "?":
+            path = path[1:]
+        return (
+            len(path) > 1
+            and isinstance(path[0], str)
+            and path[0] != "?"
+            and isinstance(path[1], QueryParser)
+            and (resolved_variables or not variable_references)
+        )
+
+    @property
+    def done(self) -> bool:
+        """Is the outcome decided already? Further elements are ignored then."""
+        return self.state.filter_error is not None
+
+    def __is_selected(self, idx: int, element: Any, path_tried: str) -> bool:
+        if not self._queries:
+            return False
+        selected = True
+        for query in self._queries:
+            if query.type_ in {QueryType.EACH, QueryType.ANY}:
+                continue
+            if query.type_ is QueryType.INDEX:
+                selected = selected and query.value == idx
+                continue
+            # Evaluate every filter, the resolver does not short-circuit either
+            if not self._resolver._query_matches(
+                query, element, self._variable_values, path_tried
+            ):
+                selected = False
+        return selected
+
+    def __count_and_run(self, value: Any, _: str) -> None:
+        self.state.runs += 1
+        self._func(value)
+
+    def feed(self, idx: int, element: Any) -> None:
+        """
+        Evaluate the next element of the list.
+        :argument idx: Index of the element in the list.
+        :argument element: The element itself.
+        """
+        if self.done:
+            return
+        state = self.state
+        path_tried = f".{self.field_name}[{idx}]"
+        try:
+            selected = self.__is_selected(idx, element, path_tried)
+        except Exception as e:
+            # The resolver filters the whole list before running the function,
+            # filtering errors take precedence
+            state.filter_error = (idx, e)
+            return
+        if not selected or (state.error is not None and not self._exhaustive):
+            return
+        state.selected += 1
+        try:
+            self._resolver._run_on_path(
+                element,
+                self._path_remaining,
+                self._variable_values,
+                path_tried,
+                self.__count_and_run,
+                False,
+            )
+        except (AssertionError, FieldNotPresentError) as e:
+            state.failed_elements += 1
+            if self._can_fail_for_some:
+                state.assertions.append((idx, e))
+            elif state.error is None:
+                state.error = (idx, e)
+        except Exception as e:
+            state.failed_elements += 1
+            if state.error is None:
+                state.error = (idx, e)
+
+    def merge(self, state: ElementState) -> None:
+        """Add the state of another part of the list evaluated separately."""
+        self.state = self.state + state
+
+    @property
+    def selected(self) -> int:
+        """Number of elements matching the queries so far."""
+        return self.state.selected
+
+    @property
+    def failed_elements(self) -> int:
+        """
+        Number of matching elements the function did not pass for so far.
+        Only complete if the runner is exhaustive.
+        """
+        return self.state.failed_elements
+
+    def finish(self, fraction: float = 1.0) -> None:
+        """
+        Conclude the evaluation after the last element has been passed.
+        Raises the same errors `FieldResolver.run_func` would raise.
+        :argument fraction: Portion of the list elements that were passed in.
+        If only a sample of the list was passed in, outcomes the rest
+        of the list could change are not raised, they are recorded
+        in `inconclusive` instead.
+        """
+        self.inconclusive = None
+        state = self.state
+        if state.filter_error is not None:
+            raise state.filter_error[1]
+        if state.error is not None:
+            raise state.error[1]
+        sampled = fraction < 1.0
+        if self._can_fail_for_some and state.assertions:
+            assertions = [e for _, e in state.assertions]
+            if len(assertions) >= state.selected:
+                message = (
+                    f"Check did not pass for any fields. Assertions: {assertions}, "
+                    f"path: .{self.field_name}"
+                )
+                if not sampled:
+                    raise AssertionError(message)
+                # An element outside of the sample might pass
+                self.inconclusive = message
+                return
+        if state.runs < self._minimal_runs:
+            if not sampled:
+                raise AssertionError(NO_FIELDS_MATCHED_MESSAGE)
+            # The matching elements might be outside of the sample
+            self.inconclusive = (
+                f"Only {state.runs} of the required {self._minimal_runs} "
+                f"fields were tested in the sample."
+            )
@@ -3,16 +3,16 @@ from enum import EnumType
 from pathlib import Path
 from typing import Any
 
-from sbomgrader.core.definitions import FORMAT_VALIDATION_SCHEMA_PATH, FORMAT_FILE_PATH
+from sbomgrader.core.definitions import FORMAT_FILE_PATH
 from sbomgrader.core.utils import get_mapping
 
 
 def _load_formats_file(
-    path: str | Path,
+    path: str | Path, validation_schema: str | Path | None = None
 ) -> tuple[
     type[enum.Enum], dict[enum.Enum, dict[str, Any]], dict[enum.Enum, set[enum.Enum]]
 ]:
-    format_dict = get_mapping(path, FORMAT_VALIDATION_SCHEMA_PATH)
+    format_dict = get_mapping(path, validation_schema)
     assert (
         format_dict is not None
     ), f"Please provide a valid format dict in the file '{path}'."
@@ -24,7 +24,10 @@ def _load_formats_file(
         value = format_def["value"]
         enum_dict[name] = value
 
-    ans_enum = enum.Enum("Formats", enum_dict)  # type: ignore[misc]
+    # Named after the module attribute, so the members can be pickled
+    ans_enum = enum.Enum(  # type: ignore[misc]
+        "Formats", enum_dict, module=__name__, qualname="SBOMFormat"
+    )
 
     for format_def in format_dict["formats"]:
         name = format_def["name"]
@@ -37,6 +40,7 @@ def _load_formats_file(
     return ans_enum, expected_fields_dict, fallback_dict
 
 
+# The file is part of the package, it is validated by the tests instead of on every import
 SBOMFormat, SBOM_FORMAT_DEFINITION_MAPPING, SBOM_FORMAT_FALLBACK = _load_formats_file(
     FORMAT_FILE_PATH
 )
@@ -0,0 +1,116 @@
+"""
+Frozen bundle of the built-in files. The built-in Cookbooks, Rule Sets,
+Translation Maps and formats are parsed and validated once when the package
+is built and stored in a pickle file shipped with the package. Loading
+them from the bundle skips both the YAML parsing and the validation.
+
+Each file is only loaded from the bundle if its content did not change
+since the bundle was built, all other files are loaded the usual way.
+"""
+
+import hashlib
+import pickle
+import sys
+from functools import cache
+from pathlib import Path
+from typing import Any
+
+from sbomgrader.core.definitions import (
+    COOKBOOK_VALIDATION_SCHEMA_PATH,
+    COOKBOOKS_DIR,
+    FORMAT_FILE_PATH,
+    FORMAT_VALIDATION_SCHEMA_PATH,
+    FROZEN_BUNDLE_PATH,
+    ROOT_DIR,
+    RULESET_DIR,
+    RULESET_VALIDATION_SCHEMA_PATH,
+    TRANSLATION_MAP_DIR,
+    TRANSLATION_MAP_VALIDATION_SCHEMA_PATH,
+)
+from sbomgrader.core.utils import get_mapping, is_mapping
+
+# Directories of the built-in files and the schemas validating them
+BUILT_IN_DIRS = {
+    COOKBOOKS_DIR: COOKBOOK_VALIDATION_SCHEMA_PATH,
+    RULESET_DIR: RULESET_VALIDATION_SCHEMA_PATH,
+    TRANSLATION_MAP_DIR: TRANSLATION_MAP_VALIDATION_SCHEMA_PATH,
+    FORMAT_FILE_PATH.parent: FORMAT_VALIDATION_SCHEMA_PATH,
+}
+
+
+def _digest(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def _relative(path: Path, root: Path) -> str | None:
+    try:
+        return path.absolute().relative_to(root.absolute()).as_posix()
+    except ValueError:
+        return None
+
+
+def build_frozen_bundle(
+    target: str | Path = FROZEN_BUNDLE_PATH, root: str | Path = ROOT_DIR
+) -> Path:
+    """
+    Parse and validate the built-in files and store them in the bundle.
+    :param target: Path of the bundle file to create.
+    :param root: The package directory holding the built-in files.
+    :return: Path of the created bundle.
+    """
+    target, root = Path(target), Path(root)
+    entries: dict[str, tuple[str, str, bytes]] = {}
+    for directory, validation_schema in BUILT_IN_DIRS.items():
+        directory = root / directory.relative_to(ROOT_DIR)
+        validation_schema = root / validation_schema.relative_to(ROOT_DIR)
+        for file in sorted(directory.iterdir()):
+            if not file.is_file() or not is_mapping(file):
+                continue
+            # Validated here, so that it does not need to be done at runtime
+            mapping = get_mapping(file, validation_schema, frozen=False)
+            entries[file.relative_to(root).as_posix()] = (
+                _digest(file.read_bytes()),
+                validation_schema.relative_to(root).as_posix(),
+                # Pickled separately, each load gets its own copy of the mapping
+                pickle.dumps(mapping, protocol=pickle.HIGHEST_PROTOCOL),
+            )
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with open(target, "wb") as stream:
+        pickle.dump(entries, stream, protocol=pickle.HIGHEST_PROTOCOL)
+    return target
+
+
+@cache
+def _load_bundle(bundle: Path) -> dict[str, tuple[str, str, bytes]]:
+    if not bundle.is_file():
+        return {}
+    with open(bundle, "rb") as stream:
+        return pickle.load(stream)
+
+
+def get_frozen_mapping(
+    file: Path, validation_schema: str | Path | None = None
+) -> dict[str, Any] | None:
+    """
+    Load the file from the frozen bundle.
+    :param file: Path to the file.
+    :param validation_schema: The schema the mapping should be valid against.
+    :return: The mapping, or None if the file is not in the bundle, changed
+    since the bundle was built or was validated against a different schema.
+    """
+    key = _relative(file, ROOT_DIR)
+    if key is None or key not in (bundle := _load_bundle(FROZEN_BUNDLE_PATH)):
+        return None
+    digest, bundled_schema, pickled = bundle[key]
+    if (
+        validation_schema is not None
+        and _relative(Path(validation_schema), ROOT_DIR) != bundled_schema
+    ):
+        return None
+    if _digest(file.read_bytes()) != digest:
+        return None
+    return pickle.loads(pickled)
+
+
+if __name__ == "__main__":
+    print(build_frozen_bundle(*sys.argv[1:]))
@@ -0,0 +1,122 @@
+from functools import cached_property
+from typing import Any
+
+
+class DocumentGraph:
+    """
+    Index of the elements of an SPDX or a CycloneDX document and of the
+    relationships between them. Each part of the index is built on its first
+    use with a single pass over the document, so repeated lookups do not
+    scan the document again. Changes of the document made after a part
+    of the index has been built are not reflected in it.
+
+    :param doc: Dictionary of the document.
+    """
+
+    def __init__(self, doc: dict[str, Any]):
+        self._doc = doc
+
+    ### SPDX
+
+    @cached_property
+    def _packages(self) -> dict[str, list[dict[str, Any]]]:
+        packages: dict[str, list[dict[str, Any]]] = {}
+        for package in self._doc.get("packages", []):
+            packages.setdefault(package.get("SPDXID"), []).append(package)
+        return packages
+
+    @cached_property
+    def _relationships(self) -> dict[str, dict[str, list[str]]]:
+        relationships: dict[str, dict[str, list[str]]] = {}
+        for relationship in self._doc.get("relationships", []):
+            relationships.setdefault(
+                relationship.get("relationshipType"), {}
+            ).setdefault(relationship.get("spdxElementId"), []).append(
+                relationship.get("relatedSpdxElement")
+            )
+        return relationships
+
+    @cached_property
+    def package_spdxids(self) -> set[str]:
+        """SPDXIDs of all packages."""
+        return set(self._packages)
+
+    @cached_property
+    def related_spdxids(self) -> set[str]:
+        """SPDXIDs of all elements on either side of a relationship."""
+        spdxids: set[str] = set()
+        for adjacency in self._relationships.values():
+            spdxids.update(adjacency)
+            for related in adjacency.values():
+                spdxids.update(related)
+        return spdxids
+
+    def package(self, spdxid: str) -> dict[str, Any] | None:
+        """The first package with the SPDXID, None if there is no such package."""
+        return next(iter(self._packages.get(spdxid, [])), None)
+
+    def package_purls(self, spdxid: str) -> list[str]:
+        """Purls of the packages with the SPDXID."""
+        return [
+            ref.get("referenceLocator")
+            for package in self._packages.get(spdxid, [])
+            for ref in package.get("externalRefs", [])
+            if ref.get("referenceType") == "purl"
+        ]
+
+    def related(self, spdxid: str, relationship_type: str) -> list[str]:
+        """
+        SPDXIDs of the elements the element is in relationship of the type with,
+        in the order of the relationships.
+        :param spdxid: SPDXID of the element on the left side of the relationships.
+        :param relationship_type: E.g. `CONTAINS` or `DESCRIBES`.
+        """
+        return self._relationships.get(relationship_type, {}).get(spdxid, [])
+
+    ### CycloneDX
+
+    @cached_property
+    def _components(self) -> dict[str, dict[str, Any]]:
+        components: dict[str, dict[str, Any]] = {}
+        to_visit = list(reversed(self._doc.get("components", [])))
+        while to_visit:
+            component = to_visit.pop()
+            if "bom-ref" in component:
+                components.setdefault(component["bom-ref"], component)
+            to_visit.extend(reversed(component.get("components", [])))
+        return components
+
+    @cached_property
+    def _dependencies(self) -> dict[str, dict[str, list[str]]]:
+        dependencies: dict[str, dict[str, list[str]]] = {}
+        for dependency in self._doc.get("dependencies", []):
+            for key in "dependsOn", "provides":
+                dependencies.setdefault(key, {}).setdefault(
+                    dependency.get("ref"), []
+                ).extend(dependency.get(key, []))
+        return dependencies
+
+    @cached_property
+    def related_bom_refs(self) -> set[str]:
+        """Bom-refs of all components mentioned in the dependencies."""
+        bom_refs: set[str] = set()
+        for adjacency in self._dependencies.values():
+            bom_refs.update(adjacency)
+            for related in adjacency.values():
+                bom_refs.update(related)
+        return bom_refs
+
+    def component(self, bom_ref: str) -> dict[str, Any] | None:
+        """
+        The first component with the bom-ref, nested components included.
+        None if there is no such component.
+        """
+        return self._components.get(bom_ref)
+
+    def depends_on(self, bom_ref: str) -> list[str]:
+        """Bom-refs of the components the component depends on."""
+        return self._dependencies.get("dependsOn", {}).get(bom_ref, [])
+
+    def provides(self, bom_ref: str) -> list[str]:
+        """Bom-refs of the components the component provides."""
+        return self._dependencies.get("provides", {}).get(bom_ref, [])
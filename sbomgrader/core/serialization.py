@@ -0,0 +1,89 @@
+"""
+Loading and dumping of JSON and YAML. Faster implementations are used for
+loading when they are available: the libyaml bindings of PyYAML and the
+optional package `orjson` (`sbomgrader[fast]`). The results are the same
+as the ones of the standard library and of the pure-Python PyYAML.
+"""
+
+import json
+from typing import IO, Any, Iterator
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    # PyYAML was built without libyaml
+    from yaml import SafeLoader  # type: ignore[assignment]
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
+
+def yaml_load(stream: str | IO[str]) -> Any:
+    """Same as `yaml.safe_load`."""
+    return yaml.load(stream, Loader=SafeLoader)
+
+
+def yaml_load_all(stream: str | IO[str]) -> Iterator[Any]:
+    """Same as `yaml.safe_load_all`."""
+    return yaml.load_all(stream, Loader=SafeLoader)
+
+
+def yaml_dump(data: Any) -> str:
+    """Same as `yaml.dump`."""
+    # Not `CDumper`, libyaml folds long quoted strings differently
+    return yaml.dump(data, Dumper=yaml.Dumper)
+
+
+# Maps ASCII digits to "0", the characters which can precede a number,
+# i.e. `[`, `:`, `,`, `-` and whitespace, to " " and all other bytes to "x"
+_NUMBERS_TABLE = bytes(
+    ord("0") if char.isdigit() else ord(" ") if char in "[:,- \t\n\r" else ord("x")
+    for char in map(chr, range(128))
+)
+_NUMBERS_TABLE += b"x" * 128
+# Integers of 19 digits already might not fit in 64 bits, if they are negative
+_LONG_NUMBER = b" " + b"0" * 19
+# The text is checked by parts, so that only small copies of it are made
+_CHECKED_PART_SIZE = 1 << 20
+
+
+def _may_have_long_integer(text: str | bytes) -> bool:
+    """
+    orjson turns integers wider than 64 bits to floats, the standard library
+    keeps them. A quick check for runs of at least 19 digits in the place
+    of a number. Runs of digits in strings, e.g. in checksums, mostly follow
+    other characters and are skipped.
+    """
+    for offset in range(0, len(text), _CHECKED_PART_SIZE):
+        # Overlapping, so that runs crossing the border are found
+        part = text[max(0, offset - len(_LONG_NUMBER)) : offset + _CHECKED_PART_SIZE]
+        if isinstance(part, str):
+            part = part.encode(errors="surrogatepass")
+        if not offset:
+            # A number at the start of the document
+            part = b" " + part
+        if _LONG_NUMBER in part.translate(_NUMBERS_TABLE):
+            return True
+    return False
+
+
+def json_loads(text: str | bytes) -> Any:
+    """Same as `json.loads`."""
+    if orjson is not None and not _may_have_long_integer(text):
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            # orjson rejects some documents the standard library accepts,
+            # e.g. ones with NaN or lone surrogates.
+            # The standard library also raises the same errors as before.
+            pass
+    return json.loads(text)
+
+
+def json_load(stream: IO[str]) -> Any:
+    """Same as `json.load`."""
+    return json_loads(stream.read())
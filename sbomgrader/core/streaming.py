@@ -0,0 +1,213 @@
+import json
+import re
+from json import JSONDecodeError
+from typing import Any, Generator, Iterator, TextIO
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_DELIMITER = re.compile(r"[ \t\n\r]*[,:\]}]")
+_DECODER = json.JSONDecoder()
+
+
+class _Buffer:
+    """Text buffer refilled from a stream on demand."""
+
+    def __init__(self, stream: TextIO, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """
+        Read more data from the stream, drop the already consumed text.
+        The amount of data read grows with the size of the unconsumed text
+        so decoding of large values does not become quadratic.
+        Returns False if the stream is exhausted.
+        """
+        if self.eof:
+            return False
+        remaining = self.text[self.pos :]
+        chunk = self._stream.read(max(self._chunk_size, len(remaining)))
+        if not chunk:
+            self.eof = True
+            return False
+        self.text = remaining + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Returns the next non-whitespace character without consuming it."""
+        while True:
+            self.pos = _WHITESPACE.match(self.text, self.pos).end()  # type: ignore[union-attr]
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, chars: str) -> str:
+        """Consumes and returns the next non-whitespace character if it is one of `chars`."""
+        char = self.peek()
+        if not char or char not in chars:
+            raise JSONDecodeError(
+                f"Expecting one of {', '.join(repr(c) for c in chars)}",
+                self.text,
+                self.pos,
+            )
+        self.pos += 1
+        return char
+
+    def decode(self) -> Any:
+        """Decodes the next JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.text, self.pos)
+            except JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            if not _DELIMITER.match(self.text, end) and self.fill():
+                # The value might continue in the next chunk (e.g. a number)
+                continue
+            self.pos = end
+            return value
+
+
+class Section:
+    """
+    A single top-level field of a JSON document being read.
+    The value is either loaded whole, iterated element by element
+    (for lists) or skipped without keeping it in memory.
+    """
+
+    def __init__(self, key: str, buffer: _Buffer):
+        self.key = key
+        self._buffer = buffer
+        self._elements: Iterator[Any] | None = None
+        self._consumed = False
+
+    @property
+    def is_list(self) -> bool:
+        """Is the value of this section a list?"""
+        if self._elements is not None:
+            return True
+        return not self._consumed and self._buffer.peek() == "["
+
+    def elements(self) -> Iterator[Any]:
+        """Iterates over the elements of a list section one at a time."""
+        if self._elements is None:
+            if self._consumed or not self.is_list:
+                raise ValueError(f"Section '{self.key}' cannot be iterated.")
+            self._elements = self.__iter_elements()
+        return self._elements
+
+    def __iter_elements(self) -> Generator[Any, None, None]:
+        self._buffer.expect("[")
+        if self._buffer.peek() == "]":
+            self._buffer.pos += 1
+            self._consumed = True
+            return
+        while True:
+            yield self._buffer.decode()
+            if self._buffer.expect(",]") == "]":
+                break
+        self._consumed = True
+
+    def load(self) -> Any:
+        """Loads the whole value of the section."""
+        if self.is_list:
+            return list(self.elements())
+        if self._consumed:
+            raise ValueError(f"Section '{self.key}' has already been read.")
+        value = self._buffer.decode()
+        self._consumed = True
+        return value
+
+    def skip(self) -> None:
+        """Reads over the rest of the section, discarding the values."""
+        if self.is_list:
+            for _ in self.elements():
+                pass
+        elif not self._consumed:
+            self.load()
+
+
+def iter_sections(
+    stream: TextIO, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Generator[Section, None, None]:
+    """
+    Iterates over top-level fields of a JSON object read from the stream.
+    Sections which are not read by the consumer are skipped once the
+    iteration continues, only one element of them is kept in memory at a time.
+    """
+    buffer = _Buffer(stream, chunk_size)
+    buffer.expect("{")
+    if buffer.peek() == "}":
+        buffer.pos += 1
+    else:
+        yield from _iter_fields(buffer)
+    if buffer.peek():
+        raise JSONDecodeError("Extra data", buffer.text, buffer.pos)
+
+
+def _iter_fields(buffer: _Buffer) -> Generator[Section, None, None]:
+    while True:
+        key = buffer.decode()
+        if not isinstance(key, str):
+            raise JSONDecodeError("Expecting property name", buffer.text, buffer.pos)
+        buffer.expect(":")
+        section = Section(key, buffer)
+        yield section
+        section.skip()
+        if buffer.expect(",}") == "}":
+            break
+
+
+def load_sections(
+    stream: TextIO,
+    sections: set[str] | None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> dict[str, Any]:
+    """
+    Loads a JSON object from the stream keeping only the selected top-level fields.
+    :argument stream: Text stream containing a JSON object.
+    :argument sections: Names of top-level fields to load. `None` loads all of them.
+    :argument chunk_size: How many characters to read from the stream at once.
+    """
+    doc = {}
+    for section in iter_sections(stream, chunk_size):
+        if sections is None or section.key in sections:
+            doc[section.key] = section.load()
+    return doc
+
+
+def dump(
+    obj: Any,
+    stream: TextIO,
+    indent: int | None = 4,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> None:
+    """
+    Write the object as JSON to the stream. The text is written in chunks
+    as it is encoded, the whole of it is never held in memory.
+    :param obj: Object to serialize.
+    :param stream: Text stream to write to, e.g. an open file or stdout.
+    :param indent: Indentation of the output. If None, the output is compact,
+    without any whitespace.
+    :param chunk_size: Approximate number of characters written at once.
+    """
+    separators = (",", ":") if indent is None else None
+    encoder = json.JSONEncoder(indent=indent, separators=separators)
+    pending: list[str] = []
+    pending_size = 0
+    for part in encoder.iterencode(obj):
+        pending.append(part)
+        pending_size += len(part)
+        if pending_size >= chunk_size:
+            stream.write("".join(pending))
+            pending = []
+            pending_size = 0
+    stream.write("".join(pending))
@@ -1,48 +1,188 @@
 import datetime
-import json
+import functools
+import io
 import logging
 import sys
+import threading
+from contextlib import ExitStack, contextmanager
 from enum import Enum
 from json import JSONDecodeError
 from pathlib import Path
-from typing import Any, Literal
+from typing import IO, TYPE_CHECKING, Any, Iterator, Literal
 
-import jinja2
 import yaml
-from jsonschema import validate
 from yaml import YAMLError
 
 from sbomgrader.core.cached_python_loader import PythonLoader
-from sbomgrader.core.definitions import FIELD_NOT_PRESENT, TIME_ISO_FORMAT_STRING
+from sbomgrader.core.definitions import (
+    COMPRESSION_SUFFIXES,
+    FIELD_NOT_PRESENT,
+    STDIN_PATH,
+    TIME_ISO_FORMAT_STRING,
+    OperationCancelledError,
+)
 from sbomgrader.core.enums import Grade
-from sbomgrader import __version__ as version
+from sbomgrader.core.serialization import json_load, json_loads, yaml_load
+from sbomgrader.core.streaming import load_sections
+
+if TYPE_CHECKING:
+    import jinja2
 
 LOGGER = logging.getLogger(__name__)
 
 
+def strip_compression_suffix(name: str) -> str:
+    """Name of the file without the suffix of a compression, see `COMPRESSION_SUFFIXES`."""
+    for suffix in COMPRESSION_SUFFIXES:
+        if name.endswith(suffix):
+            return name.removesuffix(suffix)
+    return name
+
+
 def is_mapping(file: str | Path) -> bool:
     name = file if isinstance(file, str) else file.name
+    name = strip_compression_suffix(name)
     return name.endswith(".json") or name.endswith(".yml") or name.endswith(".yaml")
 
 
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+class _ZstdReader(io.RawIOBase):
+    """
+    Decompresses a stream of Zstandard frames. A stream ending in the middle
+    of a frame raises an EOFError, the same way truncated gzip files do.
+    """
+
+    def __init__(self, stream: IO[bytes], zstandard: Any):
+        self._stream = stream
+        self._decompressor = zstandard.ZstdDecompressor()
+        self._frame = self._decompressor.decompressobj()
+        self._in_frame = False
+        self._unused = b""
+        self._pending = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        while not self._pending:
+            chunk = self._unused or self._stream.read(io.DEFAULT_BUFFER_SIZE)
+            self._unused = b""
+            if not chunk:
+                if self._in_frame:
+                    raise EOFError(
+                        "Compressed file ended before the end of the last frame."
+                    )
+                return 0
+            if self._frame.eof:
+                self._frame = self._decompressor.decompressobj()
+            self._in_frame = True
+            self._pending = memoryview(self._frame.decompress(chunk))
+            if self._frame.eof:
+                self._in_frame = False
+                self._unused = self._frame.unused_data
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+def _decompressed(
+    stream: IO[bytes], name: str, stack: ExitStack
+) -> tuple[IO[bytes], tuple[type[Exception], ...]]:
+    """
+    Wrap the stream so that it is decompressed while it is read. The compression
+    is determined by the file name and by the first bytes of the stream.
+    :return: The wrapped stream and the errors raised while reading it
+    if the compressed data are broken.
+    """
+    if not hasattr(stream, "peek"):
+        stream = io.BufferedReader(stream)  # type: ignore[type-var]
+    magic = stream.peek(len(_ZSTD_MAGIC))  # type: ignore[attr-defined]
+    if name.endswith(".gz") or magic.startswith(_GZIP_MAGIC):
+        import gzip
+        import zlib
+
+        gzip_file = gzip.GzipFile(fileobj=stream, mode="rb")
+        errors = (EOFError, gzip.BadGzipFile, zlib.error)
+        return stack.enter_context(gzip_file), errors  # type: ignore[arg-type]
+    if name.endswith(".zst") or magic.startswith(_ZSTD_MAGIC):
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ValueError(
+                "Reading Zstandard compressed files requires the package 'zstandard', "
+                "install 'sbomgrader[zstd]'."
+            ) from e
+        # Buffered, so that the beginning of the content can be peeked
+        reader = io.BufferedReader(_ZstdReader(stream, zstandard))
+        return stack.enter_context(reader), (EOFError, zstandard.ZstdError)
+    return stream, ()
+
+
+@contextmanager
+def open_input(file: str | Path) -> Iterator[io.TextIOWrapper]:
+    """
+    Open a file for reading text. Files compressed with gzip or Zstandard
+    are decompressed while they are read, nothing is written to the disk.
+    Broken compressed data raise a ValueError while the file is read.
+
+    :argument file: Path to the file, or `-` for the standard input.
+    The standard input is not closed.
+    """
+    with ExitStack() as stack:
+        name = str(file)
+        if name == STDIN_PATH:
+            stream: IO[bytes] = sys.stdin.buffer
+        else:
+            stream = stack.enter_context(open(file, "rb"))
+        decompressed, errors = _decompressed(stream, name, stack)
+        text = io.TextIOWrapper(decompressed, encoding="utf-8")
+        # The wrapped streams are closed by the stack, the standard input is kept open
+        stack.callback(text.detach)
+        try:
+            yield text
+        except errors as e:
+            raise ValueError(f"Could not decompress '{name}': {e}") from e
+
+
+def _is_json_input(file: str | Path, stream: io.TextIOWrapper) -> bool:
+    name = str(file)
+    if name != STDIN_PATH:
+        return strip_compression_suffix(name).endswith(".json")
+    # The standard input has no name, JSON documents start with an object or an array
+    start = stream.buffer.peek(64).lstrip()  # type: ignore[attr-defined]
+    return start[:1] in (b"{", b"[")
+
+
 def get_mapping(
-    schema: str | Path, validation_schema: str | Path | None = None
+    schema: str | Path,
+    validation_schema: str | Path | None = None,
+    sections: set[str] | None = None,
+    frozen: bool = True,
 ) -> dict | None:
     """
     Load a mapping from a JSON/YAML file, optionally validate it with a JSONSchema.
-    This function can also load the mapping from a string.
+    This function can also load the mapping from a string or the standard input.
 
-    :argument schema: The mapping to load. Can hold the string-serialized mapping
-    or a path to a JSON or YAML file.
+    :argument schema: The mapping to load. Can hold the string-serialized mapping,
+    a path to a JSON or YAML file, which can be compressed (see `open_input`),
+    or `-` to read the standard input.
     :argument validation_schema: The JSONSchema used for validation of the first mapping.
+    :argument sections: Top-level fields to load from JSON files. Other fields
+    are skipped while the file is read. Loads the whole mapping if omitted.
+    :argument frozen: Load built-in files from the frozen bundle if possible,
+    see `sbomgrader.core.frozen`. These were validated when the bundle was built.
     """
     doc = {}
     try:
-        if isinstance(schema, str):
+        if isinstance(schema, str) and schema != STDIN_PATH:
             if schema.startswith("---"):
-                doc = yaml.safe_load(schema)
+                doc = yaml_load(schema)
             elif schema.startswith("{"):
-                doc = json.loads(schema)
+                doc = json_loads(schema)
             else:
                 schema = Path(schema)
     except (JSONDecodeError, YAMLError):
@@ -54,19 +194,52 @@ def get_mapping(
     if isinstance(schema, Path):
         if not schema.exists() or not is_mapping(schema):
             return None
-        with open(schema) as stream:
-            if schema.name.endswith(".json"):
-                doc = json.load(stream)
-            elif schema.name.endswith(".yml") or schema.name.endswith(".yaml"):
-                doc = yaml.safe_load(stream)
+        if frozen and sections is None:
+            from sbomgrader.core.frozen import get_frozen_mapping
+
+            if (
+                frozen_doc := get_frozen_mapping(schema, validation_schema)
+            ) is not None:
+                return frozen_doc
+    if isinstance(schema, Path) or schema == STDIN_PATH:
+        with open_input(schema) as stream:
+            if _is_json_input(schema, stream):
+                if sections is None:
+                    doc = json_load(stream)
+                else:
+                    doc = load_sections(stream, sections)
+            else:
+                doc = yaml_load(stream)
 
     if not doc:
         raise ValueError(f"Invalid mapping: '{schema}'.")
     if validation_schema:
-        validate(doc, get_mapping(validation_schema))  # type: ignore[arg-type]
+        _validator(Path(validation_schema)).validate(doc)
     return doc
 
 
+@functools.cache
+def _validator(validation_schema: Path) -> Any:
+    """JSONSchema validator of the schema file, the schema is only checked once."""
+    # Slow to import, not needed to only read documents
+    from jsonschema.validators import validator_for
+
+    schema: Any = get_mapping(validation_schema)
+    validator_class = validator_for(schema)
+    validator_class.check_schema(schema)
+    return validator_class(schema)
+
+
+def raise_if_cancelled(cancel: threading.Event | None) -> None:
+    """
+    Check if the running operation should stop, see `sbomgrader.core.aio`.
+    :argument cancel: Event set when the operation is cancelled.
+    :raises OperationCancelledError: If the event is set.
+    """
+    if cancel is not None and cancel.is_set():
+        raise OperationCancelledError("The operation was cancelled.")
+
+
 def get_path_to_implementations(schema_path: str | Path) -> Path:
     """Get a relative path to the module containing test implementation functions of this Rule Set."""
     if isinstance(schema_path, str):
@@ -138,8 +311,19 @@ def validation_passed(validation_grade: Grade, minimal_grade: Grade) -> bool:
     return Grade.compare(validation_grade, minimal_grade) < 1
 
 
-def create_jinja_env(transformer_file: Path | None = None) -> jinja2.Environment:
-    """Creates a Jinja2 environment with additional filters. Used in Translation Maps."""
+def create_jinja_env(
+    transformer_file: Path | None = None, transformers: PythonLoader | None = None
+) -> "jinja2.Environment":
+    """
+    Creates a Jinja2 environment with additional filters. Used in Translation Maps.
+    :argument transformer_file: File with the functions of the `func` filter.
+    :argument transformers: Loader of the functions of the `func` filter.
+    Share it between environments so the file is only executed once.
+    """
+    import jinja2
+
+    from sbomgrader import __version__ as version
+
     env = jinja2.Environment()
     env.globals["DATETIME_NOW"] = datetime.datetime.now(datetime.UTC).strftime(
         TIME_ISO_FORMAT_STRING
@@ -187,14 +371,16 @@ def create_jinja_env(transformer_file: Path | None = None) -> jinja2.Environment
     env.filters["slice"] = sliced
     env.filters["fallback"] = fallback
     env.filters["unify"] = unify
-    if transformer_file and transformer_file.exists():
+    if transformers is None and transformer_file and transformer_file.exists():
+        transformers = PythonLoader(transformer_file)
+    if transformers is not None:
+        python_loader = transformers
 
         def func(item: Any, name: str, **kwargs) -> Any:
-            python_loader = PythonLoader(transformer_file)
             func_to_run = python_loader.load_func(name)
             if func_to_run is None:
                 LOGGER.warning(
-                    f"Could not run function {name}, it is not located in {transformer_file}!"
+                    f"Could not run function {name}, it is not located in {python_loader.file_references}!"
                 )
                 return
             return func_to_run(item, **kwargs)
@@ -1,20 +1,27 @@
 import json
 import logging
 import sys
+import threading
+from concurrent.futures import Executor
 from copy import copy
-from dataclasses import fields, dataclass, field
+from dataclasses import dataclass, field
+from functools import cached_property
 from pathlib import Path
 from typing import Iterable, Any, Generator
 
-import jsonschema.exceptions
-import yaml
 
 from sbomgrader.grade.cookbooks import Cookbook, CookbookResult
 from sbomgrader.core.definitions import COOKBOOKS_DIR
 from sbomgrader.core.documents import Document
 from sbomgrader.core.enums import SBOMType, SBOMTime, OutputType, Grade
+from sbomgrader.core.serialization import yaml_dump
 from sbomgrader.grade.rules import RuleSet, Result
-
+from sbomgrader.grade.sampling import Sampling
+from sbomgrader.grade.sharding import (
+    create_shards,
+    grade_sharded,
+    merge_shard_results,
+)
 
 LOGGER = logging.getLogger(__name__)
 
@@ -28,6 +35,11 @@ class CookbookBundleResult:
         if o_type in {OutputType.MARKDOWN, OutputType.VISUAL}:
             ans = "# Cookbook bundle result\n\n"
             ans += f"**Grade: {self.grade.value}**\n\n"
+            if self.is_sampled:
+                ans += (
+                    "*Some rules were evaluated on a sample of the document, "
+                    "the grade is an estimate.*\n\n"
+                )
             ans += "## Used cookbooks\n\n"
             for cookbook_result in self.cookbook_results:
                 ans += f"- {cookbook_result.cookbook.name}\n"
@@ -39,9 +51,14 @@ class CookbookBundleResult:
             return ans
         if o_type is OutputType.JSON:
             return json.dumps(self.to_dict(), indent=4)
-        return yaml.dump(self.to_dict())
+        return yaml_dump(self.to_dict())
 
     @property
+    def is_sampled(self) -> bool:
+        """Were some of the rules evaluated only on a sample of the document?"""
+        return any(x.is_sampled for x in self.cookbook_results)
+
+    @cached_property
     def grade(self) -> Grade:
         if decisive_cookbook := self.cookbook_bundle.decisive_cookbook:
             cookbook_result: CookbookResult = next(
@@ -67,6 +84,8 @@ class CookbookBundleResult:
         }
         for cookbook_result in self.cookbook_results:
             result_dict["cookbook_results"].append(cookbook_result.to_dict())
+        if self.is_sampled:
+            result_dict["sampled"] = True
         return result_dict
 
     def __iter__(self):
@@ -101,27 +120,106 @@ class CookbookBundle:
             ruleset += cookbook.ruleset
         return ruleset
 
-    def __call__(self, doc: Document) -> CookbookBundleResult:
+    @property
+    def referenced_fields(self) -> set[str] | None:
+        """
+        Top-level document fields read by the rules of all cookbooks.
+        Returns None if the whole document is needed.
+        """
+        return self.ruleset.referenced_fields
+
+    def __call__(
+        self, doc: Document, cancel: threading.Event | None = None
+    ) -> CookbookBundleResult:
         """
         Execute the CookbookBundle on an SBOM object instance.
         :param doc: SBOM Document.
+        :param cancel: Event which stops the grading before the next rule once set.
         :return: Result of running the Cookbook.
         """
-        result = self.ruleset(doc)
-        ans = []
-        for cookbook in self.cookbooks:
-            kwargs: dict[str, dict[Any, Any] | set[Any]] = {}
-            for attr_obj in fields(Result):
-                attr = attr_obj.name
-                attr_value = getattr(result, attr)
-                if isinstance(attr_value, dict):
-                    kwargs[attr] = {
-                        k: v for k, v in attr_value.items() if k in cookbook
-                    }
-                else:
-                    kwargs[attr] = {v for v in attr_value if v in cookbook}
-            new_result = Result(**kwargs)  # type: ignore[arg-type]
-            ans.append(CookbookResult(new_result, cookbook))
+        return self.project(self.ruleset(doc, cancel))
+
+    async def grade_async(
+        self, doc: Document | str | Path, executor: Executor | None = None
+    ) -> CookbookBundleResult:
+        """
+        Execute the CookbookBundle without blocking the event loop. The grading,
+        as well as reading the file, runs in the executor. Cancelling the awaiting
+        task stops the grading before the next rule.
+        :param doc: SBOM Document or a path to a JSON or YAML SBOM file.
+        Only the sections the cookbooks reference are loaded from JSON files.
+        :param executor: Executor to grade in, see `sbomgrader.core.aio.run_cancellable`.
+        :return: Result of running the Cookbook.
+        """
+        # Imports asyncio, which is only needed by the asynchronous API
+        from sbomgrader.core.aio import run_cancellable
+
+        if isinstance(doc, Document):
+            return await run_cancellable(self, doc, executor=executor)
+        return await run_cancellable(self.__grade_file, doc, executor=executor)
+
+    def __grade_file(
+        self, file: str | Path, cancel: threading.Event | None = None
+    ) -> CookbookBundleResult:
+        return self(Document.from_file(file, self.referenced_fields), cancel)
+
+    def stream(
+        self, file: str | Path, sampling: Sampling | None = None
+    ) -> CookbookBundleResult:
+        """
+        Execute the CookbookBundle on a JSON file without loading it whole.
+        See `RuleSet.stream`.
+        :param file: Path to the JSON SBOM file, which can be compressed.
+        :param sampling: Evaluate per-element rules only on a sample of the elements.
+        :return: Result of running the Cookbook.
+        """
+        return self.project(self.ruleset.stream(file, sampling=sampling))
+
+    def grade_sharded(self, doc: Document, shards: int) -> CookbookBundleResult:
+        """
+        Execute the CookbookBundle on an SBOM, evaluating rules which check list
+        elements one by one on shards of the lists in separate processes.
+        See `sbomgrader.grade.sharding.grade_sharded`.
+        :param doc: SBOM Document.
+        :param shards: Number of shards of each list, as well as worker processes.
+        :return: Result of running the Cookbook.
+        """
+        return self.project(grade_sharded(self.cookbooks, doc, shards))
+
+    def create_shards(self, doc: Document, shards: int) -> list[dict[str, Any]]:
+        """
+        Split the grading of an SBOM into self-contained shards which can be graded
+        on other machines. See `sbomgrader.grade.sharding.create_shards`.
+        :param doc: SBOM Document.
+        :param shards: Number of shards of each list.
+        :return: JSON-compatible dictionaries of the shards.
+        """
+        return create_shards(self.cookbooks, self.decisive_cookbook, doc, shards)
+
+    @staticmethod
+    def merge_shard_results(
+        shard_results: Iterable[dict[str, Any]],
+    ) -> CookbookBundleResult:
+        """
+        Combine the results of graded shards created by `create_shards`.
+        See `sbomgrader.grade.sharding.merge_shard_results`.
+        :param shard_results: Results of all the shards, in any order.
+        :return: Result of running the Cookbook on the whole SBOM.
+        """
+        cookbooks, decisive_cookbook, result = merge_shard_results(shard_results)
+        return CookbookBundle(cookbooks, decisive_cookbook).project(result)
+
+    def project(self, result: Result) -> CookbookBundleResult:
+        """
+        Split the Result of the combined RuleSet to results of individual Cookbooks.
+        All cookbooks share the same Result, each of them only looks up its own rules.
+        :param result: Result of running the RuleSet of this CookbookBundle.
+        :return: Result of running the CookbookBundle.
+        """
+        ans = [
+            CookbookResult(result.subset(cookbook.all_used_rule_names), cookbook)
+            for cookbook in self.cookbooks
+        ]
         return CookbookBundleResult(self, ans)
 
     @staticmethod
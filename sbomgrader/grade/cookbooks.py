@@ -1,14 +1,15 @@
 import json
 import logging
 import sys
+import threading
 from dataclasses import dataclass
+from functools import cached_property
 from pathlib import Path
 from typing import Iterable, Any
 
-import jsonschema
-import yaml
 
 from sbomgrader.core.enums import Grade, RuleForce, OutputType, ResultType
+from sbomgrader.core.serialization import yaml_dump
 from sbomgrader.core.utils import get_mapping
 from sbomgrader.core.definitions import (
     COOKBOOK_VALIDATION_SCHEMA_PATH,
@@ -27,11 +28,16 @@ class CookbookResult:
     result: Result
     cookbook: "Cookbook"
 
+    @cached_property
+    def _details(self) -> dict[str, ResultDetail]:
+        """Details of all rules used by the cookbook, indexed by the rule name."""
+        return {
+            rule_name: self.result.get(rule_name)
+            for rule_name in self.cookbook.all_used_rule_names
+        }
+
     def __get_by_force(self, force: RuleForce) -> Iterable[ResultDetail]:
-        return [
-            self.result.get(name)
-            for name in getattr(self.cookbook, force.value.lower())
-        ]
+        return [self.get(name) for name in getattr(self.cookbook, force.value.lower())]
 
     @property
     def must(self) -> Iterable[ResultDetail]:
@@ -45,7 +51,7 @@ class CookbookResult:
     def may(self) -> Iterable[ResultDetail]:
         return self.__get_by_force(RuleForce.MAY)
 
-    @property
+    @cached_property
     def grade(self) -> Grade:
         unsuccessful = self.get_unsuccessful()
         if unsuccessful.must:
@@ -55,34 +61,46 @@ class CookbookResult:
             grade = Grade.lower(grade)
         return grade
 
-    def get(self, rule_name: str):
+    def get(self, rule_name: str) -> ResultDetail:
+        if rule_name in self._details:
+            return self._details[rule_name]
         return self.result.get(rule_name)
 
-    def get_unsuccessful(self) -> "CookbookResult":
-
-        failed = self.result.failed
-        error = self.result.errors
-        unsuccessful = set(failed.keys())
-        unsuccessful.update(error.keys())
-        new_must = set(filter(lambda x: x in unsuccessful, self.cookbook.must))
-        new_should = set(filter(lambda x: x in unsuccessful, self.cookbook.should))
-        new_may = set(filter(lambda x: x in unsuccessful, self.cookbook.may))
+    @cached_property
+    def _unsuccessful(self) -> "CookbookResult":
+        unsuccessful = {
+            rule_name
+            for rule_name in self.cookbook.all_used_rule_names
+            if rule_name in self.result.failed or rule_name in self.result.errors
+        }
         return CookbookResult(
-            Result(unsuccessful, failed, error),
+            self.result.subset(unsuccessful),
             Cookbook(
                 self.cookbook.name,
                 self.cookbook.ruleset_names,
-                new_must,
-                new_should,
-                new_may,
+                self.cookbook.must & unsuccessful,
+                self.cookbook.should & unsuccessful,
+                self.cookbook.may & unsuccessful,
             ),
         )
 
+    def get_unsuccessful(self) -> "CookbookResult":
+        return self._unsuccessful
+
+    @property
+    def is_sampled(self) -> bool:
+        """Were some of the rules evaluated only on a sample of the document?"""
+        return any(
+            rule_name in self.result.sampled
+            for rule_name in self.cookbook.all_used_rule_names
+        )
+
     def output(self, o_type: OutputType) -> str:
         if o_type in {OutputType.VISUAL, OutputType.MARKDOWN}:
             ans = f"# Cookbook: {self.cookbook.name}\n"
             ans += "\n## Summary\n"
-            ans += f"\nAchieved grade: {self.grade.value}\n"
+            ans += f"\nAchieved grade: {self.grade.value}"
+            ans += " (estimated from a sample)\n" if self.is_sampled else "\n"
             for force in RuleForce:
                 rules_in_force = self.__get_by_force(force)
                 implemented_rules_in_force = [
@@ -97,7 +115,8 @@ class CookbookResult:
                     detail = self.get(result_detail.rule_name)
                     if detail.result_type is ResultType.NOT_APPLICABLE:
                         continue
-                    ans += f"- {result_detail.rule_name} {ResultType.get_visual(detail.result_type)}\n"
+                    ans += f"- {result_detail.rule_name} {ResultType.get_visual(detail.result_type)}"
+                    ans += " (sampled)\n" if detail.estimate else "\n"
             unsuccessful = self.get_unsuccessful()
             if unsuccessful.cookbook.all_used_rule_names:
                 ans += "\n## Failure details\n\n"
@@ -109,11 +128,17 @@ class CookbookResult:
                         ans += f"\n### {rule}\n\n"
                         detail = self.get(rule)
                         ans += f"{detail.result_detail}\n"
+            if self.is_sampled:
+                ans += "\n## Sampling estimates\n\n"
+                for rule in sorted(self.cookbook.all_used_rule_names):
+                    detail = self.get(rule)
+                    if detail.estimate:
+                        ans += f"\n### {rule}\n\n{detail.estimate}\n"
 
             return ans
         if o_type is OutputType.JSON:
             return json.dumps(self.to_dict(), indent=4)
-        return yaml.dump(self.to_dict())
+        return yaml_dump(self.to_dict())
 
     def to_dict(self) -> dict[str, Any]:
         dict_result: dict[str, Any] = {
@@ -127,6 +152,12 @@ class CookbookResult:
                 dict_result[force.value][result_detail.rule_name][
                     result_detail.result_type.value
                 ] = result_detail.result_detail
+                if result_detail.estimate:
+                    dict_result[force.value][result_detail.rule_name][
+                        "estimate"
+                    ] = result_detail.estimate
+        if self.is_sampled:
+            dict_result["sampled"] = True
         return dict_result
 
 
@@ -143,6 +174,7 @@ class Cookbook:
         self.ruleset_names = ruleset_names
         self._initialized_ruleset: RuleSet = RuleSet()
         self.__is_initialized: bool = False
+        self.__lock = threading.Lock()
         self.must = set(must)
         self.should = set(should)
         self.may = set(may)
@@ -152,6 +184,19 @@ class Cookbook:
         self._initialize()
         return self._initialized_ruleset
 
+    def __getstate__(self) -> dict[str, Any]:
+        # Loaded rules hold functions which cannot be pickled,
+        # the RuleSet is loaded again after unpickling
+        state = self.__dict__.copy()
+        state["_initialized_ruleset"] = RuleSet()
+        state["_Cookbook__is_initialized"] = False
+        del state["_Cookbook__lock"]
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.__lock = threading.Lock()
+
     def __contains__(self, item):
         return item in self.must or item in self.should or item in self.may
 
@@ -168,32 +213,34 @@ class Cookbook:
     def _initialize(self):
         if self.__is_initialized:
             return
-        self._initialized_ruleset = RuleSet()
-        for ruleset in self.ruleset_names:
-            if "\\" not in ruleset and "/" not in ruleset:
-                # Is a native ruleset
-                self._initialized_ruleset += RuleSet.from_file(
-                    RULESET_DIR / (ruleset + ".yml")
-                )
-            else:
-                # Load it from a file
-                path = Path(ruleset)
-                if path.is_absolute():
-                    self._initialized_ruleset += RuleSet.from_file(ruleset)
+        with self.__lock:
+            if self.__is_initialized:
+                # Initialized by another thread meanwhile
+                return
+            # The RuleSet is only shared once it is complete
+            initialized_ruleset = RuleSet()
+            for ruleset in self.ruleset_names:
+                if "\\" not in ruleset and "/" not in ruleset:
+                    # Is a native ruleset
+                    initialized_ruleset += RuleSet.from_file(
+                        RULESET_DIR / (ruleset + ".yml")
+                    )
                 else:
-                    self._initialized_ruleset += RuleSet.from_file(ROOT_DIR / ruleset)
-        selected_rules = self.all_used_rule_names
-        self._initialized_ruleset.selection = selected_rules
-        self.__is_initialized = True
+                    # Load it from a file
+                    path = Path(ruleset)
+                    if path.is_absolute():
+                        initialized_ruleset += RuleSet.from_file(ruleset)
+                    else:
+                        initialized_ruleset += RuleSet.from_file(ROOT_DIR / ruleset)
+            initialized_ruleset.selection = self.all_used_rule_names
+            self._initialized_ruleset = initialized_ruleset
+            self.__is_initialized = True
 
     @staticmethod
     def from_file(file_path: str | Path) -> "Cookbook":
         file_path = Path(file_path)
-        try:
-            schema_dict = get_mapping(file_path, COOKBOOK_VALIDATION_SCHEMA_PATH)
-            assert schema_dict
-        except jsonschema.exceptions.ValidationError as e:
-            raise e
+        schema_dict = get_mapping(file_path, COOKBOOK_VALIDATION_SCHEMA_PATH)
+        assert schema_dict
 
         return Cookbook(
             file_path.name.rsplit(".", 1)[0],
@@ -203,6 +250,30 @@ class Cookbook:
             schema_dict.get(RuleForce.MAY.value, []),
         )
 
+    def to_definition(self) -> dict[str, Any]:
+        """
+        Dumps the Cookbook into a dictionary following the cookbook schema,
+        extended with the name of the Cookbook.
+        """
+        return {
+            "name": self.name,
+            "rulesets": list(self.ruleset_names),
+            RuleForce.MUST.value: sorted(self.must),
+            RuleForce.SHOULD.value: sorted(self.should),
+            RuleForce.MAY.value: sorted(self.may),
+        }
+
+    @staticmethod
+    def from_definition(definition: dict[str, Any]) -> "Cookbook":
+        """Loads the Cookbook dumped by `to_definition`."""
+        return Cookbook(
+            definition["name"],
+            definition["rulesets"],
+            definition.get(RuleForce.MUST.value, []),
+            definition.get(RuleForce.SHOULD.value, []),
+            definition.get(RuleForce.MAY.value, []),
+        )
+
     @staticmethod
     def from_directory(dir_path: str | Path) -> list["Cookbook"]:
         dir_path = Path(dir_path)
@@ -214,7 +285,12 @@ class Cookbook:
                 continue
             try:
                 ans.append(Cookbook.from_file(entity))
-            except jsonschema.exceptions.ValidationError as e:
+            except Exception as e:
+                # Slow to import, only needed once a file cannot be loaded
+                from jsonschema.exceptions import ValidationError
+
+                if not isinstance(e, ValidationError):
+                    raise
                 LOGGER.warning(
                     f"Could not load Cookbook file {entity.absolute()}, validation failed."
                 )
@@ -0,0 +1,205 @@
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Generator, Iterable
+
+from sbomgrader.core.documents import Document
+from sbomgrader.core.enums import Grade, OutputType, SBOMTime, SBOMType
+from sbomgrader.core.utils import validation_passed
+from sbomgrader.grade.choose_cookbooks import select_cookbook_bundle
+from sbomgrader.grade.cookbook_bundles import CookbookBundle, CookbookBundleResult
+from sbomgrader.grade.cookbooks import Cookbook
+from sbomgrader.grade.rules import Result, RuleSet
+
+# Grader of the worker process, see `Grader.grade_many`
+_WORKER_GRADER: "Grader | None" = None
+
+
+@dataclass
+class GradingOutcome:
+    """Outcome of grading one of the documents passed to `Grader.grade_many`."""
+
+    # The document or the path as it was passed in
+    source: Any
+    result: CookbookBundleResult | None = None
+    # Problem preventing the grading, e.g. an invalid file
+    error: Exception | None = None
+
+
+def _initialize_worker(grader: "Grader") -> None:
+    global _WORKER_GRADER
+    _WORKER_GRADER = grader
+
+
+def _grade_in_worker(source: Any) -> tuple[SBOMType | None, Result]:
+    return _WORKER_GRADER._grade_raw(source)  # type: ignore[union-attr]
+
+
+class Grader:
+    """
+    Grades many SBOMs with the same configuration. The cookbooks are loaded
+    and compiled once and reused for all documents.
+
+    :param cookbooks: Cookbooks to grade with. Might reference default cookbooks,
+    directories or files, see `select_cookbook_bundle`. If omitted, the default
+    cookbooks for the content type are used.
+    :param content_type: Content type of the documents. If unspecified, it is
+    determined for each document separately.
+    :param sbom_type: Which SBOM type (by time) the default cookbooks check.
+    :param passing_grade: Minimal passing grade, see `passed`.
+    :param output_type: Format of the output, see `output`.
+    """
+
+    def __init__(
+        self,
+        cookbooks: Iterable[str | Path | Cookbook] | CookbookBundle | None = None,
+        content_type: SBOMType = SBOMType.UNSPECIFIED,
+        sbom_type: SBOMTime = SBOMTime.UNSPECIFIED,
+        passing_grade: Grade = Grade.B,
+        output_type: OutputType = OutputType.JSON,
+    ):
+        self.content_type = SBOMType(content_type)
+        self.sbom_type = SBOMTime(sbom_type)
+        self.passing_grade = Grade(passing_grade)
+        self.output_type = OutputType(output_type)
+        self._bundle: CookbookBundle | None = None
+        if isinstance(cookbooks, CookbookBundle):
+            self._bundle = cookbooks
+        elif cookbooks is not None:
+            cookbooks = list(cookbooks)
+            self._bundle = select_cookbook_bundle(
+                [c for c in cookbooks if not isinstance(c, Cookbook)]  # type: ignore[misc]
+            )
+            for cookbook in cookbooks:
+                if isinstance(cookbook, Cookbook):
+                    self._bundle += cookbook
+            if not self._bundle.cookbooks:
+                raise ValueError("No cookbook(s) could be found.")
+        elif self.content_type is not SBOMType.UNSPECIFIED:
+            self._bundle = CookbookBundle.for_document_type(
+                self.content_type, self.sbom_type
+            )
+        # Bundles for documents of each type and their compiled RuleSets
+        self.__bundles: dict[SBOMType | None, tuple[CookbookBundle, RuleSet]] = {}
+        self.__lock = threading.Lock()
+
+    def __getstate__(self) -> dict[str, Any]:
+        # Compiled rules cannot be pickled, each process compiles its own
+        state = self.__dict__.copy()
+        state["_Grader__bundles"] = {}
+        del state["_Grader__lock"]
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.__lock = threading.Lock()
+
+    def _bundle_for(self, sbom_type: SBOMType | None) -> tuple[CookbookBundle, RuleSet]:
+        """
+        The bundle for documents of the type and its compiled RuleSet.
+        :param sbom_type: Type of the document, None if all documents share the bundle.
+        """
+        if (cached := self.__bundles.get(sbom_type)) is not None:
+            return cached
+        with self.__lock:
+            if (cached := self.__bundles.get(sbom_type)) is None:
+                if sbom_type is None:
+                    bundle: CookbookBundle = self._bundle  # type: ignore[assignment]
+                else:
+                    bundle = CookbookBundle.for_document_type(sbom_type, self.sbom_type)
+                cached = bundle, bundle.ruleset
+                self.__bundles[sbom_type] = cached
+            return cached
+
+    def _load(self, source: Document | dict[str, Any] | str | Path) -> Document:
+        if isinstance(source, Document):
+            return source
+        if isinstance(source, dict):
+            return Document(source)
+        sections = None
+        if self._bundle is not None:
+            # Only the parts of the document the cookbooks read are loaded
+            sections = self._bundle_for(None)[1].referenced_fields
+        return Document.from_file(source, sections)
+
+    def _grade_raw(
+        self, source: Document | dict[str, Any] | str | Path
+    ) -> tuple[SBOMType | None, Result]:
+        """Grade the document, return the key of the bundle and the Result."""
+        doc = self._load(source)
+        key = None if self._bundle is not None else doc.sbom_type
+        _, ruleset = self._bundle_for(key)
+        return key, ruleset(doc)
+
+    def grade(
+        self, source: Document | dict[str, Any] | str | Path
+    ) -> CookbookBundleResult:
+        """
+        Grade a single document.
+        :param source: The document, its dictionary or a path to a JSON or YAML file.
+        :return: Result of running the cookbooks.
+        """
+        key, result = self._grade_raw(source)
+        return self._bundle_for(key)[0].project(result)
+
+    def grade_many(
+        self,
+        sources: Iterable[Document | dict[str, Any] | str | Path],
+        workers: int = 1,
+    ) -> Generator[GradingOutcome, None, None]:
+        """
+        Grade many documents. Outcomes are yielded as the documents are graded,
+        which is not necessarily the order of `sources`. A document which cannot
+        be graded does not stop the others, its outcome holds the error.
+        :param sources: Documents, their dictionaries or paths to JSON or YAML files.
+        Paths are cheaper to pass to other processes than loaded documents.
+        :param workers: Number of processes grading the documents. Each of them
+        compiles the cookbooks once and reuses them for all its documents.
+        With a single worker, the documents are graded in this process.
+        """
+        if workers < 1:
+            raise ValueError("The number of workers must be a positive number.")
+        if workers == 1:
+            for source in sources:
+                try:
+                    yield GradingOutcome(source, self.grade(source))
+                except Exception as e:
+                    yield GradingOutcome(source, error=e)
+            return
+
+        pending: dict[Future[tuple[SBOMType | None, Result]], Any] = {}
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_initialize_worker, initargs=(self,)
+        ) as executor:
+            source_iterator = iter(sources)
+            exhausted = False
+            while True:
+                # Only a few documents are submitted ahead, the sources might be large
+                while not exhausted and len(pending) < 2 * workers:
+                    try:
+                        source = next(source_iterator)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    pending[executor.submit(_grade_in_worker, source)] = source
+                if not pending:
+                    return
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    source = pending.pop(future)
+                    try:
+                        key, result = future.result()
+                        yield GradingOutcome(
+                            source, self._bundle_for(key)[0].project(result)
+                        )
+                    except Exception as e:
+                        yield GradingOutcome(source, error=e)
+
+    def passed(self, result: CookbookBundleResult) -> bool:
+        """Does the result reach the passing grade?"""
+        return validation_passed(result.grade, self.passing_grade)
+
+    def output(self, result: CookbookBundleResult) -> str:
+        """Format the result in the configured output type."""
+        return result.output(self.output_type)
@@ -1,22 +1,37 @@
+import threading
 from collections import defaultdict
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from enum import Enum
 from functools import partial
 from pathlib import Path
-from typing import Any, Callable
+from typing import Any, Callable, Iterable
 
 from sbomgrader.core.documents import Document
 from sbomgrader.core.enums import ResultType
-from sbomgrader.core.field_resolve import FieldResolver, Variable
+from sbomgrader.core.field_resolve import (
+    FieldResolver,
+    Variable,
+    PathParser,
+    ElementRunner,
+    ElementState,
+)
 from sbomgrader.core.formats import SBOMFormat
 from sbomgrader.grade.rule_loader import RuleLoader
+from sbomgrader.grade.sampling import Sampling
 from sbomgrader.core.definitions import (
     RULESET_VALIDATION_SCHEMA_PATH,
     FIELD_NOT_PRESENT,
     FieldNotPresentError,
+    NO_FIELDS_MATCHED_MESSAGE,
     operation_map,
 )
-from sbomgrader.core.utils import get_mapping, get_path_to_implementations
+from sbomgrader.core.streaming import DEFAULT_CHUNK_SIZE, iter_sections, load_sections
+from sbomgrader.core.utils import (
+    get_mapping,
+    get_path_to_implementations,
+    open_input,
+    raise_if_cancelled,
+)
 
 
 @dataclass
@@ -24,6 +39,7 @@ class ResultDetail:
     rule_name: str
     result_type: ResultType
     result_detail: str | None
+    estimate: str | None = None
 
 
 @dataclass
@@ -34,10 +50,18 @@ class Result:
     skipped: set[str] = field(default_factory=set)
     not_implemented: set[str] = field(default_factory=set)
     not_applicable: set[str] = field(default_factory=set)
+    sampled: dict[str, str] = field(default_factory=dict)
+    # Partial outcomes of rules evaluated by parts, see `RuleSet.conclude`
+    element_states: dict[str, ElementState] = field(default_factory=dict)
 
     def __add__(self, other: "Result") -> "Result":
         if not isinstance(other, Result):
             raise TypeError(f"Cannot add Result and {type(other)}")
+        element_states = dict(self.element_states)
+        for rule_name, state in other.element_states.items():
+            if rule_name in element_states:
+                state = element_states[rule_name] + state
+            element_states[rule_name] = state
         return Result(
             failed=self.failed | other.failed,
             ran=self.ran | other.ran,
@@ -45,9 +69,77 @@ class Result:
             skipped=self.skipped | other.skipped,
             not_implemented=self.not_implemented | other.not_implemented,
             not_applicable=self.not_applicable | other.not_applicable,
+            sampled=self.sampled | other.sampled,
+            element_states=element_states,
         )
 
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Dumps the Result, including the element states, into a JSON-compatible
+        dictionary. Results of separately graded parts of a document
+        can be stored this way and merged later.
+        """
+        return {
+            "ran": sorted(self.ran),
+            "failed": self.failed,
+            "errors": self.errors,
+            "skipped": sorted(self.skipped),
+            "not_implemented": sorted(self.not_implemented),
+            "not_applicable": sorted(self.not_applicable),
+            "sampled": self.sampled,
+            "element_states": {
+                rule_name: state.to_dict()
+                for rule_name, state in self.element_states.items()
+            },
+        }
+
+    @staticmethod
+    def from_dict(data: dict[str, Any]) -> "Result":
+        """Loads the Result dumped by `to_dict`."""
+        return Result(
+            ran=set(data.get("ran", [])),
+            failed=dict(data.get("failed", {})),
+            errors=dict(data.get("errors", {})),
+            skipped=set(data.get("skipped", [])),
+            not_implemented=set(data.get("not_implemented", [])),
+            not_applicable=set(data.get("not_applicable", [])),
+            sampled=dict(data.get("sampled", {})),
+            element_states={
+                rule_name: ElementState.from_dict(state)
+                for rule_name, state in data.get("element_states", {}).items()
+            },
+        )
+
+    def subset(self, rule_names: Iterable[str]) -> "Result":
+        """
+        Project the Result onto a subset of rules.
+        Only the requested rules are looked up, the collections
+        of this Result are not iterated.
+        """
+        ans = Result()
+        for rule_name in rule_names:
+            if rule_name in self.ran:
+                ans.ran.add(rule_name)
+            if rule_name in self.failed:
+                ans.failed[rule_name] = self.failed[rule_name]
+            if rule_name in self.errors:
+                ans.errors[rule_name] = self.errors[rule_name]
+            if rule_name in self.skipped:
+                ans.skipped.add(rule_name)
+            if rule_name in self.not_implemented:
+                ans.not_implemented.add(rule_name)
+            if rule_name in self.not_applicable:
+                ans.not_applicable.add(rule_name)
+            if rule_name in self.sampled:
+                ans.sampled[rule_name] = self.sampled[rule_name]
+        return ans
+
     def get(self, rule_name: str) -> ResultDetail:
+        detail = self.__get_detail(rule_name)
+        detail.estimate = self.sampled.get(rule_name)
+        return detail
+
+    def __get_detail(self, rule_name: str) -> ResultDetail:
         if rule_name in self.failed:
             return ResultDetail(
                 rule_name=rule_name,
@@ -100,31 +192,81 @@ class Rule:
     minimum_tested_elements: int
     field_resolver: FieldResolver
     applicable: bool = True
+    root_field: tuple[str, bool] | None = field(init=False, default=None)
 
-    def __call__(
-        self,
-        doc: dict[str, Any] | Document,
-        fallback_vars: dict[str, Any] | None = None,
-    ) -> Result:
+    def __post_init__(self):
+        # Analyze the FieldPath once, so documents missing
+        # the whole section can be resolved without the resolver
+        try:
+            self.root_field = PathParser(self.field_path or "").root_field
+        except ValueError:
+            # Invalid paths are reported by the resolver at runtime
+            self.root_field = None
+
+    @property
+    def referenced_fields(self) -> set[str] | None:
+        """
+        Top-level document fields this Rule reads, including its variables.
+        Returns None if the Rule needs the whole document.
+        """
         if not self.applicable:
-            return Result(not_applicable={self.name})
-        if not isinstance(doc, Document):
-            sbom = Document(doc)
-        else:
-            sbom = doc
+            return set()
+        if self.root_field is None:
+            return None
+        variable_fields = self.field_resolver.referenced_fields
+        if variable_fields is None:
+            return None
+        return {self.root_field[0], *variable_fields}
 
+    def _is_root_missing(self, doc: dict[str, Any]) -> bool:
+        """Is the top-level field of the FieldPath absent from the document?"""
+        return self.root_field is not None and self.root_field[0] not in doc
+
+    def _resolve_missing_root(self) -> None:
+        """
+        Determine the outcome for a document without the top-level field
+        of the FieldPath. Raises the same errors the resolver would raise.
+        """
+        field_name, optional = self.root_field  # type: ignore[misc]
+        if not optional:
+            raise FieldNotPresentError("Field not present: ", f".{field_name}")
+        assert self.minimum_tested_elements <= 0, NO_FIELDS_MATCHED_MESSAGE
+
+    @property
+    def streamable(self) -> bool:
+        """
+        Can the Rule be evaluated one element of a top-level list
+        at a time? See `ElementRunner.supports`.
+        """
+        return self.applicable and ElementRunner.supports(self.field_path or "")
+
+    def element_runner(
+        self,
+        exhaustive: bool = False,
+        variable_values: dict[str, list[Any] | set[Any]] | None = None,
+    ) -> ElementRunner:
+        """
+        Create a runner evaluating this Rule one element at a time.
+        Values of the variables used by the Rule have to be supplied if it uses any.
+        """
+        return ElementRunner(
+            self.field_resolver,
+            self.func,
+            self.field_path,
+            self.minimum_tested_elements,
+            exhaustive,
+            variable_values,
+        )
+
+    def evaluate(self, check: Callable[[], None]) -> Result:
+        """
+        Run the check and record its outcome in a Result.
+        :param check: Callable raising an AssertionError or a FieldNotPresentError
+        if the Rule did not pass.
+        """
         result = Result(ran={self.name})
-        field_path = self.field_path or ""
-        fallback_vars = {} if not fallback_vars else fallback_vars
         try:
-            self.field_resolver.run_func(
-                sbom.doc,
-                self.func,
-                field_path,
-                self.minimum_tested_elements,
-                fallback_variables=fallback_vars,
-            )
-
+            check()
         except AssertionError as e:
             message_to_return = self.error_message
             if e.args:
@@ -140,6 +282,35 @@ class Rule:
             result.errors[self.name] = str(type(e)) + " " + str(e)
         return result
 
+    def __call__(
+        self,
+        doc: dict[str, Any] | Document,
+        fallback_vars: dict[str, Any] | None = None,
+    ) -> Result:
+        if not self.applicable:
+            return Result(not_applicable={self.name})
+        if not isinstance(doc, Document):
+            sbom = Document(doc)
+        else:
+            sbom = doc
+
+        field_path = self.field_path or ""
+        fallback_vars = {} if not fallback_vars else fallback_vars
+
+        def check() -> None:
+            if self._is_root_missing(sbom.doc):
+                self._resolve_missing_root()
+            else:
+                self.field_resolver.run_func(
+                    sbom.doc,
+                    self.func,
+                    field_path,
+                    self.minimum_tested_elements,
+                    fallback_variables=fallback_vars,
+                )
+
+        return self.evaluate(check)
+
 
 class RuleSet:
     @staticmethod
@@ -251,6 +422,28 @@ class RuleSet:
         for implementation, var_dict in variables.items():
             self.field_resolvers[implementation] = FieldResolver(var_dict)
 
+    @property
+    def referenced_fields(self) -> set[str] | None:
+        """
+        Top-level document fields read by the selected rules and by the global
+        variables of all implementations. Returns None if the whole document is needed.
+        """
+        ans: set[str] = set()
+        for resolver in self.field_resolvers.values():
+            variable_fields = resolver.referenced_fields
+            if variable_fields is None:
+                return None
+            ans.update(variable_fields)
+        for implementation_rules in self.rules.values():
+            for rule_name, rule in implementation_rules.items():
+                if rule_name not in self.selection or not isinstance(rule, Rule):
+                    continue
+                rule_fields = rule.referenced_fields
+                if rule_fields is None:
+                    return None
+                ans.update(rule_fields)
+        return ans
+
     @property
     def formats(self) -> set[Enum]:
         return {SBOMFormat(k) for k in self.rules}
@@ -308,7 +501,15 @@ class RuleSet:
             variables=variable_definitions,
         )
 
-    def __call__(self, document: dict | Document) -> Result:
+    def __call__(
+        self, document: dict | Document, cancel: threading.Event | None = None
+    ) -> Result:
+        """
+        Run the RuleSet on the document.
+        :param document: The document to check.
+        :param cancel: Event which stops the run before the next rule once set,
+        `OperationCancelledError` is raised then.
+        """
         res = Result()
         if isinstance(document, dict):
             document = Document(document)
@@ -321,6 +522,7 @@ class RuleSet:
             global_variables = global_variables_resolver.resolve_variables(document.doc)
 
         for rule in self.all_rule_names:
+            raise_if_cancelled(cancel)
             if rule not in self.selection:
                 res.skipped.add(rule)
                 continue
@@ -332,3 +534,162 @@ class RuleSet:
             else:
                 res.not_implemented.add(rule)
         return res
+
+    def split_rules(
+        self, format_identifier: str, is_element_rule: Callable[[Rule], bool]
+    ) -> tuple[Result, dict[str, list[Rule]], dict[str, Callable]]:
+        """
+        Sort the rules for a format by the way they will be evaluated.
+        :param format_identifier: The format of the document.
+        :param is_element_rule: Decides if the Rule is evaluated element by element.
+        :return: Result holding the skipped and not implemented rules,
+        the element rules by the name of the list they check,
+        and the remaining rules by their names.
+        """
+        res = Result()
+        element_rules: dict[str, list[Rule]] = defaultdict(list)
+        remaining_rules: dict[str, Callable] = {}
+        for rule in self.all_rule_names:
+            if rule not in self.selection:
+                res.skipped.add(rule)
+                continue
+            rule_obj = self.rules.get(format_identifier, {}).get(rule)
+            if not rule_obj or not callable(rule_obj):
+                res.not_implemented.add(rule)
+            elif isinstance(rule_obj, Rule) and is_element_rule(rule_obj):
+                element_rules[rule_obj.root_field[0]].append(  # type: ignore[index]
+                    rule_obj
+                )
+            else:
+                remaining_rules[rule] = rule_obj
+        return res, element_rules, remaining_rules
+
+    def sub_ruleset(
+        self, format_identifier: str, rules: dict[str, Callable]
+    ) -> "RuleSet":
+        """
+        Create a RuleSet of some of the rules for a format, sharing
+        the global variables of this RuleSet.
+        :param format_identifier: The format the rules implement.
+        :param rules: The rules by their names, see `split_rules`.
+        """
+        global_variables = self.field_resolvers.get(format_identifier)
+        return RuleSet(
+            rules={format_identifier: rules},
+            all_rule_names=set(rules),
+            variables={
+                format_identifier: (
+                    global_variables.var_definitions if global_variables else {}
+                )
+            },
+        )
+
+    def conclude(self, result: Result, format_identifier: str) -> Result:
+        """
+        Turn the element states of rules evaluated by parts (see `Result.element_states`)
+        into their final outcome.
+        :param result: Result containing the merged element states.
+        :param format_identifier: The format of the document.
+        :return: Result with the outcome of all rules.
+        """
+        res = replace(result, element_states={})
+        for rule_name, state in result.element_states.items():
+            rule: Rule = self.rules[format_identifier][rule_name]  # type: ignore[assignment]
+            runner = rule.element_runner(variable_values={})
+            runner.merge(state)
+            res += rule.evaluate(runner.finish)
+        return res
+
+    def stream(
+        self,
+        file: str | Path,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        sampling: Sampling | None = None,
+    ) -> Result:
+        """
+        Run the RuleSet on a JSON file without holding the whole document in memory.
+        Rules checking elements of a top-level list one by one are evaluated while
+        the elements are read. The remaining rules (e.g. ones using variables)
+        are run on a second pass which loads only the fields they reference.
+        :param file: Path to a JSON document, which can be compressed.
+        :param chunk_size: How many characters to read from the file at once.
+        :param sampling: Evaluate the element rules only on a random sample of
+        the list elements. Their results are estimates, recorded in `Result.sampled`.
+        Other rules are run in full.
+        :return: The same Result as calling the RuleSet on the loaded document.
+        """
+        with open_input(file) as stream:
+            header = Document(
+                load_sections(stream, Document.format_fields(), chunk_size)
+            )
+        sbom_format_enum = self.format_for_doc(header)
+        assert sbom_format_enum is not None, "Invalid format for document."
+        format_identifier = sbom_format_enum.value
+
+        res, element_rules, remaining_rules = self.split_rules(
+            format_identifier, lambda rule: rule.streamable
+        )
+        if element_rules:
+            res += self.__stream_element_rules(
+                file, element_rules, chunk_size, sampling
+            )
+        if remaining_rules:
+            remaining_ruleset = self.sub_ruleset(format_identifier, remaining_rules)
+            sections = remaining_ruleset.referenced_fields
+            if sections is not None:
+                sections |= Document.format_fields()
+            with open_input(file) as stream:
+                mapping = load_sections(stream, sections, chunk_size)
+            res += remaining_ruleset(Document(mapping))
+        return res
+
+    @staticmethod
+    def __stream_element_rules(
+        file: str | Path,
+        element_rules: dict[str, list[Rule]],
+        chunk_size: int,
+        sampling: Sampling | None,
+    ) -> Result:
+        """
+        Evaluate rules element by element while the top-level lists are read.
+        If sampling is requested, only the sampled elements are evaluated.
+        """
+        res = Result()
+        with open_input(file) as stream:
+            for section in iter_sections(stream, chunk_size):
+                rules = element_rules.pop(section.key, [])
+                if not rules:
+                    continue
+                if not section.is_list:
+                    # The resolver reports the problem
+                    document = Document({section.key: section.load()})
+                    for rule in rules:
+                        res += rule(document)
+                    continue
+                runners = [
+                    rule.element_runner(exhaustive=sampling is not None)
+                    for rule in rules
+                ]
+                sampler = sampling.sampler(section.key) if sampling else None
+                elements: Iterable[tuple[int, Any]] = (
+                    sampler.sample(section.elements())
+                    if sampler
+                    else enumerate(section.elements())
+                )
+                for idx, element in elements:
+                    active_runners = [r for r in runners if not r.done]
+                    if not active_runners:
+                        break
+                    for runner in active_runners:
+                        runner.feed(idx, element)
+                fraction = sampler.fraction if sampler else 1.0
+                for rule, runner in zip(rules, runners):
+                    res += rule.evaluate(partial(runner.finish, fraction))
+                    if sampler and not sampler.is_exhaustive:
+                        res.sampled[rule.name] = sampler.estimate(runner)
+        # The fields were not present in the document
+        empty_document = Document({})
+        for rules in element_rules.values():
+            for rule in rules:
+                res += rule(empty_document)
+        return res
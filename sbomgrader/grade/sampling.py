@@ -0,0 +1,129 @@
+import random
+from dataclasses import dataclass
+from math import sqrt
+from statistics import NormalDist
+from typing import Any, Generator, Iterable
+
+from sbomgrader.core.field_resolve import ElementRunner
+
+
+def wilson_interval(
+    successes: int, total: int, confidence: float = 0.95
+) -> tuple[float, float]:
+    """
+    Wilson score confidence interval of a proportion.
+    :param successes: Number of positive observations.
+    :param total: Number of all observations.
+    :param confidence: Confidence level of the interval.
+    :return: Lower and upper bound of the interval.
+    """
+    if not total:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    proportion = successes / total
+    denominator = 1 + z**2 / total
+    centre = (proportion + z**2 / (2 * total)) / denominator
+    margin = (
+        z
+        * sqrt(proportion * (1 - proportion) / total + z**2 / (4 * total**2))
+        / denominator
+    )
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+
+@dataclass(frozen=True)
+class Sampling:
+    """
+    Configuration of the sampling of list elements.
+    Either the `size` or the `fraction` of the sample is set.
+    """
+
+    size: int | None = None
+    fraction: float | None = None
+    seed: int = 0
+    confidence: float = 0.95
+
+    def __post_init__(self):
+        if (self.size is None) == (self.fraction is None):
+            raise ValueError("Specify either the size or the fraction of the sample.")
+        if self.size is not None and self.size < 1:
+            raise ValueError("The sample size must be a positive number.")
+        if self.fraction is not None and not 0 < self.fraction <= 1:
+            raise ValueError("The sample fraction must be in the range (0, 1].")
+
+    def sampler(self, key: str) -> "Sampler":
+        """Create a sampler for the top-level list `key`."""
+        return Sampler(self, key)
+
+
+class Sampler:
+    """
+    Draws a deterministic random sample from the elements of one list.
+    The same seed and list name always select the same elements.
+    """
+
+    def __init__(self, sampling: Sampling, key: str):
+        self._sampling = sampling
+        self._random = random.Random(f"{sampling.seed}:{key}")
+        self.seen = 0
+        self.taken = 0
+
+    def sample(self, elements: Iterable[Any]) -> Generator[tuple[int, Any], None, None]:
+        """
+        Yields the sampled elements together with their indices, in list order.
+        A sample of fixed size is collected by reservoir sampling, so only
+        the sampled elements are kept in memory.
+        """
+        size = self._sampling.size
+        if size is None:
+            fraction: float = self._sampling.fraction  # type: ignore[assignment]
+            for idx, element in enumerate(elements):
+                self.seen += 1
+                if self._random.random() < fraction:
+                    self.taken += 1
+                    yield idx, element
+            return
+        reservoir: list[tuple[int, Any]] = []
+        for idx, element in enumerate(elements):
+            self.seen += 1
+            if idx < size:
+                reservoir.append((idx, element))
+                continue
+            replaced_idx = self._random.randrange(idx + 1)
+            if replaced_idx < size:
+                reservoir[replaced_idx] = (idx, element)
+        reservoir.sort(key=lambda x: x[0])
+        self.taken = len(reservoir)
+        yield from reservoir
+
+    @property
+    def fraction(self) -> float:
+        """Portion of the list elements that were sampled."""
+        if not self.seen:
+            return 1.0
+        return self.taken / self.seen
+
+    @property
+    def is_exhaustive(self) -> bool:
+        """Were all the elements of the list sampled?"""
+        return self.taken == self.seen
+
+    def estimate(self, runner: ElementRunner) -> str:
+        """Describe the estimate of the failure rate based on an exhaustive runner."""
+        low, high = wilson_interval(
+            runner.failed_elements, runner.selected, self._sampling.confidence
+        )
+        ans = (
+            f"Sampled {self.taken} of {self.seen} elements (seed {self._sampling.seed}), "
+            f"{runner.selected} of them tested, {runner.failed_elements} failed."
+        )
+        if runner.selected:
+            ans += (
+                f" Estimated failure rate: "
+                f"{runner.failed_elements / runner.selected:.2%} "
+                f"({self._sampling.confidence:.0%} confidence interval "
+                f"{low:.2%} - {high:.2%})."
+            )
+        if runner.inconclusive:
+            ans += f" Inconclusive, the check was not failed: {runner.inconclusive}"
+        return ans
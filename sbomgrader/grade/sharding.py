@@ -0,0 +1,400 @@
+import json
+import logging
+import uuid
+from concurrent.futures import ProcessPoolExecutor, Future
+from dataclasses import dataclass
+from math import ceil
+from pathlib import Path
+from typing import Any, Iterable
+
+from sbomgrader.core.documents import Document
+from sbomgrader.core.field_resolve import ElementRunner, ElementState, FieldResolver
+from sbomgrader.core.streaming import iter_sections
+from sbomgrader.core.utils import open_input
+from sbomgrader.grade.cookbooks import Cookbook
+from sbomgrader.grade.rules import Result, Rule, RuleSet
+
+LOGGER = logging.getLogger(__name__)
+
+# Rules and broadcast variable values of the worker process
+_WORKER_CONTEXT: dict[str, Any] = {}
+
+# Keys of the headers of shard files and of the results of grading them
+SHARD_KEY = "sbomgrader_shard"
+SHARD_RESULT_KEY = "sbomgrader_shard_result"
+SHARD_FORMAT_VERSION = 1
+
+
+def evaluate_elements(
+    rules: Iterable[Rule],
+    variables: dict[str, dict[str, list[Any] | set[Any]]],
+    start: int,
+    elements: Iterable[Any],
+) -> Result:
+    """
+    Evaluate element rules on a part of a list.
+    :param rules: Rules checking the list element by element.
+    :param variables: Resolved variable values for each rule, by rule name.
+    :param start: Index of the first element in the whole list.
+    :param elements: The part of the list.
+    :return: Result holding the element states of the rules.
+    """
+    runners = {
+        rule.name: rule.element_runner(variable_values=variables.get(rule.name, {}))
+        for rule in rules
+    }
+    for idx, element in enumerate(elements, start):
+        active_runners = [runner for runner in runners.values() if not runner.done]
+        if not active_runners:
+            break
+        for runner in active_runners:
+            runner.feed(idx, element)
+    return Result(
+        element_states={
+            rule_name: runner.state for rule_name, runner in runners.items()
+        }
+    )
+
+
+def _ruleset_of(cookbooks: Iterable[Cookbook]) -> RuleSet:
+    ruleset = RuleSet()
+    for cookbook in cookbooks:
+        ruleset += cookbook.ruleset
+    return ruleset
+
+
+def _split(elements: list[Any], shards: int) -> list[tuple[int, list[Any]]]:
+    """Split the list into at most `shards` parts, with their start indices."""
+    shard_size = max(1, ceil(len(elements) / shards))
+    return [
+        (start, elements[start : start + shard_size])
+        for start in range(0, len(elements), shard_size)
+    ]
+
+
+def _initialize_worker(
+    cookbooks: list[Cookbook],
+    format_identifier: str,
+    variables: dict[str, dict[str, list[Any] | set[Any]]],
+) -> None:
+    # Rules cannot be pickled, each worker loads them from the cookbooks
+    _WORKER_CONTEXT["rules"] = _ruleset_of(cookbooks).rules.get(format_identifier, {})
+    _WORKER_CONTEXT["variables"] = variables
+
+
+def _grade_shard(rule_names: list[str], start: int, elements: list[Any]) -> Result:
+    rules = [_WORKER_CONTEXT["rules"][rule_name] for rule_name in rule_names]
+    return evaluate_elements(rules, _WORKER_CONTEXT["variables"], start, elements)
+
+
+@dataclass
+class ShardPlan:
+    """Rules of a RuleSet sorted by the way they are evaluated on a sharded document."""
+
+    format_identifier: str
+    # Skipped and not implemented rules
+    result: Result
+    # Rules checking list elements one by one, by the name of the list
+    element_rules: dict[str, list[Rule]]
+    # Rules which need the whole document, by their names
+    remaining_rules: dict[str, Any]
+    global_variables: dict[str, Any]
+    # Resolved variable values of the element rules, by rule name
+    variables: dict[str, dict[str, list[Any] | set[Any]]]
+
+    @staticmethod
+    def create(ruleset: RuleSet, document: Document) -> "ShardPlan":
+        """
+        Decide which rules of the RuleSet can be evaluated on parts of the document's
+        lists and resolve the variables they use once.
+        """
+        sbom_format_enum = ruleset.format_for_doc(document)
+        assert sbom_format_enum is not None, "Invalid format for document."
+        format_identifier = sbom_format_enum.value
+        global_variables_resolver = ruleset.field_resolvers.get(format_identifier)
+        global_variables: dict[str, Any] = {}
+        if global_variables_resolver:
+            global_variables = global_variables_resolver.resolve_variables(document.doc)
+
+        def is_element_rule(rule: Rule) -> bool:
+            return (
+                rule.applicable
+                and ElementRunner.supports(
+                    rule.field_path or "", resolved_variables=True
+                )
+                and isinstance(document.doc.get(rule.root_field[0]), list)  # type: ignore[index]
+            )
+
+        result, element_rules, remaining_rules = ruleset.split_rules(
+            format_identifier, is_element_rule
+        )
+        variables: dict[str, dict[str, list[Any] | set[Any]]] = {}
+        for rules in element_rules.values():
+            for rule in list(rules):
+                try:
+                    variables[rule.name] = rule.field_resolver.path_variables(
+                        document.doc, rule.field_path, global_variables
+                    )
+                except Exception as e:
+                    # The Rule reports the problem when it is run as a whole
+                    LOGGER.debug(f"Rule {rule.name} cannot be sharded.", exc_info=e)
+                    rules.remove(rule)
+                    remaining_rules[rule.name] = rule
+            for rule in rules:
+                # Each rule needs an outcome, even if there are no elements
+                result.element_states[rule.name] = ElementState()
+        return ShardPlan(
+            format_identifier,
+            result,
+            element_rules,
+            remaining_rules,
+            global_variables,
+            variables,
+        )
+
+    def run_remaining(self, document: Document) -> Result:
+        """Run the rules which need the whole document."""
+        res = Result()
+        for rule_obj in self.remaining_rules.values():
+            res += rule_obj(document, fallback_vars=self.global_variables)
+        return res
+
+
+def grade_sharded(
+    cookbooks: Iterable[Cookbook], document: Document, shards: int
+) -> Result:
+    """
+    Run the rules of the cookbooks on the document, splitting the top-level lists
+    into shards evaluated in separate processes. Rules checking list elements one
+    by one are sharded, variables are resolved once and broadcast to the workers.
+    The remaining rules run in this process meanwhile.
+    :param cookbooks: The cookbooks to grade the document with.
+    :param document: The document to grade.
+    :param shards: Number of shards of each list, as well as worker processes.
+    :return: The same Result as running the combined RuleSet of the cookbooks.
+    """
+    if shards < 1:
+        raise ValueError("The number of shards must be a positive number.")
+    cookbooks = list(cookbooks)
+    ruleset = _ruleset_of(cookbooks)
+    plan = ShardPlan.create(ruleset, document)
+    res = plan.result
+    if not any(plan.element_rules.values()):
+        res += plan.run_remaining(document)
+        return ruleset.conclude(res, plan.format_identifier)
+
+    futures: list[Future[Result]] = []
+    with ProcessPoolExecutor(
+        max_workers=shards,
+        initializer=_initialize_worker,
+        initargs=(cookbooks, plan.format_identifier, plan.variables),
+    ) as executor:
+        for field_name, rules in plan.element_rules.items():
+            if not rules:
+                continue
+            for start, elements in _split(document.doc[field_name], shards):
+                futures.append(
+                    executor.submit(
+                        _grade_shard, [rule.name for rule in rules], start, elements
+                    )
+                )
+        res += plan.run_remaining(document)
+        for future in futures:
+            res += future.result()
+    return ruleset.conclude(res, plan.format_identifier)
+
+
+def create_shards(
+    cookbooks: Iterable[Cookbook],
+    decisive_cookbook: str | None,
+    document: Document,
+    shards: int,
+) -> list[dict[str, Any]]:
+    """
+    Split the grading of the document into self-contained shards, which can be
+    graded independently (see `grade_shard`) and merged afterwards
+    (see `merge_shard_results`). The first shard holds the parts of the document
+    needed by the rules which check the whole document, together with the resolved
+    global variables. Each of the other shards holds a part of every sharded list
+    with the resolved variables of the rules checking it.
+    :param cookbooks: The cookbooks to grade the document with.
+    :param decisive_cookbook: Name of the cookbook deciding the final grade.
+    :param document: The document to grade.
+    :param shards: Number of shards of each list.
+    :return: JSON-compatible dictionaries of the shards.
+    """
+    if shards < 1:
+        raise ValueError("The number of shards must be a positive number.")
+    cookbooks = list(cookbooks)
+    ruleset = _ruleset_of(cookbooks)
+    plan = ShardPlan.create(ruleset, document)
+    common = {
+        "cookbooks": [cookbook.to_definition() for cookbook in cookbooks],
+        "decisive_cookbook": decisive_cookbook,
+        "format": plan.format_identifier,
+    }
+
+    sections = ruleset.sub_ruleset(
+        plan.format_identifier, plan.remaining_rules
+    ).referenced_fields
+    doc = document.doc
+    if sections is not None:
+        sections |= Document.detection_fields()
+        doc = {key: value for key, value in doc.items() if key in sections}
+    bodies = [
+        {
+            **common,
+            "result": plan.result.to_dict(),
+            "rules": sorted(plan.remaining_rules),
+            "global_variables": plan.global_variables,
+            "document": doc,
+        }
+    ]
+
+    element_shards: list[dict[str, Any]] = [
+        {**common, "lists": {}, "variables": {}} for _ in range(shards)
+    ]
+    for field_name, rules in plan.element_rules.items():
+        if not rules:
+            continue
+        for shard, (start, elements) in zip(
+            element_shards, _split(document.doc[field_name], shards)
+        ):
+            shard["lists"][field_name] = {
+                "start": start,
+                "rules": [rule.name for rule in rules],
+                "elements": elements,
+            }
+            for rule in rules:
+                shard["variables"][rule.name] = {
+                    var_name: list(values)
+                    for var_name, values in plan.variables[rule.name].items()
+                }
+    bodies.extend(shard for shard in element_shards if shard["lists"])
+
+    grading_id = uuid.uuid4().hex
+    return [
+        {
+            SHARD_KEY: {
+                "version": SHARD_FORMAT_VERSION,
+                "id": grading_id,
+                "index": index,
+                "count": len(bodies),
+            },
+            **body,
+        }
+        for index, body in enumerate(bodies)
+    ]
+
+
+def write_shards(
+    shards: Iterable[dict[str, Any]], output_dir: str | Path
+) -> list[Path]:
+    """
+    Write the shards created by `create_shards` into JSON files.
+    :return: Paths to the written files.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    ans = []
+    for shard in shards:
+        path = output_dir / f"shard-{shard[SHARD_KEY]['index']:04d}.json"
+        with open(path, "w") as stream:
+            json.dump(shard, stream)
+        ans.append(path)
+    return ans
+
+
+def is_shard_file(path: str | Path) -> bool:
+    """Is the file a shard written by `write_shards`? Only its beginning is read."""
+    path = Path(path)
+    if not path.is_file():
+        return False
+    try:
+        with open_input(path) as stream:
+            first_section = next(iter_sections(stream), None)
+            return first_section is not None and first_section.key == SHARD_KEY
+    except (ValueError, OSError):
+        # Not JSON, not text or a broken compressed file
+        return False
+
+
+def _check_header(data: dict[str, Any], key: str) -> dict[str, Any]:
+    header = data.get(key)
+    if not isinstance(header, dict):
+        raise ValueError("The data is not a shard created by SBOMGrader.")
+    if header.get("version") != SHARD_FORMAT_VERSION:
+        raise ValueError(f"Unsupported shard format version {header.get('version')}.")
+    return header
+
+
+def grade_shard(shard: dict[str, Any]) -> dict[str, Any]:
+    """
+    Grade a shard created by `create_shards`.
+    :param shard: The shard.
+    :return: JSON-compatible dictionary with the partial Result of the shard.
+    """
+    header = _check_header(shard, SHARD_KEY)
+    cookbooks = [Cookbook.from_definition(d) for d in shard["cookbooks"]]
+    rules = _ruleset_of(cookbooks).rules.get(shard["format"], {})
+    res = Result.from_dict(shard.get("result", {}))
+    if "document" in shard:
+        document = Document(shard["document"])
+        for rule_name in shard["rules"]:
+            res += rules[rule_name](document, fallback_vars=shard["global_variables"])
+    variables = {
+        rule_name: FieldResolver.cast_variables(values)
+        for rule_name, values in shard.get("variables", {}).items()
+    }
+    for part in shard.get("lists", {}).values():
+        res += evaluate_elements(
+            [rules[rule_name] for rule_name in part["rules"]],  # type: ignore[misc]
+            variables,
+            part["start"],
+            part["elements"],
+        )
+    return {
+        SHARD_RESULT_KEY: header,
+        "cookbooks": shard["cookbooks"],
+        "decisive_cookbook": shard["decisive_cookbook"],
+        "format": shard["format"],
+        "result": res.to_dict(),
+    }
+
+
+def merge_shard_results(
+    shard_results: Iterable[dict[str, Any]],
+) -> tuple[list[Cookbook], str | None, Result]:
+    """
+    Merge the results of grading all shards of a document, see `grade_shard`.
+    :param shard_results: Results of all the shards, in any order.
+    :return: The cookbooks, the name of the decisive cookbook and the same Result
+    as running the combined RuleSet of the cookbooks on the whole document.
+    """
+    merged = Result()
+    first: dict[str, Any] | None = None
+    indices: set[int] = set()
+    for shard_result in shard_results:
+        header = _check_header(shard_result, SHARD_RESULT_KEY)
+        if first is None:
+            first = shard_result
+        elif first[SHARD_RESULT_KEY]["id"] != header["id"]:
+            raise ValueError("The shard results come from different gradings.")
+        if header["index"] in indices:
+            raise ValueError(f"Result of shard {header['index']} is duplicated.")
+        indices.add(header["index"])
+        merged += Result.from_dict(shard_result["result"])
+    if first is None:
+        raise ValueError("No shard results to merge.")
+    missing = set(range(first[SHARD_RESULT_KEY]["count"])) - indices
+    if missing:
+        raise ValueError(
+            f"Results of shards {', '.join(map(str, sorted(missing)))} are missing."
+        )
+    cookbooks = [Cookbook.from_definition(d) for d in first["cookbooks"]]
+    ruleset = _ruleset_of(cookbooks)
+    return (
+        cookbooks,
+        first["decisive_cookbook"],
+        ruleset.conclude(merged, first["format"]),
+    )
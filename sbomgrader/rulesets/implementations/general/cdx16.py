@@ -1,12 +1,14 @@
 import json
 
-from cyclonedx.schema import SchemaVersion
-from cyclonedx.validation.json import JsonValidator
-
 from sbomgrader.core.definitions import FIELD_NOT_PRESENT
+from sbomgrader.core.graph import DocumentGraph
 
 
+# cyclonedx is slow to import, it is only imported once a schema rule runs
 def validate_schema(doc: dict):
+    from cyclonedx.schema import SchemaVersion
+    from cyclonedx.validation.json import JsonValidator
+
     validator = JsonValidator(SchemaVersion.V1_6)
     error = validator.validate_str(json.dumps(doc))
     if error:
@@ -14,11 +16,7 @@ def validate_schema(doc: dict):
 
 
 def package_relationships(doc: dict):
-    all_bom_refs_from_deps = set()
-    for dep in doc.get("dependencies", []):
-        all_bom_refs_from_deps.update(dep.get("dependsOn", []))
-        all_bom_refs_from_deps.update(dep.get("provides", []))
-        all_bom_refs_from_deps.add(dep["ref"])
+    all_bom_refs_from_deps = DocumentGraph(doc).related_bom_refs
     for idx, component in enumerate(doc.get("components", [])):
         assert (
             component.get("bom-ref", FIELD_NOT_PRESENT) in all_bom_refs_from_deps
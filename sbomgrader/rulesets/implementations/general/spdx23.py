@@ -1,12 +1,16 @@
 from typing import Any
 from datetime import datetime
 
-from spdx_tools.spdx.parser.error import SPDXParsingError
-from spdx_tools.spdx.parser.jsonlikedict.json_like_dict_parser import JsonLikeDictParser
-from spdx_tools.spdx.validation.document_validator import validate_full_spdx_document
+from sbomgrader.core.graph import DocumentGraph
 
 
+# spdx-tools is slow to import, it is only imported once a schema rule runs
 def validate_schema(doc: dict[str, Any]):
+    from spdx_tools.spdx.parser.error import SPDXParsingError
+    from spdx_tools.spdx.parser.jsonlikedict.json_like_dict_parser import (
+        JsonLikeDictParser,
+    )
+
     try:
         JsonLikeDictParser().parse(doc)
     except SPDXParsingError as e:
@@ -14,6 +18,14 @@ def validate_schema(doc: dict[str, Any]):
 
 
 def full_validation(doc: dict[str, Any]):
+    from spdx_tools.spdx.parser.error import SPDXParsingError
+    from spdx_tools.spdx.parser.jsonlikedict.json_like_dict_parser import (
+        JsonLikeDictParser,
+    )
+    from spdx_tools.spdx.validation.document_validator import (
+        validate_full_spdx_document,
+    )
+
     try:
         document = JsonLikeDictParser().parse(doc)
     except SPDXParsingError as e:
@@ -33,16 +45,8 @@ def check_datetime(doc: str):
 
 
 def package_relationships(doc: dict[str, Any]):
-    package_spdxids = {package["SPDXID"] for package in doc.get("packages", [])}
-    for relationship in doc.get("relationships", []):
-        references = relationship.get("spdxElementId"), relationship.get(
-            "relatedSpdxElement"
-        )
-        for r in references:
-            if r in package_spdxids:
-                package_spdxids.remove(r)
-        if not package_spdxids:
-            break
+    graph = DocumentGraph(doc)
+    package_spdxids = graph.package_spdxids - graph.related_spdxids
     assert (
         not package_spdxids
     ), f"Not all packages are referenced in relationships: {package_spdxids}"
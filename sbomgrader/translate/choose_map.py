@@ -1,47 +1,149 @@
 from enum import Enum
+from functools import cache, cached_property
+from pathlib import Path
+
+import yaml
 
 from sbomgrader.core.definitions import TRANSLATION_MAP_DIR
 from sbomgrader.core.documents import Document
 from sbomgrader.core.formats import SBOMFormat, get_fallbacks
-from sbomgrader.core.utils import is_mapping
+from sbomgrader.core.serialization import SafeLoader
+from sbomgrader.core.utils import is_mapping, open_input
 from sbomgrader.translate.translation_map import TranslationMap
 
 
+class MapEntry:
+    """
+    A Translation Map file of which only the formats are read. The map itself
+    is loaded once it is needed, see `translation_map`.
+    :param file: Path to the Translation Map file.
+    :param first: The format in the field `first` of the map.
+    :param second: The format in the field `second` of the map.
+    """
+
+    def __init__(self, file: Path, first: Enum, second: Enum):
+        self.file = file
+        self.first = first
+        self.second = second
+
+    # Both only depend on the formats of the map
+    is_exact_map = TranslationMap.is_exact_map
+    is_suitable_map = TranslationMap.is_suitable_map
+
+    @staticmethod
+    def from_file(file: str | Path) -> "MapEntry":
+        """Read the formats of the Translation Map, the rest of the file is skipped."""
+        file = Path(file)
+        formats = _read_top_level_scalars(file, {"first", "second"})
+        if len(formats) != 2:
+            raise ValueError(
+                f"Could not find the fields 'first' and 'second' in the Translation Map '{file}'."
+            )
+        return MapEntry(
+            file, SBOMFormat(formats["first"]), SBOMFormat(formats["second"])
+        )
+
+    @cached_property
+    def translation_map(self) -> TranslationMap:
+        return TranslationMap.from_file(self.file)
+
+
+def _read_top_level_scalars(file: Path, keys: set[str]) -> dict[str, str]:
+    """
+    Read scalar values of the top-level keys of a YAML or JSON mapping.
+    Parsing stops once all of them are found.
+    """
+    ans: dict[str, str] = {}
+    depth = 0
+    key = None
+    with open_input(file) as stream:
+        for event in yaml.parse(stream, Loader=SafeLoader):
+            if isinstance(event, (yaml.MappingStartEvent, yaml.SequenceStartEvent)):
+                if depth == 1:
+                    # A value which is not a scalar
+                    key = None
+                depth += 1
+            elif isinstance(event, (yaml.MappingEndEvent, yaml.SequenceEndEvent)):
+                depth -= 1
+            elif isinstance(event, yaml.ScalarEvent) and depth == 1:
+                if key is None:
+                    key = event.value
+                    continue
+                if key in keys:
+                    ans[key] = event.value
+                    if len(ans) == len(keys):
+                        break
+                key = None
+    return ans
+
+
 def choose_map(
-    document: Document, out: Enum, *custom_maps: TranslationMap
+    document: Document, out: Enum, *custom_maps: TranslationMap | MapEntry
 ) -> TranslationMap:
-    """Choose the translation map according to the document and output format."""
-    for map_set in (custom_maps, get_default_maps()):
+    """
+    Choose the translation map according to the document and output format.
+    Only the chosen map is loaded.
+    """
+    for map_set in (custom_maps, get_default_map_entries()):
         # Prefer custom maps to default ones
         for match_type in ("exact", "suitable"):
             # Prefer exact matches to fallbacks
             for map_ in map_set:
                 if getattr(map_, f"is_{match_type}_map")(document.sbom_format, out):
+                    if isinstance(map_, MapEntry):
+                        return map_.translation_map
                     return map_
     raise NotImplementedError(
         f"Cannot convert from format {document.sbom_format.value} to {out.value}. No such map is implemented."
     )
 
 
-def get_default_maps() -> list[TranslationMap]:
-    """Returns the list of pre-installed maps."""
+def get_maps_to_format(
+    out: Enum, *custom_maps: TranslationMap | MapEntry
+) -> list[tuple[TranslationMap, Enum]]:
+    """
+    Returns the maps which can convert documents to the format `out`,
+    each with the format of the side it converts from. Only these maps are loaded.
+    """
+    out_formats = get_fallbacks(out) | {out}
     ans = []
-    for file in TRANSLATION_MAP_DIR.iterdir():
-        if not is_mapping(file):
-            continue
-        ans.append(TranslationMap.from_file(file))
+    for map_ in (*custom_maps, *get_default_map_entries()):
+        for from_, to in ((map_.first, map_.second), (map_.second, map_.first)):
+            if to in out_formats:
+                if isinstance(map_, MapEntry):
+                    ans.append((map_.translation_map, from_))
+                else:
+                    ans.append((map_, from_))
     return ans
 
 
+@cache
+def get_default_map_entries() -> tuple[MapEntry, ...]:
+    """Returns the pre-installed maps, without loading them."""
+    return tuple(
+        MapEntry.from_file(file)
+        for file in sorted(TRANSLATION_MAP_DIR.iterdir())
+        if is_mapping(file)
+    )
+
+
+def get_default_maps() -> list[TranslationMap]:
+    """Returns the list of pre-installed maps."""
+    return [entry.translation_map for entry in get_default_map_entries()]
+
+
 def get_all_map_list_tuples(
-    *custom_maps: TranslationMap,
+    *custom_maps: TranslationMap | MapEntry,
 ) -> tuple[set[tuple[Enum, Enum]], set[tuple[Enum, Enum]]]:
     """
     Returns 2 tuples, each contains a pair of SBOMFormat instances.
     These represent available translation directions.
     """
     direction_tuples = set()
-    all_maps: list[TranslationMap] = [*get_default_maps(), *custom_maps]
+    all_maps: list[TranslationMap | MapEntry] = [
+        *get_default_map_entries(),
+        *custom_maps,
+    ]
     for map_ in all_maps:
         formats = tuple(sorted((map_.first, map_.second), key=lambda x: x.value))
         direction_tuples.add(formats)
@@ -62,7 +164,7 @@ def get_all_map_list_tuples(
     return direction_tuples, fallback_tuples  # type: ignore[return-value]
 
 
-def get_all_map_list_markdown(*custom_maps: TranslationMap) -> str:
+def get_all_map_list_markdown(*custom_maps: TranslationMap | MapEntry) -> str:
     """Returns a Markdown string representing all possible translation directions."""
     map_directions, fallback_tuples = get_all_map_list_tuples(*custom_maps)
     ans = ""
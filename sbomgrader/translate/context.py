@@ -0,0 +1,93 @@
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Generator, Hashable
+
+# Caches of the conversion running in the current thread or asyncio task
+_CONVERSION_CACHES: ContextVar[dict[str, dict[Any, Any]] | None] = ContextVar(
+    "conversion_caches", default=None
+)
+
+
+@contextmanager
+def conversion_context() -> Generator[None, None, None]:
+    """
+    Scope of the conversion of a single document. Caches created by
+    `conversion_cache` inside of it are discarded once it ends, so concurrent
+    conversions never share them.
+    """
+    token = _CONVERSION_CACHES.set({})
+    try:
+        yield
+    finally:
+        _CONVERSION_CACHES.reset(token)
+
+
+def conversion_cache(name: str) -> dict[Any, Any]:
+    """
+    A cache of per-document values for transformers, e.g. identifiers
+    of elements which have to be the same wherever they are rendered.
+    :argument name: Unique name of the cache, e.g. the name of the transformer module.
+    :return: The cache of the running conversion. Outside of a conversion,
+    an empty cache which is not kept is returned.
+    """
+    caches = _CONVERSION_CACHES.get()
+    if caches is None:
+        return {}
+    return caches.setdefault(name, {})
+
+
+def conversion_memoize(
+    func: Callable[..., Any] | None = None,
+    *,
+    key: Callable[..., Hashable] | None = None,
+    maxsize: int | None = None,
+) -> Any:
+    """
+    Decorator memoizing a transformer or a processing function for the duration
+    of a single conversion, see `conversion_context`. Outside of a conversion,
+    the function is called every time.
+    Can be used both as `@conversion_memoize` and `@conversion_memoize(...)`.
+    :argument key: Function computing the cache key from the arguments of the call.
+    By default, all the arguments are used, lists and dictionaries included.
+    Calls with arguments which cannot be hashed are not memoized.
+    :argument maxsize: Maximal number of results kept per conversion,
+    the least recently used ones are dropped. Unbounded by default.
+    """
+    if func is None:
+        return lambda f: conversion_memoize(f, key=key, maxsize=maxsize)
+
+    # Transformer modules are executed separately, the file tells them apart
+    cache_name = f"{func.__code__.co_filename}:{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        cache_key = key(*args, **kwargs) if key else _make_key(args, kwargs)
+        try:
+            hash(cache_key)
+        except TypeError:
+            return func(*args, **kwargs)
+        cache = conversion_cache(cache_name)
+        if cache_key in cache:
+            if maxsize is not None:
+                # Most recently used results are at the end
+                cache[cache_key] = cache.pop(cache_key)
+            return cache[cache_key]
+        ans = func(*args, **kwargs)
+        cache[cache_key] = ans
+        if maxsize is not None and len(cache) > maxsize:
+            del cache[next(iter(cache))]
+        return ans
+
+    return wrapper
+
+
+def _make_key(args: tuple[Any, ...], kwargs: dict[str, Any]) -> Hashable:
+    def freeze(item: Any) -> Any:
+        if isinstance(item, (list, tuple)):
+            return type(item), tuple(freeze(i) for i in item)
+        if isinstance(item, dict):
+            return dict, tuple((k, freeze(v)) for k, v in item.items())
+        return item
+
+    return freeze(args), freeze(tuple(sorted(kwargs.items())))
@@ -0,0 +1,579 @@
+"""
+Translation Map templates compiled to Python.
+
+The data of a chunk is a YAML document rendered by Jinja2. Rendering the text
+and parsing it again for every occurrence of the chunk is expensive, so
+templates which only use a common subset of both languages are compiled
+into steps which build the dictionaries and lists directly.
+
+Supported are block mappings and sequences, plain, quoted and constant scalars,
+comments, expressions with any filter of the environment and the
+`for`, `if`/`elif`/`else` and `set` tags placed outside of YAML lines.
+"""
+
+import copy
+import re
+from functools import lru_cache
+from typing import Any, Iterator
+
+import jinja2
+import yaml
+from jinja2.environment import TemplateExpression
+from yaml.reader import Reader
+from yaml.resolver import Resolver
+
+from sbomgrader.core.serialization import yaml_load
+
+# Placeholder of an expression in the text of the template
+_EXPR = "\x00"
+_STR_TAG = "tag:yaml.org,2002:str"
+_RESOLVER = Resolver()
+# Characters which change the meaning of a plain scalar when it starts with them
+_INDICATORS = frozenset("-?:,[]{}#&*!|>'\"%@`")
+_SEQUENCE, _KEY, _SCALAR = range(3)
+_LOOP_VARIABLE = re.compile(r"\bloop\b")
+
+
+class NotCompilableError(Exception):
+    """The template uses syntax which cannot be compiled."""
+
+
+class FallbackError(Exception):
+    """The rendered values cannot be placed in the structure without YAML."""
+
+
+@lru_cache(maxsize=4096)
+def _resolve_plain(text: str) -> Any:
+    """Value of a plain scalar, e.g. numbers, booleans and time are converted."""
+    if _RESOLVER.resolve(yaml.ScalarNode, text, (True, False)) == _STR_TAG:
+        return text
+    return yaml_load(text)
+
+
+class _Expression:
+    __slots__ = ("expression",)
+
+    def __init__(self, env: jinja2.Environment, source: str):
+        if _LOOP_VARIABLE.search(source):
+            raise NotCompilableError("Loop variable is not supported.")
+        try:
+            self.expression: TemplateExpression = env.compile_expression(
+                source, undefined_to_none=False
+            )
+        except jinja2.TemplateSyntaxError as e:
+            raise NotCompilableError(str(e)) from e
+
+    def __call__(self, context: dict[str, Any]) -> Any:
+        return self.expression(**context)
+
+    def text(self, context: dict[str, Any]) -> str:
+        """Evaluate the expression the way Jinja outputs it."""
+        ans = str(self(context))
+        if "\n" in ans or "\r" in ans or "\t" in ans:
+            raise FallbackError("Multi-line value.")
+        if Reader.NON_PRINTABLE.search(ans):
+            raise FallbackError("Value is not printable in YAML.")
+        return ans
+
+
+class _Value:
+    """Value of a scalar on a single line."""
+
+    __slots__ = ("pieces", "forbidden", "quoted")
+
+    def __init__(
+        self,
+        pieces: tuple[str | _Expression, ...],
+        forbidden: str = "",
+        quoted: bool = False,
+    ):
+        self.pieces = pieces
+        self.forbidden = forbidden
+        self.quoted = quoted
+
+    def _text(self, context: dict[str, Any]) -> str:
+        ans = []
+        for piece in self.pieces:
+            if isinstance(piece, str):
+                ans.append(piece)
+                continue
+            text = piece.text(context)
+            if any(char in text for char in self.forbidden):
+                raise FallbackError("Value would end the quoted scalar.")
+            ans.append(text)
+        return "".join(ans)
+
+    def __call__(self, context: dict[str, Any]) -> Any:
+        text = self._text(context)
+        if self.quoted:
+            return text
+        text = text.strip(" ")
+        if not text:
+            return None
+        if text[0] in "[{" and text[-1] in "]}":
+            # A flow collection, e.g. a rendered dictionary
+            try:
+                value = yaml_load(text)
+            except yaml.YAMLError as e:
+                # YAML reports the error in the context of the whole document
+                raise FallbackError(f"Invalid flow collection: {text!r}") from e
+            if not isinstance(value, (dict, list)):
+                raise FallbackError(f"Unexpected flow collection: {text!r}")
+            return value
+        if (
+            text[0] in _INDICATORS
+            or text.startswith("...")
+            or ": " in text
+            or text.endswith(":")
+            or " #" in text
+        ):
+            raise FallbackError(f"Value would be parsed as YAML syntax: {text!r}")
+        try:
+            return _resolve_plain(text)
+        except (yaml.YAMLError, ValueError) as e:
+            # E.g. a timestamp out of range
+            raise FallbackError(f"Invalid plain scalar: {text!r}") from e
+
+
+class _Constant:
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def __call__(self, context: dict[str, Any]) -> Any:
+        if isinstance(self.value, (dict, list)):
+            return copy.deepcopy(self.value)
+        return self.value
+
+
+class _Line:
+    """A line (or its part after a sequence indicator) of the rendered YAML."""
+
+    __slots__ = ("kind", "column", "key", "value")
+
+    def __init__(
+        self,
+        kind: int,
+        column: int,
+        key: Any = None,
+        value: _Value | _Constant | None = None,
+    ):
+        self.kind = kind
+        self.column = column
+        self.key = key
+        self.value = value
+
+
+class _Text:
+    __slots__ = ("lines",)
+
+    def __init__(self, lines: list[_Line]):
+        self.lines = lines
+
+    def run(self, context: dict[str, Any], output: list[tuple]) -> None:
+        for line in self.lines:
+            value = None if line.value is None else line.value(context)
+            output.append((line.kind, line.column, line.key, line.value, value))
+
+
+class _Set:
+    __slots__ = ("name", "expression")
+
+    def __init__(self, name: str, expression: _Expression):
+        self.name = name
+        self.expression = expression
+
+    def run(self, context: dict[str, Any], output: list[tuple]) -> None:
+        context[self.name] = self.expression(context)
+
+
+class _For:
+    __slots__ = ("target", "expression", "body")
+
+    def __init__(self, target: str, expression: _Expression, body: list):
+        self.target = target
+        self.expression = expression
+        self.body = body
+
+    def run(self, context: dict[str, Any], output: list[tuple]) -> None:
+        for item in self.expression(context):
+            # Assignments inside of the loop do not leak out of it
+            loop_context = {**context, self.target: item}
+            _run(self.body, loop_context, output)
+
+
+class _If:
+    __slots__ = ("branches",)
+
+    def __init__(self, branches: list[tuple[_Expression | None, list]]):
+        self.branches = branches
+
+    def run(self, context: dict[str, Any], output: list[tuple]) -> None:
+        for condition, body in self.branches:
+            if condition is None or condition(context):
+                _run(body, context, output)
+                return
+
+
+def _run(body: list, context: dict[str, Any], output: list[tuple]) -> None:
+    for node in body:
+        node.run(context, output)
+
+
+class _Builder:
+    """Builds the structure from the lines the way YAML parses block collections."""
+
+    def __init__(self, lines: list[tuple]):
+        self.lines = lines
+        self.pos = 0
+
+    def build(self) -> Any:
+        if not self.lines:
+            return None
+        ans = self._node(-1)
+        if self.pos != len(self.lines):
+            raise FallbackError("Structure cannot be built without YAML.")
+        return ans
+
+    def _node(self, parent_column: int) -> Any:
+        kind, column, _, _, value = self.lines[self.pos]
+        if column <= parent_column:
+            raise FallbackError("Structure cannot be built without YAML.")
+        if kind == _SEQUENCE:
+            return self._sequence(column)
+        if kind == _KEY:
+            return self._mapping(column)
+        self.pos += 1
+        return value
+
+    def _next(self) -> tuple | None:
+        if self.pos < len(self.lines):
+            return self.lines[self.pos]
+        return None
+
+    def _sequence(self, column: int) -> list[Any]:
+        ans = []
+        while (line := self._next()) and line[0] == _SEQUENCE and line[1] == column:
+            self.pos += 1
+            if (line := self._next()) and line[1] > column:
+                ans.append(self._node(column))
+            else:
+                ans.append(None)
+        return ans
+
+    def _mapping(self, column: int) -> dict[Any, Any]:
+        ans = {}
+        while (line := self._next()) and line[0] == _KEY and line[1] == column:
+            _, _, key, value_spec, value = line
+            self.pos += 1
+            if value_spec is None:
+                if (line := self._next()) and line[1] > column:
+                    value = self._node(column)
+                elif line and line[0] == _SEQUENCE and line[1] == column:
+                    # Sequences can be indented the same way as their key
+                    value = self._sequence(column)
+            # The last of duplicate keys wins, same as in PyYAML
+            ans[key] = value
+        return ans
+
+
+def _tokenize(env: jinja2.Environment, template: str) -> Iterator[tuple[str, str]]:
+    """Yield text, expressions and statements of the template in order."""
+    kind, source = "", ""
+    for _, token, value in env.lex(template):
+        if token == "data":
+            yield "text", value
+        elif token in ("variable_begin", "block_begin"):
+            if value not in ("{{", "{%"):
+                raise NotCompilableError("Whitespace control is not supported.")
+            kind, source = (
+                "expression" if token == "variable_begin" else "statement"
+            ), ""
+        elif token in ("variable_end", "block_end"):
+            if value not in ("}}", "%}"):
+                raise NotCompilableError("Whitespace control is not supported.")
+            yield kind, source.strip()
+        elif token in (
+            "comment_begin",
+            "raw_begin",
+            "linestatement_begin",
+            "linecomment_begin",
+        ):
+            raise NotCompilableError(f"Unsupported syntax {value!r}.")
+        else:
+            source += value
+
+
+class _Shape:
+    """
+    How the output of a part of the template starts and ends.
+    Tags are only supported where removing them does not join two lines.
+    """
+
+    def __init__(self, single_line: bool, opens_line: bool, continues_line: bool):
+        # Whole output might be on a single line
+        self.single_line = single_line
+        # Output might start with content before its first line break
+        self.opens_line = opens_line
+        # Output might end with anything after its last line break
+        self.continues_line = continues_line
+
+    @staticmethod
+    def of_text(text: str) -> "_Shape":
+        first, _, _ = text.partition("\n")
+        _, _, last = text.rpartition("\n")
+        return _Shape("\n" not in text, bool(first.strip(" ")), bool(last))
+
+    def __add__(self, other: "_Shape") -> "_Shape":
+        if self.continues_line and other.opens_line:
+            raise NotCompilableError("Tag is placed inside of a line.")
+        return _Shape(
+            self.single_line and other.single_line,
+            self.opens_line or (self.single_line and other.opens_line),
+            other.continues_line or (other.single_line and self.continues_line),
+        )
+
+    def __or__(self, other: "_Shape") -> "_Shape":
+        return _Shape(
+            self.single_line or other.single_line,
+            self.opens_line or other.opens_line,
+            self.continues_line or other.continues_line,
+        )
+
+
+_EMPTY = _Shape(True, False, False)
+
+
+def _compile_value(
+    text: str, expressions: list[_Expression]
+) -> _Value | _Constant | None:
+    def pieces(part: str) -> tuple[str | _Expression, ...]:
+        ans: list[str | _Expression] = []
+        static_parts = part.split(_EXPR)
+        for idx, static in enumerate(static_parts):
+            if static:
+                ans.append(static)
+            if idx < len(static_parts) - 1:
+                ans.append(expressions[idx])
+        return tuple(ans)
+
+    def check_tail(tail: str) -> None:
+        stripped = tail.lstrip(" ")
+        if stripped and not (stripped.startswith("#") and tail.startswith(" ")):
+            raise NotCompilableError(f"Unexpected content after a scalar: {tail!r}.")
+        if _EXPR in tail:
+            raise NotCompilableError("Expression in a comment.")
+
+    text = text.lstrip(" ")
+    if not text or text.startswith("#"):
+        if _EXPR in text:
+            raise NotCompilableError("Expression in a comment.")
+        return None
+    if text[0] == "'":
+        end = 1
+        while True:
+            end = text.find("'", end)
+            if end == -1:
+                raise NotCompilableError("Quoted scalar spans multiple lines.")
+            if text[end + 1 : end + 2] != "'":
+                break
+            end += 2
+        check_tail(text[end + 1 :])
+        inner = text[1:end].replace("''", "'")
+        if _EXPR not in inner:
+            return _Constant(inner)
+        return _Value(pieces(inner), "'", quoted=True)
+    if text[0] == '"':
+        end = text.find('"', 1)
+        inner = text[1:end]
+        if end == -1 or "\\" in inner:
+            raise NotCompilableError("Unsupported double-quoted scalar.")
+        check_tail(text[end + 1 :])
+        if _EXPR not in inner:
+            return _Constant(inner)
+        return _Value(pieces(inner), '"\\', quoted=True)
+    if text.startswith("#"):
+        return None
+    comment = text.find(" #")
+    if comment != -1:
+        check_tail(text[comment:])
+        text = text[:comment]
+    text = text.rstrip(" ")
+    if text[0] in "?&*!|>%@`":
+        raise NotCompilableError(f"Unsupported scalar {text!r}.")
+    if _EXPR not in text:
+        try:
+            value = yaml_load(text)
+        except yaml.YAMLError as e:
+            raise NotCompilableError(str(e)) from e
+        if isinstance(value, dict) and not text.startswith("{"):
+            raise NotCompilableError(f"Unsupported scalar {text!r}.")
+        return _Constant(value)
+    if text[0] in _INDICATORS or ": " in text or text.endswith(":"):
+        raise NotCompilableError(f"Unsupported scalar {text!r}.")
+    return _Value(pieces(text))
+
+
+def _compile_line(line: str, expressions: list[_Expression]) -> list[_Line]:
+    if "\t" in line or "\r" in line:
+        raise NotCompilableError("Tabulators are not supported.")
+    rest = line.lstrip(" ")
+    if not rest or rest.startswith("#"):
+        if _EXPR in rest:
+            raise NotCompilableError("Expression in a comment.")
+        return []
+    if line.startswith("---") or line.startswith("..."):
+        raise NotCompilableError("Multiple documents are not supported.")
+    column = len(line) - len(rest)
+    ans = []
+    while rest == "-" or rest.startswith("- "):
+        ans.append(_Line(_SEQUENCE, column))
+        stripped = rest[1:].lstrip(" ")
+        column += len(rest) - len(stripped)
+        rest = stripped
+    if not rest or rest.startswith("#"):
+        _compile_value(rest, expressions)
+        return ans
+    key_end = -1
+    for idx, char in enumerate(rest):
+        if char in "\x00'\"#":
+            break
+        if char == ":" and rest[idx + 1 : idx + 2] in ("", " "):
+            key_end = idx
+            break
+    if key_end == -1 or rest[0] in _INDICATORS:
+        ans.append(_Line(_SCALAR, column, value=_compile_value(rest, expressions)))
+        return ans
+    key_text = rest[:key_end].rstrip(" ")
+    try:
+        key = yaml_load(key_text)
+    except yaml.YAMLError as e:
+        raise NotCompilableError(str(e)) from e
+    if key_text == "<<" or isinstance(key, (dict, list)):
+        raise NotCompilableError(f"Unsupported key {key_text!r}.")
+    value = _compile_value(rest[key_end + 1 :], expressions)
+    ans.append(_Line(_KEY, column, key, value))
+    return ans
+
+
+class NativeTemplate:
+    """A Translation Map template compiled to Python."""
+
+    def __init__(self, body: list):
+        self._body = body
+
+    @staticmethod
+    def compile(template: str, env: jinja2.Environment) -> "NativeTemplate":
+        """
+        Compile the template.
+        :param template: The Jinja2 template of YAML data.
+        :param env: Environment providing the filters and globals.
+        :raise NotCompilableError: The template uses unsupported syntax.
+        """
+        # Stack of bodies being compiled with the tag which opened them
+        stack: list[tuple[str, list, list[_Shape]]] = [("", [], [])]
+        # If-tags being compiled with the shapes of their branches
+        conditions: list[tuple[_If, list[_Shape]]] = []
+        text = ""
+        expressions: list[_Expression] = []
+
+        def flush_text() -> None:
+            nonlocal text, expressions
+            lines: list[_Line] = []
+            used = 0
+            for line in text.split("\n"):
+                count = line.count(_EXPR)
+                lines.extend(_compile_line(line, expressions[used : used + count]))
+                used += count
+            if lines:
+                stack[-1][1].append(_Text(lines))
+            stack[-1][2].append(_Shape.of_text(text))
+            text, expressions = "", []
+
+        def shape_of(shapes: list[_Shape]) -> _Shape:
+            ans = _EMPTY
+            for shape in shapes:
+                ans = ans + shape
+            return ans
+
+        for kind, source in _tokenize(env, template):
+            if kind == "text":
+                if _EXPR in source:
+                    raise NotCompilableError("Unexpected character in the template.")
+                text += source
+                continue
+            if kind == "expression":
+                text += _EXPR
+                expressions.append(_Expression(env, source))
+                continue
+            flush_text()
+            name, _, arguments = source.partition(" ")
+            arguments = arguments.strip()
+            if name == "set":
+                target, eq, value = arguments.partition("=")
+                target = target.strip()
+                if not eq or not target.isidentifier():
+                    raise NotCompilableError(f"Unsupported tag {source!r}.")
+                stack[-1][1].append(_Set(target, _Expression(env, value)))
+            elif name == "for":
+                target, in_, iterable = arguments.partition(" in ")
+                target = target.strip()
+                if (
+                    not in_
+                    or not target.isidentifier()
+                    or any(word in iterable.split() for word in ("if", "recursive"))
+                ):
+                    raise NotCompilableError(f"Unsupported tag {source!r}.")
+                loop = _For(target, _Expression(env, iterable), [])
+                stack[-1][1].append(loop)
+                stack.append(("for", loop.body, []))
+            elif name == "endfor" and stack[-1][0] == "for" and not arguments:
+                _, _, shapes = stack.pop()
+                body = shape_of(shapes)
+                # Iterations follow each other
+                body + body
+                stack[-1][2].append(_EMPTY | body)
+            elif name == "if":
+                condition = _If([(_Expression(env, arguments), [])])
+                stack[-1][1].append(condition)
+                conditions.append((condition, []))
+                stack.append(("if", condition.branches[0][1], []))
+            elif name in ("elif", "else") and stack[-1][0] == "if":
+                condition, branch_shapes = conditions[-1]
+                if condition.branches[-1][0] is None:
+                    raise NotCompilableError("Branch after else.")
+                branch_shapes.append(shape_of(stack.pop()[2]))
+                if name == "elif":
+                    condition.branches.append((_Expression(env, arguments), []))
+                elif arguments:
+                    raise NotCompilableError(f"Unsupported tag {source!r}.")
+                else:
+                    condition.branches.append((None, []))
+                stack.append(("if", condition.branches[-1][1], []))
+            elif name == "endif" and stack[-1][0] == "if" and not arguments:
+                condition, branch_shapes = conditions.pop()
+                branch_shapes.append(shape_of(stack.pop()[2]))
+                shape = branch_shapes[0]
+                for branch_shape in branch_shapes[1:]:
+                    shape = shape | branch_shape
+                if condition.branches[-1][0] is not None:
+                    shape = shape | _EMPTY
+                stack[-1][2].append(shape)
+            else:
+                raise NotCompilableError(f"Unsupported tag {source!r}.")
+        flush_text()
+        if len(stack) != 1:
+            raise NotCompilableError("Unclosed tag.")
+        shape_of(stack[0][2])
+        return NativeTemplate(stack[0][1])
+
+    def render(self, variables: dict[str, Any]) -> Any:
+        """
+        Build the data the template describes.
+        :param variables: Values of the template variables.
+        :raise FallbackError: The values need to be rendered by Jinja2 and YAML.
+        """
+        lines: list[tuple] = []
+        _run(self._body, {**variables}, lines)
+        return _Builder(lines).build()
@@ -15,54 +15,50 @@ def should_remove(item: Any) -> bool:
     )
 
 
-def __is_prunable(item: Any) -> bool:
-    return (
-        isinstance(item, dict)
-        or isinstance(item, list)
-        or isinstance(item, datetime.datetime)
-    )
-
-
 def prune(struc: Any) -> Any:
     """This function cuts off invalid values from returned structures."""
     if isinstance(struc, datetime.datetime):
         # YAML automatically transforms ISO time to python datetime.
         # Datetime is not JSON-serializable
         return struc.strftime(TIME_ISO_FORMAT_STRING)
-    if not __is_prunable(struc):
+    if not isinstance(struc, (dict, list)):
         return struc
-    if isinstance(struc, list):
-        to_prune = []
-        replace_dict = {}
-        for idx, item in enumerate(struc):
-            if should_remove(item):
-                to_prune.append(idx)
+    # Every structure is listed before the structures nested in it,
+    # so in reverse, the nested ones are pruned first and their emptiness is known
+    structures: list[dict | list] = [struc]
+    for structure in structures:
+        values = structure.values() if isinstance(structure, dict) else structure
+        for value in values:
+            if isinstance(value, (dict, list)):
+                structures.append(value)
+    for structure in reversed(structures):
+        if isinstance(structure, dict):
+            __prune_dict(structure)
+        else:
+            __prune_list(structure)
+    return struc
 
-            if __is_prunable(item):
-                pruned = prune(item)
-                if should_remove(pruned):
-                    to_prune.append(idx)
-                else:
-                    replace_dict[idx] = pruned
 
-        for idx, item in replace_dict.items():
-            struc[idx] = item
-        for idx in reversed(to_prune):
-            struc.pop(idx)
+def __prune_list(struc: list) -> None:
+    """Remove invalid items of the list, in place. Nested structures must be pruned."""
+    kept = 0
+    for item in struc:
+        if isinstance(item, datetime.datetime):
+            item = item.strftime(TIME_ISO_FORMAT_STRING)
+        elif should_remove(item):
+            continue
+        struc[kept] = item
+        kept += 1
+    del struc[kept:]
 
-    elif isinstance(struc, dict):
-        to_prune_set = set()
-        update_dict = {}
-        for key, val in struc.items():
-            if should_remove(val):
-                to_prune_set.add(key)
-            if __is_prunable(val):
-                pruned = prune(val)
-                if should_remove(pruned):
-                    to_prune_set.add(key)
-                else:
-                    update_dict[key] = pruned
-        struc.update(update_dict)
-        for item in to_prune_set:
-            struc.pop(item)
-    return struc
+
+def __prune_dict(struc: dict) -> None:
+    """Remove invalid values of the dict, in place. Nested structures must be pruned."""
+    to_remove = []
+    for key, val in struc.items():
+        if isinstance(val, datetime.datetime):
+            struc[key] = val.strftime(TIME_ISO_FORMAT_STRING)
+        elif should_remove(val):
+            to_remove.append(key)
+    for key in to_remove:
+        del struc[key]
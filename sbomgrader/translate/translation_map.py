@@ -1,9 +1,11 @@
+import threading
+from contextlib import ExitStack
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
 from enum import Enum
 from pathlib import Path
-from typing import Any, Callable
+from typing import Any, Callable, Generator, Iterable
 
-import yaml
-from jinja2 import meta, Template
+from jinja2 import meta, nodes, Template
 
 from sbomgrader.core.cached_python_loader import PythonLoader
 from sbomgrader.core.definitions import (
@@ -15,36 +17,161 @@ from sbomgrader.core.field_resolve import (
     Variable,
     FieldResolver,
     QueryParser,
+    PathParser,
 )
 from sbomgrader.core.formats import (
     SBOMFormat,
     get_fallbacks,
     SBOM_FORMAT_DEFINITION_MAPPING,
 )
+from sbomgrader.core.serialization import yaml_load, yaml_load_all
 from sbomgrader.core.utils import (
     get_mapping,
     create_jinja_env,
     get_path_to_module,
+    raise_if_cancelled,
+)
+from sbomgrader.translate.context import conversion_cache, conversion_context
+from sbomgrader.translate.native_templates import (
+    FallbackError,
+    NativeTemplate,
+    NotCompilableError,
 )
 from sbomgrader.translate.prune import prune, should_remove
 
+# Seconds between checks of the cancellation while waiting for the workers
+_CANCEL_CHECK_INTERVAL = 0.1
+# Largest number of occurrences rendered by a single Jinja2 invocation
+_RENDER_BATCH_SIZE = 500
+# Smallest number of occurrences of a chunk rendered by a worker in one task
+_MIN_BATCH_SIZE = 50
+# Name of the per-conversion cache of the values of absolute variables,
+# see `_resolve_absolute_variables`
+_VARIABLES_CACHE_NAME = "translation_map.variables"
+# Chunks, the document and the global variables of the worker process,
+# see `TranslationMap.convert`
+_WORKER_STATE: tuple[list["Chunk"], Document, dict[str, list[Any]]] | None = None
+# Variables of the chunks the worker process has rendered
+_WORKER_CHUNKS: dict[int, dict[str, list[Any]]] = {}
+# Conversion context of the worker process, see `_initialize_worker`
+_WORKER_CONTEXT = ExitStack()
+
+
+def _initialize_worker(
+    chunks: list["Chunk"], sbom: Document, variables: dict[str, list[Any]]
+) -> None:
+    global _WORKER_STATE
+    _WORKER_STATE = chunks, sbom, variables
+    _WORKER_CHUNKS.clear()
+    # The worker process only serves a single conversion,
+    # the caches are kept for all the occurrences it renders
+    _WORKER_CONTEXT.close()
+    _WORKER_CONTEXT.enter_context(conversion_context())
+
+
+def _render_in_worker(chunk_idx: int, occurrences: list[tuple[str, Any]]) -> list[Any]:
+    chunks, sbom, variables = _WORKER_STATE  # type: ignore[misc]
+    chunk = chunks[chunk_idx]
+    if chunk_idx not in _WORKER_CHUNKS:
+        _WORKER_CHUNKS[chunk_idx] = chunk.rendering_variables(sbom, variables)
+    return chunk.render_occurrences(sbom, occurrences, _WORKER_CHUNKS[chunk_idx])
+
+
+def _resolve_absolute_variables(
+    resolver: FieldResolver, doc: dict[str, Any]
+) -> dict[str, list[Any]]:
+    """
+    Resolve the absolute variables of the resolver in the document. During
+    a conversion, each variable definition is only resolved once for all the chunks,
+    see `FieldResolver.definition_key`.
+    """
+    cache = conversion_cache(_VARIABLES_CACHE_NAME)
+    known_variables = {}
+    for name in resolver.absolute_variables:
+        key = resolver.definition_key(name)
+        if key in cache:
+            known_variables[name] = cache[key]
+    resolved_variables = resolver.resolve_variables(
+        doc, already_resolved_variables=known_variables
+    )
+    for name, value in resolved_variables.items():
+        if name not in known_variables:
+            cache[resolver.definition_key(name)] = value
+    return resolved_variables
+
 
 class Data:
-    """The data to render in the new document."""
+    """
+    The data to render in the new document.
+    :param native_template: Compile the template to Python if it is possible,
+    see `NativeTemplate`. Otherwise, it is rendered by Jinja2 and parsed by YAML.
+    :param transformers: Loader of the functions in `transformer_path`,
+    shared by all the data of a Translation Map.
+    """
 
     def __init__(
         self,
         template: str,
         variables: dict[str, Variable],
         transformer_path: Path | None = None,
+        native_template: bool = True,
+        transformers: PythonLoader | None = None,
     ):
         self.variables = variables
         self.template = template
         self.field_resolver = FieldResolver(variables)
         self.transformer_path = transformer_path
-        self.jinja_env = create_jinja_env(self.transformer_path)
+        if transformers is None and transformer_path and transformer_path.exists():
+            transformers = PythonLoader(transformer_path)
+        self.transformers = transformers
+        self.jinja_env = create_jinja_env(self.transformer_path, self.transformers)
+        # Resolves the variables relative to each occurrence
+        self._relative_resolver = FieldResolver(
+            {
+                var_name: var.without_relative_start
+                for var_name, var in self.field_resolver.fully_relative_variables.items()
+            }
+        )
         self._variables_needed_in_template = self._get_vars_for_template()
+        self._resolve_transformers()
+        # Occurrences can be rendered together if that has no side effects,
+        # transformers might e.g. cache or generate values
+        self._renders_in_batches = not self._used_transformers() and not any(
+            marker in template for marker in ("{%-", "-%}", "{{-", "-}}", "{#-", "-#}")
+        )
+        # Otherwise, the converting process renders the occurrences in chunk order
+        self.renders_in_workers = self._renders_in_workers()
         self.__template: Template | None = None
+        self.__batch_template: Template | None = None
+        self._use_native_template = native_template
+        self.native_template = self._compile_native_template()
+
+    def __getstate__(self) -> dict[str, Any]:
+        # Jinja2 environments and templates cannot be pickled, they are created again
+        state = self.__dict__.copy()
+        state["jinja_env"] = None
+        state["_Data__template"] = None
+        state["_Data__batch_template"] = None
+        state["native_template"] = None
+        state["_datetime_now"] = self.jinja_env.globals["DATETIME_NOW"]
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        datetime_now = state.pop("_datetime_now")
+        self.__dict__.update(state)
+        self.jinja_env = create_jinja_env(self.transformer_path, self.transformers)
+        # Other processes render the same time as this one
+        self.jinja_env.globals["DATETIME_NOW"] = datetime_now
+        self.native_template = self._compile_native_template()
+
+    def _compile_native_template(self) -> NativeTemplate | None:
+        if not self._use_native_template:
+            return None
+        try:
+            return NativeTemplate.compile(self.template, self.jinja_env)
+        except NotCompilableError:
+            # Rendered by Jinja2 and parsed by YAML instead
+            return None
 
     @property
     def initialized_jinja_template(self) -> Template:
@@ -56,29 +183,35 @@ class Data:
             self.__template = self.jinja_env.from_string(self.template)
         return self.__template
 
-    def render(
+    @property
+    def batch_jinja_template(self) -> Template:
+        """
+        Template rendering many occurrences at once, as a stream of YAML documents.
+        Expects the variables of each occurrence in a list `__occurrences`.
+        """
+        if self.__batch_template is None:
+            assignments = ", ".join(
+                f"{name}=__occurrence[{name!r}]"
+                for name in sorted(self._variables_needed_in_template)
+            )
+            self.__batch_template = self.jinja_env.from_string(
+                "{% for __occurrence in __occurrences %}\n---\n"
+                f"{{% with {assignments} %}}{self.template}\n{{% endwith %}}"
+                "{% endfor %}"
+            )
+        return self.__batch_template
+
+    def _resolve_occurrence_variables(
         self,
         whole_doc: Document,
         path_to_instance: str | None,
         instance_value: Any,
-        prune_empty: bool = True,
-        globally_resolved_variables: dict[str, list[Any]] | None = None,
-    ) -> Any:
-        """
-        Renders a Jinja2 expression according to variables
-        populated from the document.
-        """
+        globally_resolved_variables: dict[str, list[Any]] | None,
+    ) -> dict[str, list[Any]]:
         path_to_instance = "" if path_to_instance is None else path_to_instance
-        globally_resolved_variables = globally_resolved_variables or {}
-        already_resolved_vars = {**globally_resolved_variables}
-        relative_resolver = FieldResolver(
-            {
-                var_name: var.without_relative_start
-                for var_name, var in self.field_resolver.fully_relative_variables.items()
-            }
-        )
+        already_resolved_vars = {**(globally_resolved_variables or {})}
         already_resolved_vars.update(
-            relative_resolver.resolve_variables(
+            self._relative_resolver.resolve_variables(
                 instance_value,
                 already_resolved_variables=already_resolved_vars,
                 path_prefix=path_to_instance,
@@ -95,13 +228,131 @@ class Data:
             resolved_variables[var_name] = [
                 val for val in var_val if val is not FIELD_NOT_PRESENT
             ]
-        data_value = yaml.safe_load(
-            self.initialized_jinja_template.render(**resolved_variables)
+        return resolved_variables
+
+    def render(
+        self,
+        whole_doc: Document,
+        path_to_instance: str | None,
+        instance_value: Any,
+        prune_empty: bool = True,
+        globally_resolved_variables: dict[str, list[Any]] | None = None,
+    ) -> Any:
+        """
+        Renders a Jinja2 expression according to variables
+        populated from the document.
+        """
+        resolved_variables = self._resolve_occurrence_variables(
+            whole_doc, path_to_instance, instance_value, globally_resolved_variables
         )
+        data_value = self._render_data(resolved_variables)
         if prune_empty:
             data_value = prune(data_value)
         return data_value
 
+    def render_many(
+        self,
+        whole_doc: Document,
+        occurrences: Iterable[tuple[str | None, Any]],
+        prune_empty: bool = True,
+        globally_resolved_variables: dict[str, list[Any]] | None = None,
+    ) -> list[Any]:
+        """
+        Renders the data of many occurrences, same as calling `render`
+        for each of them. Occurrences the native template cannot render are
+        rendered by a single Jinja2 invocation and parsed by a single YAML
+        parser, if the template has no side effects.
+        :argument occurrences: Paths to the occurrences and their values.
+        """
+        ans: list[Any] = []
+        # Occurrences waiting to be rendered by Jinja2, by their index
+        pending: dict[int, dict[str, list[Any]]] = {}
+        for path_to_instance, instance_value in occurrences:
+            resolved_variables = self._resolve_occurrence_variables(
+                whole_doc, path_to_instance, instance_value, globally_resolved_variables
+            )
+            if self.native_template is not None:
+                try:
+                    ans.append(self.native_template.render(resolved_variables))
+                    continue
+                except FallbackError:
+                    # Rendered by Jinja2 below
+                    pass
+            pending[len(ans)] = resolved_variables
+            ans.append(None)
+            if len(pending) >= _RENDER_BATCH_SIZE:
+                self._render_pending(pending, ans)
+        self._render_pending(pending, ans)
+        if prune_empty:
+            ans = [prune(data_value) for data_value in ans]
+        return ans
+
+    def _render_pending(
+        self, pending: dict[int, dict[str, list[Any]]], ans: list[Any]
+    ) -> None:
+        """Renders the data of the pending occurrences with Jinja2 into `ans`."""
+        if len(pending) > 1 and self._renders_in_batches:
+            try:
+                rendered = list(
+                    yaml_load_all(
+                        self.batch_jinja_template.render(
+                            __occurrences=list(pending.values())
+                        )
+                    )
+                )
+            except Exception:
+                # The failing occurrence raises the error again below
+                rendered = []
+            if len(rendered) == len(pending):
+                for idx, data_value in zip(pending, rendered):
+                    ans[idx] = data_value
+                pending.clear()
+                return
+        for idx, variables in pending.items():
+            ans[idx] = yaml_load(self.initialized_jinja_template.render(**variables))
+        pending.clear()
+
+    def _render_data(self, variables: dict[str, Any]) -> Any:
+        if self.native_template is not None:
+            try:
+                return self.native_template.render(variables)
+            except FallbackError:
+                # The values need YAML
+                pass
+        return yaml_load(self.initialized_jinja_template.render(**variables))
+
+    def _used_transformers(self) -> set[str]:
+        """
+        Names of the transformers the template calls by the `func` filter.
+        An empty name stands for a name which is not a constant.
+        """
+        ans = set()
+        for node in self.jinja_env.parse(self.template).find_all(nodes.Filter):
+            if node.name != "func":
+                continue
+            name = next(
+                (kwarg.value for kwarg in node.kwargs if kwarg.key == "name"), None
+            )
+            ans.add(name.value if isinstance(name, nodes.Const) else "")
+        return ans
+
+    def _resolve_transformers(self) -> None:
+        """Load the functions the template uses, so missing ones are reported early."""
+        if self.transformers is None:
+            return
+        for name in self._used_transformers():
+            if name:
+                self.transformers.load_func(name)
+
+    def _renders_in_workers(self) -> bool:
+        """Were all the transformers loaded from files declaring them safe for workers?"""
+        names = self._used_transformers()
+        if not names:
+            return True
+        if "" in names or self.transformers is None:
+            return False
+        return all(self.transformers.is_worker_safe(name) for name in names)
+
     def _get_vars_for_template(self) -> set[str]:
         parsed_content = self.jinja_env.parse(self.template)
         jinja_vars = meta.find_undeclared_variables(parsed_content)
@@ -191,13 +442,8 @@ class Chunk:
             else:
                 parent_obj.append(value_to_insert)
 
-    def convert_and_add(
-        self,
-        orig_doc: Document,
-        new_doc: dict[str, Any],
-        globally_resolved_variables: dict[str, list[Any]] | None = None,
-    ) -> None:
-        """Mutates the new_doc with the occurrences of this chunk."""
+    def _formats(self, orig_doc: Document) -> tuple[Enum, Enum]:
+        """Formats the document is converted from and to."""
         convert_from = orig_doc.sbom_format
         if convert_from not in {self.first_format, self.second_format}:
             fallbacks = get_fallbacks(orig_doc.sbom_format)
@@ -210,16 +456,74 @@ class Chunk:
             if self.first_format != convert_from
             else self.second_format
         )
-        relevant_data = self.data_for(convert_to)
+        return convert_from, convert_to
+
+    def target_data(self, orig_doc: Document) -> Data | None:
+        """The data rendered when converting the orig_doc, if any."""
+        _, convert_to = self._formats(orig_doc)
+        return self.data_for(convert_to)
+
+    def rendering_variables(
+        self,
+        orig_doc: Document,
+        globally_resolved_variables: dict[str, list[Any]] | None = None,
+    ) -> dict[str, list[Any]]:
+        """Variables shared by all the occurrences of this chunk."""
+        convert_from, _ = self._formats(orig_doc)
+        source_resolver = self.resolver_for(convert_from)
+        chunk_based_absolute_vars = _resolve_absolute_variables(
+            source_resolver, orig_doc.doc
+        )
+        return {**(globally_resolved_variables or {}), **chunk_based_absolute_vars}
+
+    def render_occurrences(
+        self,
+        orig_doc: Document,
+        occurrences: Iterable[tuple[str, Any]],
+        variables: dict[str, list[Any]],
+    ) -> list[Any]:
+        """
+        Renders the data of the occurrences in order, leaving out empty values.
+        :argument occurrences: Paths and values of the occurrences, see `occurrences`.
+        :argument variables: Variables returned by `rendering_variables`.
+        """
+        relevant_data = self.target_data(orig_doc)
         if not relevant_data:
             # This chunk does not specify anything for this direction
-            return
-        globally_resolved_variables = globally_resolved_variables or {}
+            return []
+        return [
+            rendered_data
+            for rendered_data in relevant_data.render_many(
+                orig_doc, occurrences, globally_resolved_variables=variables
+            )
+            if not should_remove(rendered_data)
+        ]
 
-        source_resolver = self.resolver_for(convert_from)
-        chunk_based_absolute_vars = source_resolver.resolve_variables(orig_doc.doc)
-        global_vars = {**globally_resolved_variables, **chunk_based_absolute_vars}
+    def render(
+        self,
+        orig_doc: Document,
+        globally_resolved_variables: dict[str, list[Any]] | None = None,
+    ) -> list[Any]:
+        """
+        Renders the data of all the occurrences of this chunk in order.
+        Only reads the orig_doc, the data is inserted by `add_rendered`.
+        """
+        if not self.target_data(orig_doc):
+            return []
+        return self.render_occurrences(
+            orig_doc,
+            self.occurrences(orig_doc, globally_resolved_variables).items(),
+            self.rendering_variables(orig_doc, globally_resolved_variables),
+        )
 
+    def add_rendered(
+        self, orig_doc: Document, new_doc: dict[str, Any], rendered: list[Any]
+    ) -> None:
+        """Mutates the new_doc with the data returned by `render`."""
+        _, convert_to = self._formats(orig_doc)
+        if not self.data_for(convert_to) or not rendered:
+            # Nothing to insert, the path must not be created empty
+            return
         # Resolve all info about the point where to insert data -- once
         appender_resolver = self.resolver_for(convert_to)
         append_path = appender_resolver.ensure_field_path(
@@ -229,21 +533,22 @@ class Chunk:
         mutable_parents = appender_resolver.get_mutable_parents(
             new_doc, append_path, create_nonexistent=True
         )
+        for rendered_data in rendered:
+            for mutable_parent in mutable_parents:
+                self.__mutate_obj_by_inserting(
+                    mutable_parent, rendered_data, last_insert_step
+                )
 
-        for occurrence_path, occurrence_value in self.occurrences(
-            orig_doc, globally_resolved_variables
-        ).items():
-            rendered_data = relevant_data.render(
-                orig_doc,
-                occurrence_path,
-                occurrence_value,
-                globally_resolved_variables=global_vars,
-            )
-            if not should_remove(rendered_data):
-                for mutable_parent in mutable_parents:
-                    self.__mutate_obj_by_inserting(
-                        mutable_parent, rendered_data, last_insert_step
-                    )
+    def convert_and_add(
+        self,
+        orig_doc: Document,
+        new_doc: dict[str, Any],
+        globally_resolved_variables: dict[str, list[Any]] | None = None,
+    ) -> None:
+        """Mutates the new_doc with the occurrences of this chunk."""
+        self.add_rendered(
+            orig_doc, new_doc, self.render(orig_doc, globally_resolved_variables)
+        )
 
 
 class TranslationMap:
@@ -272,8 +577,11 @@ class TranslationMap:
         )
 
     @staticmethod
-    def from_file(file: str | Path) -> "TranslationMap":
-        """Load the Translation Map from a file."""
+    def from_file(file: str | Path, native_templates: bool = True) -> "TranslationMap":
+        """
+        Load the Translation Map from a file.
+        :param native_templates: Compile the templates of the data to Python where possible.
+        """
         schema_dict = get_mapping(file, TRANSLATION_MAP_VALIDATION_SCHEMA_PATH)
         assert (
             schema_dict is not None
@@ -290,6 +598,13 @@ class TranslationMap:
         second_transformer_file = get_path_to_module(
             file, "Transformer", "second", second
         )
+        # Each transformer file is executed once and shared by all the chunks
+        first_transformers = (
+            PythonLoader(first_transformer_file) if first_transformer_file else None
+        )
+        second_transformers = (
+            PythonLoader(second_transformer_file) if second_transformer_file else None
+        )
         second_glob_var_initialized = Variable.from_schema(second_glob_var)
 
         chunks = []
@@ -308,11 +623,23 @@ class TranslationMap:
             second_vars.update(second_variables)
 
             if first_data_dict := chunk_dict.get("firstData"):
-                first_data = Data(first_data_dict, second_vars, second_transformer_file)
+                first_data = Data(
+                    first_data_dict,
+                    second_vars,
+                    second_transformer_file,
+                    native_templates,
+                    second_transformers,
+                )
             else:
                 first_data = None
             if second_data_dict := chunk_dict.get("secondData"):
-                second_data = Data(second_data_dict, first_vars, first_transformer_file)
+                second_data = Data(
+                    second_data_dict,
+                    first_vars,
+                    first_transformer_file,
+                    native_templates,
+                    first_transformers,
+                )
             else:
                 second_data = None
             chunk = Chunk(
@@ -368,22 +695,143 @@ class TranslationMap:
         raise ValueError(f"Cannot do anything with this format: {doc.sbom_format}.")
 
     def _input_format(self, doc: Document) -> Enum:
+        return self._input_format_for(doc.sbom_format)
+
+    def _input_format_for(self, sbom_format: Enum) -> Enum:
         for form in self.first, self.second:
-            if doc.sbom_format is form:
+            if sbom_format is form:
                 return form
         for form in self.first, self.second:
-            if doc.sbom_format in get_fallbacks(form):
+            if sbom_format in get_fallbacks(form):
                 return form
-        raise ValueError(f"Cannot do anything with this format: {doc.sbom_format}.")
+        raise ValueError(f"Cannot do anything with this format: {sbom_format}.")
 
-    def convert(self, sbom: Document, override_format: Enum | None = None) -> Document:
+    def referenced_fields(self, sbom_format: Enum) -> set[str] | None:
+        """
+        Top-level fields read from a document of the format `sbom_format`
+        during the conversion. Returns None if the whole document is needed.
+        """
+        input_format = self._input_format_for(sbom_format)
+        output_format = self.second if input_format is self.first else self.first
+        if self.preprocessing_funcs.get(input_format) or self.postprocessing_funcs.get(
+            output_format
+        ):
+            # Processing functions receive the whole original document
+            return None
+        variable_definitions = (
+            self.first_variables
+            if input_format is self.first
+            else self.second_variables
+        )
+        ans = FieldResolver(variable_definitions).referenced_fields
+        for chunk in self.chunks:
+            if ans is None:
+                return None
+            if not chunk.data_for(output_format):
+                continue
+            root_field = PathParser(chunk.field_path_for(input_format) or "").root_field
+            chunk_fields = chunk.resolver_for(input_format).referenced_fields
+            if root_field is None or chunk_fields is None:
+                return None
+            ans.add(root_field[0])
+            ans.update(chunk_fields)
+        return ans
+
+    def convert(
+        self,
+        sbom: Document,
+        override_format: Enum | None = None,
+        cancel: threading.Event | None = None,
+        workers: int = 1,
+    ) -> Document:
         """
         Converts document to the specified format.
         :argument sbom: Sbom document to convert.
         :argument override_format: Specify which is the output format.
         If omitted, the format is chosen from values self.first or
         self.second. The value not associated with input document will be used.
+        :argument cancel: Event which stops the conversion before the next chunk
+        once set, `OperationCancelledError` is raised then.
+        :argument workers: Number of processes rendering the chunks. Occurrences
+        of large chunks are split between them. The rendered data is inserted
+        in the original order, so the output is the same as when converting
+        in this process (the default, 1 worker). Chunks calling transformers
+        from files which do not declare `WORKER_SAFE = True` are rendered
+        by this process.
         """
+        if workers < 1:
+            raise ValueError("The number of workers must be a positive number.")
+        # Transformers keep their per-document caches in the context
+        with conversion_context():
+            return self.__convert(sbom, override_format, cancel, workers)
+
+    def __render_chunks(
+        self,
+        sbom: Document,
+        variables: dict[str, list[Any]],
+        cancel: threading.Event | None,
+        workers: int,
+    ) -> Generator[list[Any], None, None]:
+        """Yields the data rendered by each of the chunks, in the order of the chunks."""
+        if workers == 1:
+            for chunk in self.chunks:
+                raise_if_cancelled(cancel)
+                yield chunk.render(sbom, variables)
+            return
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_initialize_worker,
+            initargs=(self.chunks, sbom, variables),
+        )
+        try:
+            # Occurrences of large chunks are split into batches rendered
+            # by different workers, results are joined in the original order
+            batches: list[list[Future[list[Any]]] | None] = []
+            for idx, chunk in enumerate(self.chunks):
+                data = chunk.target_data(sbom)
+                if data is None or not data.renders_in_workers:
+                    # Rendered by this process, in the order of the chunks
+                    batches.append(None)
+                    continue
+                occurrences = list(chunk.occurrences(sbom, variables).items())
+                batch_size = max(_MIN_BATCH_SIZE, -(-len(occurrences) // (4 * workers)))
+                batches.append(
+                    [
+                        executor.submit(
+                            _render_in_worker,
+                            idx,
+                            occurrences[start : start + batch_size],
+                        )
+                        for start in range(0, len(occurrences), batch_size)
+                    ]
+                )
+            for chunk, futures in zip(self.chunks, batches):
+                if futures is None:
+                    raise_if_cancelled(cancel)
+                    yield chunk.render(sbom, variables)
+                    continue
+                rendered = []
+                for future in futures:
+                    while True:
+                        raise_if_cancelled(cancel)
+                        try:
+                            rendered.extend(
+                                future.result(timeout=_CANCEL_CHECK_INTERVAL)
+                            )
+                        except TimeoutError:
+                            continue
+                        break
+                yield rendered
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    def __convert(
+        self,
+        sbom: Document,
+        override_format: Enum | None,
+        cancel: threading.Event | None,
+        workers: int,
+    ) -> Document:
         new_data: dict[str, Any] = {}
         assert sbom.sbom_format in (
             self.first,
@@ -413,13 +861,17 @@ class TranslationMap:
             if self._input_format(sbom) == self.first
             else self.second_variables
         )
-        globally_loaded_variables = FieldResolver(
-            variable_definitions
-        ).resolve_variables(sbom.doc)
+        globally_loaded_variables = _resolve_absolute_variables(
+            FieldResolver(variable_definitions), sbom.doc
+        )
 
         # Conversion
-        for chunk in self.chunks:
-            chunk.convert_and_add(sbom, new_data, globally_loaded_variables)
+        for chunk, rendered in zip(
+            self.chunks,
+            self.__render_chunks(sbom, globally_loaded_variables, cancel, workers),
+        ):
+            chunk.add_rendered(sbom, new_data, rendered)
+        raise_if_cancelled(cancel)
         # Postprocess
         for postprocessing_func in self.postprocessing_funcs.get(
             self._output_format(sbom), []
@@ -433,6 +885,40 @@ class TranslationMap:
             new_data.update(SBOM_FORMAT_DEFINITION_MAPPING[override_format])
         return Document(new_data)
 
+    async def convert_async(
+        self,
+        sbom: Document | str | Path,
+        override_format: Enum | None = None,
+        executor: Executor | None = None,
+    ) -> Document:
+        """
+        Converts document to the specified format without blocking the event loop.
+        The conversion, as well as reading the file, runs in the executor.
+        Cancelling the awaiting task stops the conversion before the next chunk.
+        :argument sbom: Sbom document or a path to a JSON or YAML file to convert.
+        :argument override_format: See `convert`.
+        :argument executor: Executor to convert in,
+        see `sbomgrader.core.aio.run_cancellable`.
+        """
+        # Imports asyncio, which is only needed by the asynchronous API
+        from sbomgrader.core.aio import run_cancellable
+
+        if isinstance(sbom, Document):
+            return await run_cancellable(
+                self.convert, sbom, override_format, executor=executor
+            )
+        return await run_cancellable(
+            self.__convert_file, sbom, override_format, executor=executor
+        )
+
+    def __convert_file(
+        self,
+        file: str | Path,
+        override_format: Enum | None = None,
+        cancel: threading.Event | None = None,
+    ) -> Document:
+        return self.convert(Document.from_file(file), override_format, cancel)
+
     def is_exact_map(self, from_: Enum, to: Enum) -> bool:
         """Determine if this map converts between these two formats."""
         return ((from_ is self.first) and (to is self.second)) or (
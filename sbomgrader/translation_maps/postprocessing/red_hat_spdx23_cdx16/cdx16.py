@@ -1,12 +1,20 @@
 from typing import Any
 
 from sbomgrader.core.field_resolve import FieldResolver, Variable
+from sbomgrader.core.graph import DocumentGraph
+from sbomgrader.translate.context import conversion_memoize
 from sbomgrader.translate.prune import prune
 from sbomgrader.translation_maps.transformers.red_hat_spdx23_cdx16.spdx23 import (
     spdxid_to_bom_ref,
 )
 
 
+# The old document is not modified by postprocessing, its index can be shared
+@conversion_memoize(key=lambda doc: id(doc))
+def _graph(doc: dict[str, Any]) -> DocumentGraph:
+    return DocumentGraph(doc)
+
+
 def deduplicate_srpm_midstreams(
     old_doc: dict[str, Any], new_doc: dict[str, Any]
 ) -> None:
@@ -19,24 +27,15 @@ def deduplicate_srpm_midstreams(
         "referenceLocator%arch=src]SPDXID",
     )
     midstream_bom_ref_map = {}
+    graph = _graph(old_doc)
 
     for srpm_spdxid in old_srpms_spdxids:
-        related_midstream_spdxids = field_resolver.get_objects(
-            old_doc,
-            f"relationships[spdxElementId={srpm_spdxid},"
-            f"relationshipType=CONTAINS]relatedSpdxElement",
-        )
-        srpm_purls = field_resolver.get_objects(
-            old_doc,
-            f"packages[SPDXID={srpm_spdxid}]externalRefs[referenceType=purl]referenceLocator",
-        )
+        related_midstream_spdxids = graph.related(srpm_spdxid, "CONTAINS")
+        srpm_purls = graph.package_purls(srpm_spdxid)
         srpm_bom_ref = spdxid_to_bom_ref(srpm_spdxid, srpm_purls)
         midstream_bom_ref_map[srpm_bom_ref] = set()
         for related_midstream_spdxid in related_midstream_spdxids:
-            related_midstream_purls = field_resolver.get_objects(
-                old_doc,
-                f"packages[SPDXID={related_midstream_spdxid}]externalRefs[referenceType=purl]referenceLocator",
-            )
+            related_midstream_purls = graph.package_purls(related_midstream_spdxid)
             midstream_bom_ref = spdxid_to_bom_ref(
                 related_midstream_spdxid, related_midstream_purls
             )
@@ -53,10 +52,12 @@ def deduplicate_srpm_midstreams(
                 ancestor.get("bom-ref")
                 not in midstream_bom_ref_map[component.get("bom-ref")]
             ):
-                to_remove.append(ancestor.get("bom-ref"))
+                to_remove.append(idx)
         for idx in reversed(to_remove):
             ancestors.pop(idx)
-    prune(new_doc)
+        if to_remove:
+            # The rest of the document has been pruned when it was rendered
+            prune(component)
 
 
 def deduplicate_srpm_upstreams(
@@ -71,26 +72,18 @@ def deduplicate_srpm_upstreams(
         }
     )
     upstream_bom_ref_map = {}
+    graph = _graph(old_doc)
     old_midstream_spdxids = old_field_resolver.get_objects(
         old_doc,
         "relationships[relationshipType=CONTAINS,spdxElementId=${srpm_packages_spdxids}]relatedSpdxElement",
     )
     for midstream_spdxid in old_midstream_spdxids:
-        midstream_purls = old_field_resolver.get_objects(
-            old_doc,
-            f"packages[SPDXID={midstream_spdxid}]externalRefs[referenceType=purl]referenceLocator",
-        )
+        midstream_purls = graph.package_purls(midstream_spdxid)
         midstream_bom_ref = spdxid_to_bom_ref(midstream_spdxid, midstream_purls)
         upstream_bom_ref_map[midstream_bom_ref] = set()
-        related_upstream_spdxids = old_field_resolver.get_objects(
-            old_doc,
-            f"relationships[relationshipType=GENERATED_FROM,spdxElementId={midstream_spdxid}]relatedSpdxElement",
-        )
+        related_upstream_spdxids = graph.related(midstream_spdxid, "GENERATED_FROM")
         for related_upstream_spdxid in related_upstream_spdxids:
-            related_upstream_purls = old_field_resolver.get_objects(
-                old_doc,
-                f"packages[SPDXID={related_upstream_spdxid}]externalRefs[referenceType=purl]referenceLocator",
-            )
+            related_upstream_purls = graph.package_purls(related_upstream_spdxid)
             upstream_bom_ref = spdxid_to_bom_ref(
                 related_upstream_spdxid, related_upstream_purls
             )
@@ -4,29 +4,31 @@ import urllib.parse
 import uuid
 
 from packageurl import PackageURL
-from spdx_tools.spdx.model.spdx_no_assertion import SPDX_NO_ASSERTION_STRING
 
 from sbomgrader.core.definitions import FIELD_NOT_PRESENT
+from sbomgrader.translate.context import conversion_memoize
 from sbomgrader.translation_maps.transformers.red_hat_spdx23_cdx16.utils import (
     SPDX_CDX_HASHES,
+    SPDX_NO_ASSERTION_STRING,
 )
 
-_CACHE = {}
+# The results of the functions do not depend on the earlier calls
+WORKER_SAFE = True
 
 
 def bom_ref_to_spdxid(bom_ref: str, component_name_var: list[str]) -> str:
-
-    if bom_ref in _CACHE:
-        return _CACHE[bom_ref]
     if not bom_ref or bom_ref is FIELD_NOT_PRESENT:
         name = next(iter(component_name_var), None)
         if name and name is not FIELD_NOT_PRESENT:
             bom_ref = name
         else:
             bom_ref = base64.b64encode(uuid.uuid4().bytes).decode()
+    return _bom_ref_to_spdxid(bom_ref)
+
 
-    _CACHE[bom_ref] = f"SPDXRef-{re.sub(r"[^A-Za-z\d.-]", "-", bom_ref)}"
-    return _CACHE[bom_ref]
+@conversion_memoize
+def _bom_ref_to_spdxid(bom_ref: str) -> str:
+    return f"SPDXRef-{re.sub(r"[^A-Za-z\d.-]", "-", bom_ref)}"
 
 
 def hash_alg_from_cdx_to_spdx(algorithm: str) -> str:
@@ -4,28 +4,26 @@ from typing import Any
 
 import yaml
 from packageurl import PackageURL
-from spdx_tools.spdx.model.spdx_no_assertion import SPDX_NO_ASSERTION_STRING
 
 from sbomgrader.core.definitions import FIELD_NOT_PRESENT
+from sbomgrader.translate.context import conversion_memoize
 from sbomgrader.translation_maps.transformers.red_hat_spdx23_cdx16.utils import (
     SPDX_CDX_HASHES,
+    SPDX_NO_ASSERTION_STRING,
 )
 
-_CACHE = {}
-
 
 def get_serial_number(_: Any) -> str:
     return str(uuid.uuid4())
 
 
+# The element keeps the bom-ref it got first, also where its purls are not known
+@conversion_memoize(key=lambda spdxid, purls: spdxid)
 def spdxid_to_bom_ref(spdxid: str, purls: list[str]) -> str:
-    if spdxid in _CACHE:
-        return _CACHE[spdxid]
-    purl = next(iter(purls), FIELD_NOT_PRESENT)
+    purl: Any = next(iter(purls), FIELD_NOT_PRESENT)
     if purl is FIELD_NOT_PRESENT:
         purl = spdxid.replace("SPDXRef-", "", 1)
-    _CACHE[spdxid] = purl
-    return _CACHE[spdxid]
+    return purl
 
 
 def hash_alg_from_spdx_to_cdx(algorithm: str) -> str:
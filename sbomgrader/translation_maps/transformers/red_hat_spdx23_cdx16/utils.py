@@ -1,3 +1,6 @@
+# Same as in spdx-tools, which is slow to import for a single constant
+SPDX_NO_ASSERTION_STRING = "NOASSERTION"
+
 SPDX_CDX_HASHES = {
     # Sources: https://spdx.github.io/spdx-spec/v2.3/package-information/
     # https://cyclonedx.org/guides/OWASP_CycloneDX-Authoritative-Guide-to-SBOM-en.pdf
@@ -14,6 +14,12 @@ def maximal_time_per_grade() -> float:
     return 0.5
 
 
+@pytest.fixture()
+def maximal_import_time() -> float:
+    # Including the start of the interpreter
+    return 0.25
+
+
 @pytest.fixture()
 def repetitions() -> int:
     return 2
@@ -0,0 +1,15 @@
+import subprocess
+import sys
+import time
+
+
+def test_performance_cli_import(repetitions: int, maximal_import_time: float):
+    def import_cli() -> float:
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import sbomgrader.__main__"], check=True)
+        return time.perf_counter() - start
+
+    # The first run also writes the bytecode caches
+    import_cli()
+    res = sum(import_cli() for _ in range(repetitions))
+    assert res / repetitions < maximal_import_time
@@ -0,0 +1,77 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from sbomgrader.core.aio import run_cancellable
+from sbomgrader.core.definitions import OperationCancelledError
+from sbomgrader.core.documents import Document
+from sbomgrader.core.enums import SBOMType
+from sbomgrader.core.formats import SBOMFormat
+from sbomgrader.core.utils import raise_if_cancelled
+from sbomgrader.grade.cookbook_bundles import CookbookBundle
+
+
+def test_grade_async(grading_dir, image_build_sbom):
+    bundle = CookbookBundle.for_document_type(SBOMType.IMAGE)
+    expected = bundle(image_build_sbom).to_dict()
+
+    async def grade_concurrently():
+        with ThreadPoolExecutor(2) as executor:
+            return await asyncio.gather(
+                bundle.grade_async(image_build_sbom, executor),
+                bundle.grade_async(
+                    grading_dir / "image_build_sbom.spdx.json", executor
+                ),
+            )
+
+    for result in asyncio.run(grade_concurrently()):
+        assert result.to_dict() == expected
+
+
+def test_grading_cancelled(image_build_sbom):
+    bundle = CookbookBundle.for_document_type(SBOMType.IMAGE)
+    cancel = threading.Event()
+    cancel.set()
+    with pytest.raises(OperationCancelledError):
+        bundle(image_build_sbom, cancel)
+
+
+def test_convert_async(built_in_translation_map, image_build_sbom):
+    expected = built_in_translation_map.convert(
+        image_build_sbom, SBOMFormat.CYCLONEDX16
+    )
+    converted = asyncio.run(
+        built_in_translation_map.convert_async(image_build_sbom, SBOMFormat.CYCLONEDX16)
+    )
+    assert isinstance(converted, Document)
+    assert converted.sbom_format is expected.sbom_format
+    assert len(converted.doc.get("components", [])) == len(
+        expected.doc.get("components", [])
+    )
+
+
+def test_run_cancellable():
+    stopped = threading.Event()
+
+    def work(cancel: threading.Event | None = None) -> None:
+        while True:
+            try:
+                raise_if_cancelled(cancel)
+            except OperationCancelledError:
+                stopped.set()
+                raise
+            time.sleep(0.01)
+
+    async def cancel_work():
+        task = asyncio.create_task(run_cancellable(work))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # The task only finishes cancelling once the work stops
+        assert stopped.is_set()
+
+    asyncio.run(cancel_work())
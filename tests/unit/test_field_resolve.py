@@ -1,8 +1,11 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
 from typing import Union
 
 import pytest
 
+from sbomgrader.core.definitions import FieldNotPresentError
 from sbomgrader.core.enums import QueryType
 from sbomgrader.core.field_resolve import (
     PathParser,
@@ -10,6 +13,8 @@ from sbomgrader.core.field_resolve import (
     FieldResolver,
     Query,
     Variable,
+    ElementRunner,
+    ElementState,
 )
 
 
@@ -161,3 +166,178 @@ def test_create_nonexistent(
     testing_doc = deepcopy(original_doc)
     resolver.get_objects(testing_doc, path, {}, True)
     assert expected_doc == testing_doc
+
+
+@pytest.mark.parametrize(
+    ["path", "expected"],
+    [
+        ("foo.bar", ("foo", False)),
+        ("foo[|]bar", ("foo", False)),
+        ("?.foo[bar=${spam}]ham", ("foo", True)),
+        ("[0]foo", None),
+        ("", None),
+    ],
+)
+def test_path_parser_root_field(path: str, expected: tuple[str, bool] | None):
+    assert PathParser(path).root_field == expected
+
+
+def test_path_parser_shared_between_threads():
+    parser = PathParser("foo[bar=1]@[kind=a,name=b].spam")
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(parser.parse, ["ham[2]"] * 32))
+    assert all(result is results[0] for result in results)
+    assert results[0] == PathParser("foo[bar=1]@[kind=a,name=b].spam").parse("ham[2]")
+
+
+def _outcome(check) -> tuple[type[Exception], str] | None:
+    try:
+        check()
+    except Exception as e:
+        return type(e), str(e)
+    return None
+
+
+def _is_positive(value) -> None:
+    assert value > 0, f"{value} is not positive"
+
+
+@pytest.mark.parametrize(
+    ["path", "minimal_runs"],
+    [
+        ("foo[&]bar", 1),
+        ("?.foo[&]bar", 1),
+        ("foo[|]bar", 1),
+        ("foo[1]bar", 1),
+        ("foo[kind=a]bar", 1),
+        ("foo[kind=a,|]bar", 1),
+        ("foo[kind!=a]bar", 3),
+        ("foo[kind=c]bar", 1),
+        ("foo[kind=c]bar", 0),
+        ("foo[&]?.bar", 0),
+        ("foo[&]nums[|]", 1),
+        ("foo[nums[&]=1]bar", 1),
+    ],
+)
+def test_element_runner(path: str, minimal_runs: int):
+    doc = {
+        "foo": [
+            {"kind": "a", "bar": 1, "nums": [-1, 1]},
+            {"kind": "b", "bar": -2, "nums": [1]},
+            {"kind": "a", "bar": -3},
+            {"kind": "b", "bar": 4, "nums": [-1]},
+        ]
+    }
+    resolver = FieldResolver({})
+    expected = _outcome(
+        lambda: resolver.run_func(doc, _is_positive, path, minimal_runs)
+    )
+    assert ElementRunner.supports(path)
+    runner = ElementRunner(resolver, _is_positive, path, minimal_runs)
+
+    def stream() -> None:
+        for idx, element in enumerate(doc[runner.field_name]):
+            runner.feed(idx, element)
+        runner.finish()
+
+    assert _outcome(stream) == expected
+
+    def sharded(serialized: bool) -> None:
+        # Shards are evaluated separately and merged in reverse order
+        merged = ElementRunner(resolver, _is_positive, path, minimal_runs)
+        for start, end in ((3, 4), (1, 3), (0, 1)):
+            shard_runner = ElementRunner(resolver, _is_positive, path, minimal_runs)
+            for idx, element in enumerate(doc["foo"][start:end], start):
+                shard_runner.feed(idx, element)
+            state = shard_runner.state
+            if serialized:
+                state = ElementState.from_dict(json.loads(json.dumps(state.to_dict())))
+            merged.merge(state)
+        merged.finish()
+
+    assert _outcome(lambda: sharded(False)) == expected
+    assert _outcome(lambda: sharded(True)) == expected
+
+
+@pytest.mark.parametrize(
+    ["path", "sampled_idx", "inconclusive"],
+    [
+        # The only matching element is not in the sample
+        ("foo[kind=c]bar", [0, 1], True),
+        # Every sampled element failed, another one might pass
+        ("foo[|]bar", [1, 2], True),
+        ("foo[|]bar", [0, 1], False),
+        ("foo[kind=c]bar", [1, 3], False),
+    ],
+)
+def test_element_runner_sampled(path: str, sampled_idx: list[int], inconclusive: bool):
+    doc = {
+        "foo": [
+            {"kind": "a", "bar": 1},
+            {"kind": "b", "bar": -2},
+            {"kind": "a", "bar": -3},
+            {"kind": "c", "bar": 4},
+        ]
+    }
+    resolver = FieldResolver({})
+    runner = ElementRunner(resolver, _is_positive, path, exhaustive=True)
+    for idx in sampled_idx:
+        runner.feed(idx, doc["foo"][idx])
+    runner.finish(fraction=0.5)
+    assert bool(runner.inconclusive) is inconclusive
+    # The same sample is conclusive if it is the whole list
+    if inconclusive:
+        with pytest.raises(AssertionError):
+            runner.finish()
+
+
+def test_element_state_serialization():
+    class CustomError(Exception):
+        pass
+
+    state = ElementState(
+        runs=2,
+        selected=3,
+        failed_elements=1,
+        assertions=[(1, AssertionError("foo", 1))],
+        error=(2, CustomError("bar")),
+        filter_error=(0, FieldNotPresentError("Field not present: ", ".foo")),
+    )
+    loaded = ElementState.from_dict(json.loads(json.dumps(state.to_dict())))
+    assert (loaded.runs, loaded.selected, loaded.failed_elements) == (2, 3, 1)
+    for original, copied in (
+        (state.assertions[0], loaded.assertions[0]),
+        (state.error, loaded.error),
+        (state.filter_error, loaded.filter_error),
+    ):
+        assert original[0] == copied[0]  # type: ignore[index]
+        # Exceptions are reported the same way
+        assert str(type(original[1])) == str(type(copied[1]))  # type: ignore[index]
+        assert repr(original[1]) == repr(copied[1])  # type: ignore[index]
+
+
+@pytest.mark.parametrize(
+    ["path"], [("foo.bar",), ("foo[kind=${spam}]bar",), ("[0]foo",), ("foo",)]
+)
+def test_element_runner_unsupported(path: str):
+    assert not ElementRunner.supports(path)
+
+
+def test_definition_key():
+    first = FieldResolver(
+        {
+            "a": Variable("a", "packages[|]SPDXID"),
+            "b": Variable("b", "relationships[spdxElementId=${a}]relatedSpdxElement"),
+        }
+    )
+    second = FieldResolver(
+        {
+            "x": Variable("x", "packages[|]SPDXID"),
+            "a": Variable("a", "packages[|]name"),
+            "b": Variable("b", "relationships[spdxElementId=${a}]relatedSpdxElement"),
+        }
+    )
+    assert first.definition_key("a") == second.definition_key("x")
+    # The same FieldPath referencing a different variable
+    assert first.definition_key("b") != second.definition_key("b")
+    assert first.definition_key("nonexistent") is None
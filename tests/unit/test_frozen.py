@@ -0,0 +1,80 @@
+import shutil
+from pathlib import Path
+
+import pytest
+from jsonschema.exceptions import ValidationError
+
+import sbomgrader.core.frozen as frozen
+from sbomgrader.core.definitions import (
+    COOKBOOK_VALIDATION_SCHEMA_PATH,
+    COOKBOOKS_DIR,
+    ROOT_DIR,
+    RULESET_VALIDATION_SCHEMA_PATH,
+)
+from sbomgrader.core.frozen import (
+    BUILT_IN_DIRS,
+    build_frozen_bundle,
+    get_frozen_mapping,
+)
+from sbomgrader.core.utils import get_mapping, is_mapping
+
+
+def _built_in_files() -> list[tuple[Path, Path]]:
+    return [
+        (file, validation_schema)
+        for directory, validation_schema in BUILT_IN_DIRS.items()
+        for file in sorted(directory.iterdir())
+        if file.is_file() and is_mapping(file)
+    ]
+
+
+@pytest.fixture()
+def package_copy(tmp_path: Path) -> Path:
+    root = tmp_path / "sbomgrader"
+    for directory in BUILT_IN_DIRS:
+        shutil.copytree(directory, root / directory.relative_to(ROOT_DIR))
+    return root
+
+
+@pytest.fixture()
+def bundle_of(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    def build(root: Path = ROOT_DIR) -> Path:
+        bundle = build_frozen_bundle(tmp_path / "frozen_bundle.pickle", root)
+        frozen._load_bundle.cache_clear()
+        monkeypatch.setattr(frozen, "FROZEN_BUNDLE_PATH", bundle)
+        return bundle
+
+    yield build
+    frozen._load_bundle.cache_clear()
+
+
+def test_frozen_bundle(bundle_of):
+    bundle_of()
+    files = _built_in_files()
+    assert {file.parent for file, _ in files} == set(BUILT_IN_DIRS)
+    for file, validation_schema in files:
+        mapping = get_frozen_mapping(file, validation_schema)
+        assert mapping == get_mapping(file, validation_schema, frozen=False)
+        # Each load gets its own copy
+        assert mapping is not get_frozen_mapping(file, validation_schema)
+    cookbook = COOKBOOKS_DIR / "rpm_build.yml"
+    assert get_frozen_mapping(cookbook) is not None
+    assert get_frozen_mapping(cookbook, RULESET_VALIDATION_SCHEMA_PATH) is None
+
+
+def test_frozen_bundle_changed_file(bundle_of, package_copy: Path):
+    changed = package_copy / "cookbooks" / "rpm_build.yml"
+    changed.write_text(changed.read_text() + "\n# Changed\n")
+    bundle_of(package_copy)
+    assert get_frozen_mapping(COOKBOOKS_DIR / "rpm_build.yml") is None
+    assert get_frozen_mapping(COOKBOOKS_DIR / "rpm_release.yml") is not None
+
+
+def test_frozen_bundle_custom_file(bundle_of, package_copy: Path):
+    bundle_of()
+    custom = package_copy / "cookbooks" / "rpm_build.yml"
+    assert get_frozen_mapping(custom, COOKBOOK_VALIDATION_SCHEMA_PATH) is None
+    # Custom files keep being validated
+    custom.write_text("---\nrulesets: []\nfoo: bar\n")
+    with pytest.raises(ValidationError):
+        get_mapping(custom, COOKBOOK_VALIDATION_SCHEMA_PATH)
@@ -1,7 +1,25 @@
+import gzip
+import json
+from concurrent.futures import ThreadPoolExecutor
+from copy import copy
+
 import pytest
 
+from sbomgrader.grade.cookbook_bundles import CookbookBundle
 from sbomgrader.grade.cookbooks import Cookbook
 from sbomgrader.core.documents import Document
+from sbomgrader.core.definitions import COOKBOOKS_DIR
+from sbomgrader.core.enums import SBOMType, ResultType, Grade
+from sbomgrader.core.field_resolve import ElementRunner, FieldResolver
+from sbomgrader.grade.rules import Rule
+from sbomgrader.grade.grader import Grader
+from sbomgrader.grade.sampling import Sampling, wilson_interval
+from sbomgrader.grade.sharding import (
+    ShardPlan,
+    grade_shard,
+    is_shard_file,
+    write_shards,
+)
 
 
 @pytest.mark.parametrize(
@@ -27,3 +45,262 @@ def test_success_cookbook_build(sbom_fixture_name, cookbook_fixture_name, reques
     assert not unsuccessful.should
     assert not unsuccessful.must
     assert not res.result.not_implemented
+
+
+def test_cookbook_bundle_projection(image_build_sbom):
+    bundle = CookbookBundle.for_document_type(SBOMType.IMAGE)
+    bundle_result = bundle(image_build_sbom)
+    for cookbook_result in bundle_result:
+        standalone = cookbook_result.cookbook(image_build_sbom)
+        assert cookbook_result.result == standalone.result.subset(
+            standalone.cookbook.all_used_rule_names
+        )
+        assert cookbook_result.grade is standalone.grade
+        assert (
+            cookbook_result.get_unsuccessful().cookbook.all_used_rule_names
+            == standalone.get_unsuccessful().cookbook.all_used_rule_names
+        )
+
+
+@pytest.mark.parametrize(
+    ["field_path", "minimum_tested_elements"],
+    [
+        ("relationships[|]relatedSpdxElement", 1),
+        ("?.relationships[relationshipType=DESCRIBES]relatedSpdxElement", 1),
+        ("?.relationships[relationshipType=DESCRIBES]relatedSpdxElement", 0),
+    ],
+)
+def test_rule_with_missing_root_field(field_path, minimum_tested_elements):
+    doc = Document({"spdxVersion": "SPDX-2.3", "packages": []})
+    rule = Rule(
+        name="foo",
+        func=lambda x: None,
+        error_message="Missing relationships.",
+        field_path=field_path,
+        minimum_tested_elements=minimum_tested_elements,
+        field_resolver=FieldResolver({}),
+    )
+    resolved_rule = copy(rule)
+    resolved_rule.root_field = None
+    assert rule.root_field is not None
+    assert rule(doc) == resolved_rule(doc)
+
+
+@pytest.mark.parametrize(
+    ["must", "expected"],
+    [
+        (
+            ["All packages have a versionInfo"],
+            {"packages", "relationships", "metadata", "components"},
+        ),
+        (["Document passes schema validation"], None),
+    ],
+)
+def test_cookbook_bundle_referenced_fields(must, expected):
+    bundle = CookbookBundle([Cookbook("foo", ["general"], must, [], [])])
+    assert bundle.referenced_fields == expected
+
+
+@pytest.mark.parametrize(
+    ["sbom_file_name", "sbom_type"],
+    [
+        ("image_build_sbom.spdx.json", SBOMType.IMAGE),
+        ("rpm_release_sbom.spdx.json", SBOMType.RPM),
+        ("product_sbom.spdx.json", SBOMType.PRODUCT),
+    ],
+)
+@pytest.mark.parametrize(["chunk_size"], [(64,), (1 << 20,)])
+def test_ruleset_stream(grading_dir, sbom_file_name, sbom_type, chunk_size):
+    ruleset = CookbookBundle.for_document_type(sbom_type).ruleset
+    file = grading_dir / sbom_file_name
+    assert ruleset.stream(file, chunk_size) == ruleset(Document.from_file(file))
+
+
+def test_ruleset_stream_compressed(grading_dir, tmp_path):
+    ruleset = CookbookBundle.for_document_type(SBOMType.IMAGE).ruleset
+    file = grading_dir / "image_build_sbom.spdx.json"
+    compressed = tmp_path / "image_build_sbom.spdx.json.gz"
+    compressed.write_bytes(gzip.compress(file.read_bytes()))
+    assert ruleset.stream(compressed, 64) == ruleset(Document.from_file(file))
+
+
+def test_ruleset_stream_element_rules(testdata_dir):
+    file = testdata_dir / "test_translation" / "sample_cdx16.json"
+    ruleset = CookbookBundle.for_document_type(SBOMType.IMAGE).ruleset
+    streamed_rules = {
+        rule.name
+        for rule in ruleset.rules["cdx16"].values()
+        if isinstance(rule, Rule) and rule.streamable
+    }
+    assert streamed_rules
+    ruleset.selection = streamed_rules
+    assert ruleset.stream(file, 64) == ruleset(Document.from_file(file))
+
+
+@pytest.fixture()
+def large_cdx_sbom(tmp_path):
+    components = [
+        {"type": "library", "name": f"lib{idx}", "bom-ref": f"lib{idx}"}
+        for idx in range(200)
+    ]
+    for component in components[::4]:
+        component["supplier"] = {"name": "foo"}
+    file = tmp_path / "large.cdx.json"
+    file.write_text(
+        json.dumps(
+            {
+                "bomFormat": "CycloneDX",
+                "specVersion": "1.6",
+                "metadata": {"component": {"name": "foo"}},
+                "components": components,
+            }
+        )
+    )
+    return file
+
+
+@pytest.mark.parametrize(["size", "fraction"], [(20, None), (None, 0.1)])
+def test_ruleset_stream_sampling(large_cdx_sbom, size, fraction):
+    bundle = CookbookBundle(
+        [
+            Cookbook(
+                "foo",
+                ["general"],
+                ["All packages have a supplier"],
+                [],
+                ["All packages have a versionInfo"],
+            )
+        ]
+    )
+    sampling = Sampling(size, fraction, seed=42)
+    result = bundle.stream(large_cdx_sbom, sampling)
+    assert result.is_sampled
+    assert result.to_dict() == bundle.stream(large_cdx_sbom, sampling).to_dict()
+    cookbook_result = next(iter(result))
+    # The failure of a sampled element is certain
+    supplier = cookbook_result.get("All packages have a supplier")
+    assert supplier.result_type is ResultType.FAILED
+    assert supplier.estimate
+    # Rules which are not per-element are evaluated in full
+    assert not cookbook_result.get("All packages have a versionInfo").estimate
+
+
+def test_ruleset_stream_full_sample(large_cdx_sbom):
+    ruleset = CookbookBundle.for_document_type(SBOMType.IMAGE).ruleset
+    result = ruleset.stream(large_cdx_sbom, sampling=Sampling(fraction=1))
+    assert not result.sampled
+    assert result == ruleset.stream(large_cdx_sbom)
+
+
+def test_sampler_estimate_inconclusive():
+    sampler = Sampling(size=1, seed=0).sampler("foo")
+    elements = [{"id": "a"}, {"id": "b"}, {"id": "c"}]
+    runner = ElementRunner(FieldResolver({}), bool, "foo[id=x]id", exhaustive=True)
+    for idx, element in sampler.sample(elements):
+        runner.feed(idx, element)
+    # Nothing matched in the sample, the rule does not fail
+    runner.finish(sampler.fraction)
+    assert "Inconclusive" in sampler.estimate(runner)
+
+
+def test_wilson_interval():
+    low, high = wilson_interval(0, 100)
+    assert low == 0 and 0 < high < 0.05
+    low, high = wilson_interval(50, 100)
+    assert low < 0.5 < high
+    assert wilson_interval(0, 0) == (0.0, 1.0)
+
+
+@pytest.mark.parametrize(
+    ["sbom_fixture_name", "sbom_type"],
+    [
+        ("image_build_sbom", SBOMType.IMAGE),
+        ("product_sbom", SBOMType.PRODUCT),
+    ],
+)
+def test_grade_sharded(sbom_fixture_name, sbom_type, request):
+    sbom_doc: Document = request.getfixturevalue(sbom_fixture_name)
+    bundle = CookbookBundle.for_document_type(sbom_type)
+    assert bundle.grade_sharded(sbom_doc, 3).to_dict() == bundle(sbom_doc).to_dict()
+
+
+def test_grade_concurrently(image_build_sbom, image_release_sbom):
+    # A fresh bundle is initialized by the threads themselves
+    bundle = CookbookBundle.for_document_type(SBOMType.IMAGE)
+    docs = [image_build_sbom, image_release_sbom] * 4
+    with ThreadPoolExecutor(4) as executor:
+        results = list(executor.map(bundle, docs))
+    for doc, result in zip(docs, results):
+        assert result.to_dict() == bundle(doc).to_dict()
+
+
+@pytest.mark.parametrize(["workers"], [(1,), (2,)])
+def test_grader_grade_many(grading_dir, workers):
+    grader = Grader()
+    names = ["image_build_sbom", "rpm_release_sbom", "product_sbom"]
+    paths = [grading_dir / f"{name}.spdx.json" for name in names]
+    missing = grading_dir / "missing.spdx.json"
+    outcomes = {
+        outcome.source: outcome
+        for outcome in grader.grade_many([*paths, missing], workers=workers)
+    }
+    assert outcomes[missing].result is None
+    assert isinstance(outcomes[missing].error, ValueError)
+    for path in paths:
+        doc = Document.from_file(path)
+        expected = CookbookBundle.for_document_type(doc.sbom_type)(doc)
+        assert outcomes[path].error is None
+        assert outcomes[path].result.to_dict() == expected.to_dict()  # type: ignore[union-attr]
+
+
+def test_grader_cookbooks(grading_dir, image_build_sbom):
+    grader = Grader(["image_build"], passing_grade=Grade.A)
+    result = grader.grade(grading_dir / "image_build_sbom.spdx.json")
+    expected = CookbookBundle([Cookbook.from_file(COOKBOOKS_DIR / "image_build.yml")])(
+        image_build_sbom
+    )
+    assert result.to_dict() == expected.to_dict()
+    assert grader.passed(result) is (result.grade is Grade.A)
+    assert json.loads(grader.output(result)) == expected.to_dict()
+    with pytest.raises(ValueError):
+        Grader(["nonexistent_cookbook"])
+
+
+def test_shard_files(image_build_sbom):
+    bundle = CookbookBundle.for_document_type(SBOMType.IMAGE)
+    shards = bundle.create_shards(image_build_sbom, 3)
+    assert len(shards) > 1
+    # Shards and their results are passed around as JSON, in any order
+    shard_results = [
+        json.loads(json.dumps(grade_shard(json.loads(json.dumps(shard)))))
+        for shard in reversed(shards)
+    ]
+    merged = CookbookBundle.merge_shard_results(shard_results)
+    expected = bundle(image_build_sbom)
+    assert merged.grade == expected.grade
+    assert sorted(
+        merged.to_dict()["cookbook_results"], key=lambda x: x["cookbook_name"]
+    ) == sorted(
+        expected.to_dict()["cookbook_results"], key=lambda x: x["cookbook_name"]
+    )
+
+    with pytest.raises(ValueError):
+        CookbookBundle.merge_shard_results(shard_results[1:])
+    with pytest.raises(ValueError):
+        CookbookBundle.merge_shard_results(shard_results + shard_results[:1])
+
+
+def test_is_shard_file(grading_dir, image_build_sbom, tmp_path):
+    bundle = CookbookBundle.for_document_type(SBOMType.IMAGE)
+    paths = write_shards(bundle.create_shards(image_build_sbom, 2), tmp_path)
+    assert all(is_shard_file(path) for path in paths)
+    assert not is_shard_file(grading_dir / "image_build_sbom.spdx.json")
+
+
+def test_shard_plan_variables(image_build_sbom):
+    ruleset = CookbookBundle.for_document_type(SBOMType.IMAGE).ruleset
+    plan = ShardPlan.create(ruleset, image_build_sbom)
+    sharded_rules = [rule for rules in plan.element_rules.values() for rule in rules]
+    # Rules filtering by global variables are sharded too
+    assert any(plan.variables[rule.name] for rule in sharded_rules)
+    assert set(plan.result.element_states) == {rule.name for rule in sharded_rules}
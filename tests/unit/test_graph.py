@@ -0,0 +1,41 @@
+from pathlib import Path
+
+from sbomgrader.core.documents import Document
+from sbomgrader.core.field_resolve import FieldResolver
+
+
+def test_spdx_graph(rpm_build_sbom: Document):
+    graph = rpm_build_sbom.graph
+    resolver = FieldResolver({})
+    doc = rpm_build_sbom.doc
+    assert graph.package_spdxids == set(resolver.get_objects(doc, "packages[|]SPDXID"))
+    for spdxid in graph.package_spdxids:
+        assert graph.package(spdxid)["SPDXID"] == spdxid
+        assert graph.package_purls(spdxid) == resolver.get_objects(
+            doc,
+            f"packages[SPDXID={spdxid}]externalRefs[referenceType=purl]referenceLocator",
+        )
+        for relationship_type in "CONTAINS", "GENERATED_FROM":
+            assert graph.related(spdxid, relationship_type) == resolver.get_objects(
+                doc,
+                f"relationships[spdxElementId={spdxid},"
+                f"relationshipType={relationship_type}]relatedSpdxElement",
+            )
+    assert graph.related("SPDXRef-DOCUMENT", "DESCRIBES")
+    assert graph.package("nonexistent") is None
+    assert graph.package_purls("nonexistent") == []
+
+
+def test_cdx_graph(testdata_dir: Path):
+    doc = Document.from_file(
+        testdata_dir / "test_translation/actual_data/openssl-3.0.7-18.el9_2.cdx.json"
+    )
+    graph = doc.graph
+    for component in doc.doc["components"]:
+        assert graph.component(component["bom-ref"]) is component
+    for dependency in doc.doc["dependencies"]:
+        assert graph.depends_on(dependency["ref"]) == dependency.get("dependsOn", [])
+        assert graph.provides(dependency["ref"]) == dependency.get("provides", [])
+        assert dependency["ref"] in graph.related_bom_refs
+    assert graph.component("nonexistent") is None
+    assert graph.depends_on("nonexistent") == []
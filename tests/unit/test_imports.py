@@ -0,0 +1,37 @@
+import subprocess
+import sys
+
+from sbomgrader.core.definitions import FORMAT_FILE_PATH, FORMAT_VALIDATION_SCHEMA_PATH
+from sbomgrader.core.formats import SBOMFormat, _load_formats_file
+
+
+def test_formats_file_valid():
+    # The file is not validated when it is loaded on import
+    formats, _, _ = _load_formats_file(FORMAT_FILE_PATH, FORMAT_VALIDATION_SCHEMA_PATH)
+    assert [f.value for f in formats] == [f.value for f in SBOMFormat]
+
+
+def test_cli_imports_lazily():
+    heavy_modules = [
+        "rich",
+        "jinja2",
+        "jsonschema",
+        "spdx_tools",
+        "cyclonedx",
+        "asyncio",
+        "importlib.metadata",
+        "sbomgrader.grade.cookbook_bundles",
+        "sbomgrader.translate.translation_map",
+    ]
+    loaded = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, sbomgrader.__main__; "
+            f"print([m for m in {heavy_modules!r} if m in sys.modules])",
+        ],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout.strip()
+    assert loaded == "[]"
@@ -0,0 +1,86 @@
+import hashlib
+import json
+import math
+from types import SimpleNamespace
+
+import pytest
+import yaml
+
+import sbomgrader.core.serialization as serialization
+from sbomgrader.core.serialization import (
+    json_loads,
+    yaml_dump,
+    yaml_load,
+    yaml_load_all,
+)
+
+
+@pytest.fixture(params=["default", "stdlib"])
+def json_backend(request, monkeypatch: pytest.MonkeyPatch) -> None:
+    if request.param == "stdlib":
+        monkeypatch.setattr(serialization, "orjson", None)
+
+
+@pytest.mark.parametrize(
+    ["text"],
+    [
+        ('{"a": [1, 1.5, "\\u00e9", null, true], "a": {}}',),
+        ("[1e-7, 0.1, -0.0, 123456789012345678]",),
+        # Not accepted by all JSON libraries
+        ("[123456789012345678901234567890]",),
+        ("[-9300000000000000000, 18446744073709551616]",),
+        ('{"a":\n  -9300000000000000000, "b": "1234567890123456789012"}',),
+        ("9300000000000000000",),
+        ('"\\ud800"',),
+        ("[Infinity, -Infinity]",),
+    ],
+)
+def test_json_loads(json_backend, text: str):
+    assert json_loads(text) == json.loads(text)
+    assert math.isnan(json_loads("NaN"))
+
+
+def test_json_loads_checksums(monkeypatch: pytest.MonkeyPatch):
+    pytest.importorskip("orjson")
+    doc = {
+        "packages": [
+            {
+                "checksums": [
+                    {
+                        "algorithm": "SHA256",
+                        "checksumValue": hashlib.sha256(str(idx).encode()).hexdigest(),
+                    },
+                    {"algorithm": "SHA1", "checksumValue": "0" * 40},
+                ]
+            }
+            for idx in range(5000)
+        ]
+    }
+    text = json.dumps(doc, indent=2)
+
+    def stdlib_loads(_: str | bytes) -> None:
+        raise AssertionError("The document should be loaded by orjson.")
+
+    # Long runs of digits in the checksums do not look like numbers
+    monkeypatch.setattr(serialization, "json", SimpleNamespace(loads=stdlib_loads))
+    assert json_loads(text) == doc
+    assert json_loads(text.encode()) == doc
+
+
+@pytest.mark.parametrize(["text"], [("{",), ("",), ('{"a": 1,}',)])
+def test_json_loads_invalid(json_backend, text: str):
+    with pytest.raises(json.JSONDecodeError):
+        json_loads(text)
+
+
+def test_yaml(grading_dir):
+    with open(grading_dir / "image_build_sbom.spdx.json") as stream:
+        doc = json.load(stream)
+    # Long quoted strings are folded, the same way as by PyYAML
+    doc["comment"] = "{'a': 'b'} é\t" * 20
+    text = yaml_dump(doc)
+    assert text == yaml.dump(doc)
+    assert yaml_load(text) == yaml.safe_load(text) == doc
+    assert list(yaml_load_all(f"{text}---\n{text}")) == [doc, doc]
+    with pytest.raises(yaml.YAMLError):
+        yaml_load("a: [")
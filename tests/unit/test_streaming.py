@@ -0,0 +1,169 @@
+import gzip
+import io
+import json
+import sys
+from pathlib import Path
+
+import pytest
+import yaml
+
+from sbomgrader.core.documents import Document
+from sbomgrader.core.streaming import dump, load_sections, iter_sections
+from sbomgrader.core.utils import get_mapping, open_input
+
+
+@pytest.mark.parametrize(["chunk_size"], [(1,), (7,), (1 << 20,)])
+@pytest.mark.parametrize(
+    ["sections"], [(None,), ({"packages", "spdxVersion"},), (set(),)]
+)
+def test_load_sections(grading_dir: Path, chunk_size: int, sections: set[str] | None):
+    file = grading_dir / "image_build_sbom.spdx.json"
+    with open(file) as stream:
+        full_doc = json.load(stream)
+    with open(file) as stream:
+        partial_doc = load_sections(stream, sections, chunk_size)
+    assert partial_doc == {
+        k: v for k, v in full_doc.items() if sections is None or k in sections
+    }
+
+
+@pytest.mark.parametrize(
+    ["text"],
+    [
+        ("{}",),
+        ('{"a": [], "b": -12.5e3, "c": [1, true, null, "x\\"y", {"d": []}]}',),
+    ],
+)
+def test_load_sections_values(text: str):
+    assert load_sections(io.StringIO(text), None, 1) == json.loads(text)
+
+
+@pytest.mark.parametrize(
+    ["text"],
+    [
+        ('{"a": 1,}',),
+        ('{"a" 1}',),
+        ("[1]",),
+        ('{"a": [1,]}',),
+        ('{"a": 1} x',),
+        ("{} x",),
+    ],
+)
+def test_load_sections_invalid(text: str):
+    with pytest.raises(json.JSONDecodeError):
+        load_sections(io.StringIO(text), None, 2)
+
+
+def test_iter_section_elements():
+    text = '{"a": [1, 2, 3], "b": [4, 5]}'
+    ans = {}
+    for section in iter_sections(io.StringIO(text), 3):
+        assert section.is_list
+        # Only read the first element, the rest is skipped
+        ans[section.key] = next(section.elements())
+    assert ans == {"a": 1, "b": 4}
+
+
+def test_document_from_file_sections(grading_dir: Path):
+    doc = Document.from_file(
+        grading_dir / "image_build_sbom.spdx.json", {"creationInfo"}
+    )
+    assert "creationInfo" in doc.doc
+    assert "files" not in doc.doc
+    assert (
+        doc.sbom_type
+        is Document.from_file(grading_dir / "image_build_sbom.spdx.json").sbom_type
+    )
+
+
+@pytest.mark.parametrize(["chunk_size"], [(1,), (1 << 20,)])
+@pytest.mark.parametrize(["indent"], [(4,), (None,)])
+def test_dump(grading_dir: Path, chunk_size: int, indent: int | None):
+    with open(grading_dir / "image_build_sbom.spdx.json") as stream:
+        doc = json.load(stream)
+    out = io.StringIO()
+    dump(doc, out, indent, chunk_size)
+    if indent is None:
+        assert out.getvalue() == json.dumps(doc, separators=(",", ":"))
+    else:
+        assert out.getvalue() == json.dumps(doc, indent=indent)
+
+
+def _compress(path: Path, target: Path) -> Path:
+    content = path.read_bytes()
+    if target.name.endswith(".gz"):
+        target.write_bytes(gzip.compress(content))
+    else:
+        zstandard = pytest.importorskip("zstandard")
+        target.write_bytes(zstandard.ZstdCompressor().compress(content))
+    return target
+
+
+@pytest.mark.parametrize(["suffix"], [(".gz",), (".zst",)])
+@pytest.mark.parametrize(["file_name"], [("sbom.json",), ("sbom.yml",), ("sbom",)])
+def test_get_mapping_compressed(
+    grading_dir: Path, tmp_path: Path, suffix: str, file_name: str
+):
+    original = grading_dir / "image_build_sbom.spdx.json"
+    expected = get_mapping(original)
+    if file_name.endswith(".yml"):
+        original = tmp_path / "original.yml"
+        original.write_text(yaml.safe_dump(expected))
+    compressed = _compress(original, tmp_path / f"{file_name}{suffix}")
+    if file_name == "sbom":
+        # Not a mapping file by its name
+        assert get_mapping(compressed) is None
+        return
+    assert get_mapping(compressed) == expected
+    if file_name.endswith(".json"):
+        assert get_mapping(compressed, sections={"creationInfo"}) == {
+            "creationInfo": expected["creationInfo"]
+        }
+    assert Document.from_file(compressed).doc == expected
+
+
+@pytest.mark.parametrize(["suffix"], [(".gz",), (".zst",)])
+@pytest.mark.parametrize(["file_name"], [("sbom.json",), ("sbom.yml",)])
+def test_get_mapping_compressed_truncated(
+    grading_dir: Path, tmp_path: Path, suffix: str, file_name: str
+):
+    original = grading_dir / "image_build_sbom.spdx.json"
+    if file_name.endswith(".yml"):
+        original = tmp_path / "original.yml"
+        original.write_text(
+            yaml.safe_dump(get_mapping(grading_dir / "image_build_sbom.spdx.json"))
+        )
+    compressed = _compress(original, tmp_path / f"{file_name}{suffix}")
+    content = compressed.read_bytes()
+    for truncated in (content[: len(content) // 2], content[:-4]):
+        compressed.write_bytes(truncated)
+        with pytest.raises(ValueError):
+            get_mapping(compressed)
+    # Concatenated compressed files are read whole
+    compressed.write_bytes(content * 2)
+    with open_input(compressed) as stream:
+        assert stream.read() == original.read_text() * 2
+
+
+@pytest.mark.parametrize(["compression"], [(None,), (".gz",), (".zst",)])
+@pytest.mark.parametrize(["file_name"], [("sbom.json",), ("sbom.yml",)])
+def test_get_mapping_stdin(
+    grading_dir: Path,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    compression: str | None,
+    file_name: str,
+):
+    expected = get_mapping(grading_dir / "image_build_sbom.spdx.json")
+    original = tmp_path / file_name
+    if file_name.endswith(".yml"):
+        original.write_text(yaml.safe_dump(expected))
+    else:
+        original.write_text(json.dumps(expected, indent=2))
+    if compression is not None:
+        # The compression is recognized by the content
+        original = _compress(original, tmp_path / f"stdin{compression}")
+    stdin = io.TextIOWrapper(io.BufferedReader(io.BytesIO(original.read_bytes())))
+    monkeypatch.setattr(sys, "stdin", stdin)
+    assert Document.from_file("-").doc == expected
+    assert not stdin.closed
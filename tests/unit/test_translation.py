@@ -1,12 +1,38 @@
+import datetime
+import gzip
+import runpy
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from typing import Any
 
 import pytest
+import yaml
 
+import sbomgrader.__main__ as cli
+from sbomgrader.core import cached_python_loader, utils
 from sbomgrader.core.documents import Document
+from sbomgrader.core.field_resolve import FieldResolver, Variable
 from sbomgrader.core.formats import SBOMFormat
+from sbomgrader.translate.context import (
+    conversion_cache,
+    conversion_context,
+    conversion_memoize,
+)
+from sbomgrader.translate.choose_map import (
+    MapEntry,
+    choose_map,
+    get_default_map_entries,
+)
 from sbomgrader.translate.prune import prune
-from sbomgrader.translate.translation_map import TranslationMap
-from sbomgrader.core.utils import get_mapping
+from sbomgrader.translate import translation_map
+from sbomgrader.translate.translation_map import Data, TranslationMap
+from sbomgrader.core.utils import get_mapping, create_jinja_env
+from sbomgrader.translate.native_templates import (
+    FallbackError,
+    NativeTemplate,
+    NotCompilableError,
+)
 
 
 def ordered(obj: Any):
@@ -141,3 +167,469 @@ def test_cdx_image_translation(built_in_translation_map: TranslationMap):
         doc.doc["metadata"]["tools"] = tools
         prune(doc.doc)
     assert ordered(cdx_doc.doc) == ordered(new_doc.doc)
+
+
+@pytest.mark.parametrize(
+    ["struc", "expected"],
+    [
+        ([1, [], 2], [1, 2]),
+        ({"a": {"b": [None, "", {}]}, "c": 0, "d": False}, {"d": False}),
+        (
+            [{"date": datetime.datetime(2024, 1, 2, 3, 4, 5)}, "Field not present."],
+            [{"date": "2024-01-02T03:04:05Z"}],
+        ),
+        ([[[[]]], "x"], ["x"]),
+        (datetime.datetime(2024, 1, 2), "2024-01-02T00:00:00Z"),
+        ("x", "x"),
+    ],
+)
+def test_prune(struc: Any, expected: Any):
+    assert prune(struc) == expected
+
+
+def test_conversion_cache_scope():
+    with conversion_context():
+        conversion_cache("test")["key"] = "value"
+        assert conversion_cache("test") == {"key": "value"}
+        with conversion_context():
+            assert conversion_cache("test") == {}
+        assert conversion_cache("test") == {"key": "value"}
+    # Nothing is cached outside of a conversion
+    conversion_cache("test")["key"] = "value"
+    assert conversion_cache("test") == {}
+
+
+def test_variables_resolved_once_per_conversion(
+    built_in_translation_map: TranslationMap, monkeypatch: pytest.MonkeyPatch
+):
+    doc = Document.from_file(
+        "tests/testdata/test_translation/actual_data/rhel-9.2-eus.spdx.json"
+    )
+    resolved = []
+    resolve_variables = FieldResolver.resolve_variables
+
+    def spy(self, whole_doc, *args, already_resolved_variables=None, **kwargs):
+        ans = resolve_variables(
+            self,
+            whole_doc,
+            *args,
+            already_resolved_variables=already_resolved_variables,
+            **kwargs,
+        )
+        for name in set(ans) - set(already_resolved_variables or {}):
+            resolved.append(self.definition_key(name))
+        return ans
+
+    monkeypatch.setattr(FieldResolver, "resolve_variables", spy)
+
+    def all_variables() -> list[dict[str, list[Any]]]:
+        return [
+            chunk.rendering_variables(doc) for chunk in built_in_translation_map.chunks
+        ]
+
+    expected = all_variables()
+    resolved_separately = len(resolved)
+    resolved.clear()
+    with conversion_context():
+        assert all_variables() == expected
+    # Each definition is resolved once, although many chunks share it
+    assert len(resolved) < resolved_separately
+    assert len(resolved) == len(set(resolved))
+
+
+def test_conversion_memoize():
+    calls = []
+
+    @conversion_memoize(maxsize=2)
+    def double(value: Any, extra: Any = None) -> Any:
+        calls.append(value)
+        return value * 2
+
+    @conversion_memoize(key=lambda value, _: value)
+    def first(value: Any, other: Any) -> Any:
+        return other
+
+    with conversion_context():
+        assert [double(1), double(1), double(2), double(1)] == [2, 2, 4, 2]
+        assert calls == [1, 2]
+        # The least recently used result is dropped
+        double(3)
+        double(1)
+        double(2)
+        assert calls == [1, 2, 3, 2]
+        # Lists are compared by value, unhashable arguments are not memoized
+        double(1, extra=[1])
+        double(1, extra=[1])
+        double(4, extra={1})
+        double(4, extra={1})
+        assert calls == [1, 2, 3, 2, 1, 4, 4]
+        assert first("a", 1) == first("a", 2) == 1
+        with conversion_context():
+            assert first("a", 2) == 2
+    calls.clear()
+    # Nothing is memoized outside of a conversion
+    double(1)
+    double(1)
+    assert calls == [1, 1]
+
+
+def test_renders_in_workers(tmp_path: Path):
+    cached = tmp_path / "cached.py"
+    cached.write_text(
+        "_CACHE = {}\n"
+        "def first_value(key, value):\n"
+        "    return _CACHE.setdefault(key, value)\n"
+    )
+    declared = tmp_path / "declared.py"
+    declared.write_text(
+        "WORKER_SAFE = True\ndef upper(value):\n    return value.upper()\n"
+    )
+    variables = Variable.from_schema([{"name": "name", "fieldPath": "@.name"}])
+
+    def renders_in_workers(template: str) -> bool:
+        loader = cached_python_loader.PythonLoader(cached, declared)
+        return Data(template, variables, transformers=loader).renders_in_workers
+
+    assert renders_in_workers("{{ name }}")
+    assert renders_in_workers("{{ name | func(name='upper') }}")
+    # Not declared safe, e.g. because of the module-level cache
+    assert not renders_in_workers("{{ name | func(name='first_value', value=1) }}")
+    assert not renders_in_workers(
+        "{{ name | func(name='upper') | func(name='first_value', value=1) }}"
+    )
+    assert not renders_in_workers("{{ name | func(name=name) }}")
+    transformers = Path("sbomgrader/translation_maps/transformers/red_hat_spdx23_cdx16")
+    assert Data(
+        "{{ name | func(name='bom_ref_to_spdxid', component_name_var=[]) }}",
+        variables,
+        transformers / "cdx16.py",
+    ).renders_in_workers
+    assert not Data(
+        "{{ name | func(name='spdxid_to_bom_ref', purls=[]) }}",
+        variables,
+        transformers / "spdx23.py",
+    ).renders_in_workers
+
+
+def test_concurrent_translation(built_in_translation_map: TranslationMap):
+    docs = [
+        Document.from_file(
+            "tests/testdata/test_translation/actual_data/openssl-3.0.7-18.el9_2.cdx.json"
+        ),
+        Document.from_file(
+            "tests/testdata/test_translation/actual_data/mandrel-for-jdk-21-rhel8-container-23.1-16_amd64.cdx.json"
+        ),
+    ]
+
+    def spdxids(doc: Document) -> list[str]:
+        converted = built_in_translation_map.convert(doc)
+        return sorted(package["SPDXID"] for package in converted.doc["packages"])
+
+    expected = [spdxids(doc) for doc in docs]
+    with ThreadPoolExecutor(4) as executor:
+        assert list(executor.map(spdxids, docs * 2)) == expected * 2
+
+
+@pytest.mark.parametrize(
+    ["template", "variables", "falls_back"],
+    [
+        (
+            "a: 1\nb: '{{ x | unwrap }}'\nc: {{ x | slice(1) }} # comment",
+            {"x": [1, 2]},
+            False,
+        ),
+        ("a:\n- b: {{ x }}\n  c: [1]\n- \n-   - {{ x }}", {"x": "1.5"}, False),
+        (
+            "{% for i in x %}\n- id: {{ i }}\n  {% set y = i ~ '!' %}\n"
+            '  name: "{{ y }}"\n{% endfor %}',
+            {"x": ["a", "b"]},
+            False,
+        ),
+        (
+            "k:\n{% if x | fallback(y) %}\n- {{ x | unify(y) }}\n{% elif z %}\n"
+            "  a: b\n{% else %}\n  c: {{ none }}\n{% endif %}\nd: e",
+            {"x": [], "y": [], "z": True},
+            False,
+        ),
+        ("a: {{ x }}\na: {{ y }}", {"x": "true", "y": "2024-01-01"}, False),
+        ("- {{ x }}", {"x": {"a": [1, "b"]}}, False),
+        ("{{ x }}", {}, False),
+        ("- b {{ x }}", {"x": "'quoted' #"}, True),
+        ("- '{{ x }}'", {"x": "'quoted'"}, True),
+        ("- {{ x }}", {"x": "key: value"}, True),
+        ("- {{ x }}", {"x": "multiple\nlines"}, True),
+        ("a: {{ x }}\n  b: c", {"x": "d"}, True),
+        ("- {{ x }}", {"x": "[a] b]"}, True),
+        ("- {{ x }}", {"x": "2024-13-01"}, True),
+    ],
+)
+def test_native_template(template: str, variables: dict[str, Any], falls_back: bool):
+    env = create_jinja_env()
+    native = NativeTemplate.compile(template, env)
+    if falls_back:
+        # Such values are rendered by Jinja2 and parsed by YAML instead
+        with pytest.raises(FallbackError):
+            native.render(variables)
+    else:
+        expected = yaml.safe_load(env.from_string(template).render(**variables))
+        assert native.render(variables) == expected
+
+
+@pytest.mark.parametrize(
+    ["template"],
+    [
+        ("{%- if x %}a: b{% endif %}",),
+        ("a: {% if x %}b{% endif %}",),
+        ("{% for x in y %}- {{ x }}{% endfor %}",),
+        ("{% for x in y %}\n- {{ loop.index }}\n{% endfor %}",),
+        ("a: |\n  {{ x }}",),
+        ("{{ x }}: b",),
+        ("{# comment #}",),
+    ],
+)
+def test_native_template_not_compilable(template: str):
+    with pytest.raises(NotCompilableError):
+        NativeTemplate.compile(template, create_jinja_env())
+
+
+def test_native_templates_translation():
+    def converted(native_templates: bool) -> Document:
+        tm = TranslationMap.from_file(
+            "sbomgrader/translation_maps/red_hat_spdx23_cdx16.yml", native_templates
+        )
+        doc = tm.convert(
+            Document.from_file(
+                "tests/testdata/test_translation/actual_data/openssl-3.0.7-18.el9_2.spdx.json"
+            )
+        )
+        # Random for each conversion
+        doc.doc.pop("serialNumber")
+        return doc
+
+    assert ordered(converted(True).doc) == ordered(converted(False).doc)
+
+
+def test_transformers_loaded_once(monkeypatch: pytest.MonkeyPatch):
+    loaded = []
+
+    def run_path(path: str) -> dict[str, Any]:
+        if Path(path).parent.parent.name == "transformers":
+            loaded.append(path)
+        return runpy.run_path(path)
+
+    monkeypatch.setattr(cached_python_loader, "run_path", run_path)
+    tm = TranslationMap.from_file(
+        "sbomgrader/translation_maps/red_hat_spdx23_cdx16.yml"
+    )
+    # Functions used by the templates are resolved while loading the map
+    assert sorted(Path(path).name for path in loaded) == ["cdx16.py", "spdx23.py"]
+    tm.convert(
+        Document.from_file(
+            "tests/testdata/test_translation/actual_data/openssl-3.0.7-18.el9_2.cdx.json"
+        )
+    )
+    assert len(loaded) == 2
+
+
+@pytest.mark.parametrize(["min_batch_size"], [(1,), (50,)])
+def test_parallel_translation(
+    built_in_translation_map: TranslationMap,
+    monkeypatch: pytest.MonkeyPatch,
+    min_batch_size: int,
+):
+    # Small batches split the occurrences of chunks between the workers
+    monkeypatch.setattr(translation_map, "_MIN_BATCH_SIZE", min_batch_size)
+    doc = Document.from_file(
+        "tests/testdata/test_translation/actual_data/openssl-3.0.7-18.el9_2.spdx.json"
+    )
+
+    def converted(workers: int) -> str:
+        new_doc = built_in_translation_map.convert(doc, workers=workers)
+        # Random for each conversion
+        new_doc.doc.pop("serialNumber")
+        return new_doc.json_dump
+
+    assert converted(3) == converted(1)
+
+
+@pytest.mark.parametrize(["native_template"], [(True,), (False,)])
+def test_render_many(native_template: bool):
+    variables = Variable.from_schema([{"name": "name", "fieldPath": "@.name"}])
+    names = ["a", "b #comment", "multi\n   line", "5", "", "[1, 2]"]
+    doc = Document({"packages": [{"name": name} for name in names]})
+    occurrences = [
+        (f"packages[{idx}]", package) for idx, package in enumerate(doc.doc["packages"])
+    ]
+    data = Data(
+        "- name: {{ name | unwrap }}\n  length: {{ name | unwrap | length }}",
+        variables,
+        native_template=native_template,
+    )
+    # Values the native template cannot render are rendered by Jinja2 together
+    assert data._renders_in_batches
+    assert data.render_many(doc, occurrences) == [
+        data.render(doc, path, value) for path, value in occurrences
+    ]
+    # Transformers might have side effects
+    assert not Data(
+        "{{ name | func(name='sanitise_supplier') }}",
+        variables,
+        Path("sbomgrader/translation_maps/transformers/red_hat_spdx23_cdx16/spdx23.py"),
+    )._renders_in_batches
+
+
+def test_render_native_template_error(monkeypatch: pytest.MonkeyPatch):
+    variables = Variable.from_schema([{"name": "name", "fieldPath": "@.name"}])
+    doc = Document({"packages": [{"name": 5}]})
+    occurrences = [("packages[0]", doc.doc["packages"][0])]
+    data = Data("- {{ name | unwrap | first }}", variables)
+    assert data.native_template is not None
+
+    def jinja_template(*_: Any) -> None:
+        raise AssertionError("Only values needing YAML are rendered by Jinja2.")
+
+    monkeypatch.setattr(Data, "initialized_jinja_template", property(jinja_template))
+    monkeypatch.setattr(Data, "batch_jinja_template", property(jinja_template))
+    # The error of the template is not hidden by a fallback to Jinja2
+    with pytest.raises(TypeError):
+        data.render_many(doc, occurrences)
+    with pytest.raises(TypeError):
+        data.render(doc, *occurrences[0])
+
+
+def test_map_entries(built_in_translation_map: TranslationMap, tmp_path: Path):
+    entry = next(
+        entry
+        for entry in get_default_map_entries()
+        if entry.is_exact_map(SBOMFormat.SPDX23, SBOMFormat.CYCLONEDX16)
+    )
+    assert (entry.first, entry.second) == (
+        built_in_translation_map.first,
+        built_in_translation_map.second,
+    )
+    # Only the formats are read from maps which are not chosen
+    custom_file = tmp_path / "custom.yml"
+    custom_file.write_text(
+        "first: cdx16\nfirstVariables:\n  - name: foo\n    fieldPath: bar\n"
+        "second: cdx16\nchunks: [invalid\n"
+    )
+    custom = MapEntry.from_file(custom_file)
+    assert (custom.first, custom.second) == (
+        SBOMFormat.CYCLONEDX16,
+        SBOMFormat.CYCLONEDX16,
+    )
+    doc = Document.from_file(
+        "tests/testdata/test_translation/actual_data/rhel-9.2-eus.spdx.json"
+    )
+    chosen = choose_map(doc, SBOMFormat.CYCLONEDX16, custom)
+    assert chosen is entry.translation_map
+    assert "translation_map" not in vars(custom)
+    custom_file.write_text("first: cdx16\nchunks:\n  - second: spdx23\n")
+    with pytest.raises(ValueError):
+        MapEntry.from_file(custom_file)
+
+
+@pytest.fixture()
+def map_without_skeleton(tmp_path: Path) -> Path:
+    sample = Path("tests/testdata/test_translation")
+    data = yaml.safe_load((sample / "sample_spdx23_cdx16.yml").read_text())
+    # The skeleton is placed at the root of the document, all of which it can read
+    data["chunks"] = [chunk for chunk in data["chunks"] if chunk["name"] != "Skeleton"]
+    shutil.copytree(sample / "transformers", tmp_path / "transformers")
+    map_file = tmp_path / "sample_spdx23_cdx16.yml"
+    map_file.write_text(yaml.safe_dump(data))
+    return map_file
+
+
+def test_compressed_map_entry(map_without_skeleton: Path):
+    # The formats are read from the same files as the map is loaded from
+    compressed_file = map_without_skeleton.with_suffix(".yml.gz")
+    compressed_file.write_bytes(gzip.compress(map_without_skeleton.read_bytes()))
+    entry = MapEntry.from_file(compressed_file)
+    assert (entry.first, entry.second) == (
+        SBOMFormat.SPDX23,
+        SBOMFormat.CYCLONEDX16,
+    )
+    doc = Document.from_file("tests/testdata/test_translation/sample_spdx23.json")
+    chosen = choose_map(doc, SBOMFormat.CYCLONEDX16, entry)
+    assert chosen is entry.translation_map
+    expected = TranslationMap.from_file(map_without_skeleton)
+    assert chosen.convert(doc).doc == expected.convert(doc).doc
+
+
+def test_map_referenced_fields(
+    built_in_translation_map: TranslationMap, map_without_skeleton: Path
+):
+    custom_map = TranslationMap.from_file(map_without_skeleton)
+    assert custom_map.referenced_fields(SBOMFormat.SPDX23) == {
+        "relationships",
+        "packages",
+    }
+    assert custom_map.referenced_fields(SBOMFormat.CYCLONEDX16) == {
+        "metadata",
+        "components",
+    }
+    # Processing functions read the whole document
+    assert built_in_translation_map.referenced_fields(SBOMFormat.SPDX23) is None
+
+
+def test_cli_convert_loads_referenced_fields(
+    map_without_skeleton: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    input_file = "tests/testdata/test_translation/sample_spdx23.json"
+    output_file = tmp_path / "converted.json"
+    loaded_sections = []
+
+    def get_mapping(schema: Any, sections: set[str] | None = None) -> Any:
+        loaded_sections.append(sections)
+        return utils.get_mapping(schema, sections=sections)
+
+    monkeypatch.setattr(cli, "get_mapping", get_mapping)
+    with pytest.raises(SystemExit) as e:
+        cli.convert(
+            cli.ConvertConfig(
+                input_file=input_file,
+                output_format=SBOMFormat.CYCLONEDX16,
+                custom_maps=[map_without_skeleton],
+                workers=1,
+                output_file=str(output_file),
+                compact=False,
+            )
+        )
+    assert e.value.code == 0
+    assert loaded_sections == [
+        Document.format_fields(),
+        {"relationships", "packages", *Document.format_fields()},
+    ]
+    expected = TranslationMap.from_file(map_without_skeleton).convert(
+        Document.from_file(input_file), SBOMFormat.CYCLONEDX16
+    )
+    assert utils.get_mapping(output_file) == expected.doc
+
+
+def test_cli_convert_loads_document_once(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    output_file = tmp_path / "converted.json"
+    loaded_sections = []
+
+    def get_mapping(schema: Any, sections: set[str] | None = None) -> Any:
+        loaded_sections.append(sections)
+        return utils.get_mapping(schema, sections=sections)
+
+    monkeypatch.setattr(cli, "get_mapping", get_mapping)
+    with pytest.raises(SystemExit) as e:
+        cli.convert(
+            cli.ConvertConfig(
+                input_file="tests/testdata/test_translation/actual_data/rhel-9.2-eus.spdx.json",
+                output_format=SBOMFormat.CYCLONEDX16,
+                custom_maps=[],
+                workers=1,
+                output_file=str(output_file),
+                compact=False,
+            )
+        )
+    assert e.value.code == 0
+    # The built-in map reads the whole document, the format is not read beforehand
+    assert loaded_sections == [None]
+    assert Document.from_file(output_file).sbom_format is SBOMFormat.CYCLONEDX16